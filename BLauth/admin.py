@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import OutboundMail
 
 # Register your models here.
+
+class OutboundMailAdmin(admin.ModelAdmin):
+    list_display = ['subject','recipients','status','attempts','created_at','sent_at']
+    list_filter = ['status']
+
+admin.site.register(OutboundMail,OutboundMailAdmin)
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class BlauthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'BLauth'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from Djangolearn.background import serving_requests
+        from .mailqueue import mail_worker
+
+        # 重启前没发完的邮件（包括等待重试的、卡在发送中的）不必等下一次入队
+        if settings.MAIL_QUEUE_IN_PROCESS and serving_requests():
+            mail_worker.start()
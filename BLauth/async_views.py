@@ -0,0 +1,41 @@
+"""
+ASGI 模式下的发送验证码接口：写验证码、邮件入队都用异步接口，
+请求不占线程等数据库/缓存。校验和返回内容和 views.py 里的同名视图一致。
+"""
+import random
+import string
+
+from django.http.response import JsonResponse
+
+from .backends import aemail_in_use
+from .codes import FORGOT_PASSWORD, REGISTER, TTL, get_code_store
+from .mailqueue import aqueue_mail
+
+
+async def send_email_captcha(request):
+    email=request.GET.get('email')
+    if not email:
+        return JsonResponse({'code':400,'message':'必须传递邮箱！'})
+    captcha = ''.join(random.sample(string.digits,4))
+    await get_code_store().aissue(REGISTER, email, captcha)
+    await aqueue_mail('BL博客注册验证码',message=f'您的注册验证码是：{captcha}',recipient_list=[email],from_email=None,expires_in=TTL[REGISTER])
+    return JsonResponse({'code':200,'message':'邮箱验证码发送成功！'})
+
+
+async def send_forgot_captcha(request):
+    """发送忘记密码的验证码"""
+    email = request.GET.get('email')
+    if not email:
+        return JsonResponse({'code': 400, 'message': '必须传递邮箱！'})
+    if not await aemail_in_use(email):
+        return JsonResponse({'code': 400, 'message': '该邮箱未注册！'})
+    captcha = ''.join(random.sample(string.digits, 4))
+    await get_code_store().aissue(FORGOT_PASSWORD, email, captcha)
+    await aqueue_mail(
+        'BL博客忘记密码验证码',
+        message=f'您的忘记密码验证码是：{captcha}（有效期6分钟）',
+        recipient_list=[email],
+        from_email='你的QQ邮箱@qq.com',  # 替换为实际发件邮箱
+        expires_in=TTL[FORGOT_PASSWORD],
+    )
+    return JsonResponse({'code': 200, 'message': '验证码已发送至邮箱！（有效期6分钟）'})
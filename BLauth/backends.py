@@ -0,0 +1,72 @@
+"""
+按邮箱登录的认证后端，配合 django.contrib.auth.authenticate(request, email=..., password=...) 使用。
+
+查找走 UserEmail 的唯一索引（小写邮箱）；不存在的邮箱在缓存里记一小段时间，
+同一个错误邮箱反复尝试不再查库。密码校验用 User.check_password：
+PASSWORD_HASHERS 的首选算法或迭代次数变化后，旧哈希在用户下次登录成功时自动重新计算并保存。
+"""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import UserEmail, normalize_email
+
+MISSING_EMAIL_KEY = 'auth:missing_email:%s'
+MISSING_EMAIL_TIMEOUT = 60
+
+
+def _missing_key(email):
+    # 邮箱可能含缓存键不允许的字符，取摘要
+    return MISSING_EMAIL_KEY % hashlib.sha1(email.encode()).hexdigest()
+
+
+def find_user_by_email(email):
+    email = normalize_email(email)
+    if not email:
+        return None
+    key = _missing_key(email)
+    if cache.get(key):
+        return None
+    entry = UserEmail.objects.select_related('user').filter(email=email).first()
+    if entry is None:
+        cache.set(key, True, timeout=MISSING_EMAIL_TIMEOUT)
+        return None
+    return entry.user
+
+
+def forget_missing_email(email):
+    """邮箱被注册或改绑后调用，清掉“不存在”的缓存"""
+    cache.delete(_missing_key(normalize_email(email)))
+
+
+def email_in_use(email, exclude_user_id=None):
+    """注册、改邮箱查重（不用缓存，结果必须准确）"""
+    queryset = UserEmail.objects.filter(email=normalize_email(email))
+    if exclude_user_id is not None:
+        queryset = queryset.exclude(user_id=exclude_user_id)
+    return queryset.exists()
+
+
+async def aemail_in_use(email, exclude_user_id=None):
+    queryset = UserEmail.objects.filter(email=normalize_email(email))
+    if exclude_user_id is not None:
+        queryset = queryset.exclude(user_id=exclude_user_id)
+    return await queryset.aexists()
+
+
+class EmailBackend(ModelBackend):
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        # 只处理按邮箱登录；后台按用户名登录交给后面的 ModelBackend
+        if email is None or password is None:
+            return None
+        user = find_user_by_email(email)
+        if user is None:
+            # 和邮箱存在时一样计算一次哈希，响应时间不暴露邮箱是否注册
+            get_user_model()().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
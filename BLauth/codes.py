@@ -0,0 +1,153 @@
+"""
+邮箱验证码存储。
+
+验证码按 (用途, 对象) 存一份，带有效期，过期即视为不存在，不再各自比较创建时间：
+    CacheCodeStore     存在缓存里（默认），过期由缓存自己淘汰，验证码流量不进 MySQL
+    DatabaseCodeStore  存在 VerificationCode 表，expires_at 有索引，
+                       后台线程（或 manage.py sweep_codes）定期分批删除过期行
+settings.CODE_STORE 选择实现，调用方统一用 get_code_store()。
+"""
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from Djangolearn.background import BackgroundWorker
+from .models import VerificationCode
+
+logger = logging.getLogger(__name__)
+
+REGISTER = 'register'
+FORGOT_PASSWORD = 'forgot'
+DELETE_ACCOUNT = 'delete_account'
+CHANGE_PASSWORD = 'change_password'
+CHANGE_EMAIL = 'change_email'
+# 各用途的有效期
+TTL = {
+    REGISTER: timedelta(minutes=6),
+    FORGOT_PASSWORD: timedelta(minutes=6),
+    DELETE_ACCOUNT: timedelta(minutes=5),
+    CHANGE_PASSWORD: timedelta(minutes=5),
+    CHANGE_EMAIL: timedelta(minutes=5),
+}
+SWEEP_BATCH_SIZE = 1000
+
+
+class CodeStore:
+    """subject 是邮箱或用户ID，同一 (purpose, subject) 再次 issue 会覆盖旧验证码"""
+
+    def issue(self, purpose, subject, code):
+        raise NotImplementedError
+
+    def get(self, purpose, subject):
+        """未过期的验证码，没有时返回 None"""
+        raise NotImplementedError
+
+    def consume(self, purpose, subject, code):
+        """验证码正确则删除并返回 True；并发校验同一个验证码时只有一个成功"""
+        raise NotImplementedError
+
+    def discard(self, purpose, subject):
+        raise NotImplementedError
+
+    def check(self, purpose, subject, code):
+        """只校验，不删除（表单校验通过但后续步骤可能失败时用）"""
+        stored = self.get(purpose, subject)
+        return stored is not None and bool(code) and constant_time_compare(stored, code)
+
+    def sweep(self, batch_size=SWEEP_BATCH_SIZE):
+        """删除一批过期验证码，返回删除的条数"""
+        return 0
+
+    async def aissue(self, purpose, subject, code):
+        await sync_to_async(self.issue)(purpose, subject, code)
+
+
+class CacheCodeStore(CodeStore):
+    KEY = 'code:%s:%s'
+
+    def issue(self, purpose, subject, code):
+        cache.set(self.KEY % (purpose, subject), code, timeout=TTL[purpose].total_seconds())
+
+    def get(self, purpose, subject):
+        return cache.get(self.KEY % (purpose, subject))
+
+    def consume(self, purpose, subject, code):
+        if not self.check(purpose, subject, code):
+            return False
+        # delete 返回是否真的删掉了一行，并发时只有一个请求拿到 True
+        return cache.delete(self.KEY % (purpose, subject))
+
+    def discard(self, purpose, subject):
+        cache.delete(self.KEY % (purpose, subject))
+
+    async def aissue(self, purpose, subject, code):
+        await cache.aset(self.KEY % (purpose, subject), code, timeout=TTL[purpose].total_seconds())
+
+
+class DatabaseCodeStore(CodeStore):
+
+    def _live(self, purpose, subject):
+        return VerificationCode.objects.filter(purpose=purpose, subject=str(subject), expires_at__gt=timezone.now())
+
+    def issue(self, purpose, subject, code):
+        expires_at = timezone.now() + TTL[purpose]
+        values = {'code': code, 'expires_at': expires_at}
+        updated = VerificationCode.objects.filter(purpose=purpose, subject=str(subject)).update(**values)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    VerificationCode.objects.create(purpose=purpose, subject=str(subject), **values)
+            except IntegrityError:
+                # 并发请求先插入了，改为覆盖
+                VerificationCode.objects.filter(purpose=purpose, subject=str(subject)).update(**values)
+        if settings.CODE_STORE_SWEEP_IN_PROCESS:
+            code_sweeper.start()
+
+    def get(self, purpose, subject):
+        return self._live(purpose, subject).values_list('code', flat=True).first()
+
+    def consume(self, purpose, subject, code):
+        if not self.check(purpose, subject, code):
+            return False
+        # 带上验证码条件删除，被并发请求抢先删掉或刚被覆盖时影响 0 行
+        # （表没有外键指向、也没有信号，delete() 直接是一条 DELETE）
+        return self._live(purpose, subject).filter(code=code).delete()[0] == 1
+
+    def discard(self, purpose, subject):
+        VerificationCode.objects.filter(purpose=purpose, subject=str(subject)).delete()
+
+    def sweep(self, batch_size=SWEEP_BATCH_SIZE):
+        ids = list(
+            VerificationCode.objects.filter(expires_at__lte=timezone.now())
+            .order_by('expires_at').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        return VerificationCode.objects.filter(pk__in=ids).delete()[0]
+
+
+STORES = {
+    'cache': CacheCodeStore(),
+    'db': DatabaseCodeStore(),
+}
+
+
+def get_code_store():
+    return STORES[settings.CODE_STORE]
+
+
+def _sweep_batch():
+    deleted = STORES['db'].sweep()
+    if deleted:
+        logger.info('清理过期验证码 %s 条', deleted)
+    # 删满一批说明可能还有，立刻再来一轮
+    return deleted >= SWEEP_BATCH_SIZE
+
+
+code_sweeper = BackgroundWorker('code-sweeper', _sweep_batch, idle_interval=600)
@@ -1,8 +1,7 @@
 from django import forms
 from django.contrib.auth import get_user_model
-from .models import CaptchaModel
-from django.utils import timezone
-from datetime import timedelta
+from .backends import email_in_use
+from .codes import REGISTER, get_code_store
 
 User = get_user_model()
 
@@ -55,7 +54,7 @@ class RegisterForm(forms.Form):
         email = self.cleaned_data.get('email')
         if not email.endswith('@qq.com'):
             raise forms.ValidationError('仅支持QQ邮箱注册！')
-        if User.objects.filter(email=email).exists():
+        if email_in_use(email):
             raise forms.ValidationError('该邮箱已注册，请直接登录！')
         return email
 
@@ -66,22 +65,15 @@ class RegisterForm(forms.Form):
         if not email:
             return captcha
 
-        # 取最新的验证码（按create_time倒序，确保是刚发送的）
-        captcha_obj = CaptchaModel.objects.filter(email=email).order_by('-create_time').first()
+        # 验证码6分钟后自动过期，过期的和没获取过的一样取不到
+        store = get_code_store()
+        if store.get(REGISTER, email) is None:
+            raise forms.ValidationError('验证码已过期或未获取，请重新获取！')
 
-        if not captcha_obj:
-            raise forms.ValidationError('请先获取验证码！')
-
-        # 校验验证码是否正确
-        if captcha_obj.captcha != captcha:
+        # 校验验证码是否正确（注册成功后再删除）
+        if not store.check(REGISTER, email, captcha):
             raise forms.ValidationError('验证码错误！')
 
-        # 修复：放宽有效期（比如6分钟），并确保时间差计算正确
-        # 关键：使用 timezone 统一时间，避免本地时间/UTC时间差异
-        time_diff = timezone.now() - captcha_obj.create_time
-        if time_diff > timedelta(minutes=6):  # 原5分钟，放宽1分钟容错
-            raise forms.ValidationError('验证码已过期，请重新获取！')
-
         return captcha
 
 
@@ -98,9 +90,3 @@ class LoginForm(forms.Form):
         }
     )
     remember_me = forms.BooleanField(required=False)
-
-    def clean_email(self):
-        email = self.cleaned_data.get('email')
-        if not User.objects.filter(email=email).exists():
-            raise forms.ValidationError('该邮箱未注册，请先注册！')
-        return email
\ No newline at end of file
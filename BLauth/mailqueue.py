@@ -0,0 +1,173 @@
+"""
+异步邮件队列。
+
+queue_mail() 把邮件写进 OutboundMail 表，事务提交后唤醒进程内的后台线程；
+drain_queue() 认领到期的邮件，用同一条 SMTP 连接逐封发送，失败按指数退避重试。
+带有效期的邮件（验证码）过期后直接放弃，不再发送一个已经失效的验证码。
+发送成功后立即清空正文（验证码邮件的正文里有明文验证码），已发送和已放弃的行
+保留 MAIL_QUEUE_RETENTION_SECONDS 之后由 prune_mail() 删除，队列空闲时顺带执行。
+也可以设置 MAIL_QUEUE_IN_PROCESS = False，改为单独运行 manage.py run_mail_worker。
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from Djangolearn.background import BackgroundWorker
+from .models import OutboundMail
+
+logger = logging.getLogger(__name__)
+
+# 认领后多久没发完视为进程已退出，允许别的进程重新认领
+SENDING_LEASE = timedelta(minutes=5)
+PRUNE_BATCH_SIZE = 1000
+# 队列空闲时最多每小时清理一次
+PRUNE_INTERVAL = 3600
+_last_prune = None
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=settings.MAIL_QUEUE_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def queue_mail(subject, message, recipient_list, from_email=None, expires_in=None):
+    """代替 send_mail：只入队，立即返回。expires_in（timedelta）：超过这么久还没发出去就放弃"""
+    mail = OutboundMail.objects.create(
+        subject=subject,
+        message=message,
+        from_email=from_email or '',
+        recipients=','.join(recipient_list),
+        expires_at=timezone.now() + expires_in if expires_in else None,
+    )
+    if settings.MAIL_QUEUE_IN_PROCESS:
+        transaction.on_commit(mail_worker.wake)
+    return mail
+
+
+async def aqueue_mail(subject, message, recipient_list, from_email=None, expires_in=None):
+    """queue_mail() 的异步版本：异步视图不在事务里，入队后直接唤醒后台线程"""
+    mail = await OutboundMail.objects.acreate(
+        subject=subject,
+        message=message,
+        from_email=from_email or '',
+        recipients=','.join(recipient_list),
+        expires_at=timezone.now() + expires_in if expires_in else None,
+    )
+    if settings.MAIL_QUEUE_IN_PROCESS:
+        mail_worker.wake()
+    return mail
+
+
+def _claim(mail_id, now):
+    """条件 UPDATE 认领，多进程同时处理时每封邮件只会被一个进程发送"""
+    return OutboundMail.objects.filter(pk=mail_id, status=OutboundMail.STATUS_PENDING).update(
+        status=OutboundMail.STATUS_SENDING,
+        next_attempt_at=now + SENDING_LEASE,
+    ) == 1
+
+
+def _record_failure(mail, error):
+    mail.attempts += 1
+    mail.last_error = str(error)[:2000]
+    if mail.attempts >= settings.MAIL_QUEUE_MAX_ATTEMPTS:
+        mail.status = OutboundMail.STATUS_FAILED
+        logger.error('邮件 %s 发送失败，已放弃：%s', mail.pk, error)
+    else:
+        mail.status = OutboundMail.STATUS_PENDING
+        mail.next_attempt_at = timezone.now() + _retry_delay(mail.attempts)
+        logger.warning('邮件 %s 第 %s 次发送失败，稍后重试：%s', mail.pk, mail.attempts, error)
+    mail.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def _abandon_expired(mail):
+    mail.status = OutboundMail.STATUS_FAILED
+    mail.last_error = '验证码已过期，不再发送'
+    mail.message = ''
+    mail.save(update_fields=['status', 'last_error', 'message'])
+    logger.warning('邮件 %s 已过期，放弃发送', mail.pk)
+
+
+def prune_mail(batch_size=PRUNE_BATCH_SIZE):
+    """删除一批超过保留期的已发送/已放弃邮件，返回删除的条数"""
+    # 这两种状态的 next_attempt_at 停在最后一次认领的租约上，约等于最后处理时间，
+    # 按它筛选正好走 (status, next_attempt_at) 索引
+    cutoff = timezone.now() - timedelta(seconds=settings.MAIL_QUEUE_RETENTION_SECONDS)
+    ids = list(
+        OutboundMail.objects.filter(
+            status__in=[OutboundMail.STATUS_SENT, OutboundMail.STATUS_FAILED], next_attempt_at__lt=cutoff
+        ).values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+    return OutboundMail.objects.filter(pk__in=ids).delete()[0]
+
+
+def _prune_when_idle():
+    global _last_prune
+    if _last_prune is not None and time.monotonic() - _last_prune < PRUNE_INTERVAL:
+        return
+    _last_prune = time.monotonic()
+    deleted = prune_mail()
+    if deleted:
+        logger.info('清理过期邮件记录 %s 条', deleted)
+
+
+def drain_queue(batch_size=50):
+    """发送一批到期邮件，返回本批处理的数量（0 表示队列已空）"""
+    now = timezone.now()
+    # 回收租约过期的“发送中”邮件
+    OutboundMail.objects.filter(status=OutboundMail.STATUS_SENDING, next_attempt_at__lte=now).update(
+        status=OutboundMail.STATUS_PENDING
+    )
+    ids = list(
+        OutboundMail.objects.filter(status=OutboundMail.STATUS_PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'pk')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        _prune_when_idle()
+        return 0
+
+    connection = get_connection(fail_silently=False)
+    opened = False
+    try:
+        for mail_id in ids:
+            if not _claim(mail_id, now):
+                continue
+            mail = OutboundMail.objects.get(pk=mail_id)
+            # 重试退避可能拖过验证码有效期，收到的验证码已经不能用了
+            if mail.expires_at is not None and mail.expires_at <= timezone.now():
+                _abandon_expired(mail)
+                continue
+            try:
+                if not opened:
+                    # 整批只握手一次；出错后下一封重新建立连接
+                    connection.open()
+                    opened = True
+                EmailMessage(
+                    subject=mail.subject,
+                    body=mail.message,
+                    from_email=mail.from_email or None,
+                    to=mail.recipients.split(','),
+                    connection=connection,
+                ).send()
+            except Exception as e:
+                _record_failure(mail, e)
+                connection.close()
+                opened = False
+                continue
+            mail.status = OutboundMail.STATUS_SENT
+            mail.sent_at = timezone.now()
+            # 正文不再需要，验证码不在库里留存
+            mail.message = ''
+            mail.save(update_fields=['status', 'sent_at', 'message'])
+    finally:
+        connection.close()
+    return len(ids)
+
+
+mail_worker = BackgroundWorker('mail-queue', drain_queue, idle_interval=30)
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from BLauth.mailqueue import drain_queue
+
+
+class Command(BaseCommand):
+    help = '发送邮件队列中的邮件（独立进程运行，配合 MAIL_QUEUE_IN_PROCESS = False）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='发完当前到期的邮件就退出')
+        parser.add_argument('--interval', type=float, default=5, help='队列为空时的轮询间隔（秒）')
+        parser.add_argument('--batch-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        while True:
+            handled = drain_queue(batch_size=options['batch_size'])
+            if handled:
+                self.stdout.write(f'处理邮件 {handled} 封')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from BLauth.codes import STORES
+
+
+class Command(BaseCommand):
+    help = '删除过期的验证码（CODE_STORE = db 时使用，可以放进计划任务定时运行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批删除的行数')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            deleted = STORES['db'].sweep(batch_size=options['batch_size'])
+            total += deleted
+            if deleted < options['batch_size']:
+                break
+        self.stdout.write(self.style.SUCCESS(f'已删除过期验证码 {total} 条'))
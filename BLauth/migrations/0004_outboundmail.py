@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BLauth', '0003_alter_captchamodel_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundMail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='主题')),
+                ('message', models.TextField(verbose_name='正文')),
+                ('from_email', models.CharField(blank=True, max_length=254, verbose_name='发件人')),
+                ('recipients', models.TextField(verbose_name='收件人')),
+                ('status', models.CharField(choices=[('pending', '待发送'), ('sending', '发送中'), ('sent', '已发送'), ('failed', '发送失败')], default='pending', max_length=10, verbose_name='状态')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='尝试次数')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='下次尝试时间')),
+                ('last_error', models.TextField(blank=True, verbose_name='最近错误')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='发送时间')),
+            ],
+            options={
+                'verbose_name': '邮件队列',
+                'verbose_name_plural': '邮件队列',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='outbound_mail_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+# auth_user 是 django.contrib.auth 的表，不能在它的模型上声明索引，这里直接建
+EMAIL_INDEX = models.Index(fields=['email'], name='auth_user_email_idx')
+
+
+def add_email_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('auth', 'User'), EMAIL_INDEX)
+
+
+def remove_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('auth', 'User'), EMAIL_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BLauth', '0004_outboundmail'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        # 登录、找回密码、改邮箱都按 email 查用户
+        migrations.RunPython(add_email_index, remove_email_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BLauth', '0005_auth_user_email_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerificationCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purpose', models.CharField(max_length=20, verbose_name='用途')),
+                ('subject', models.CharField(max_length=254, verbose_name='对象')),
+                ('code', models.CharField(max_length=8, verbose_name='验证码')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='过期时间')),
+            ],
+            options={
+                'verbose_name': '验证码',
+                'verbose_name_plural': '验证码',
+            },
+        ),
+        migrations.DeleteModel(
+            name='CaptchaModel',
+        ),
+        migrations.AddConstraint(
+            model_name='verificationcode',
+            constraint=models.UniqueConstraint(fields=('purpose', 'subject'), name='verification_code_uniq'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# 0005 在 auth_user.email 上建的普通索引，查找改走 UserEmail 后不再需要
+EMAIL_INDEX = models.Index(fields=['email'], name='auth_user_email_idx')
+
+
+def fill_user_emails(apps, schema_editor):
+    """按注册先后写入；同一邮箱有多个账号时保留最早的（和原来 filter(email=...).first() 一致）"""
+    User = apps.get_model('auth', 'User')
+    UserEmail = apps.get_model('BLauth', 'UserEmail')
+    seen = set()
+    batch = []
+    for user_id, email in User.objects.exclude(email='').order_by('pk').values_list('pk', 'email').iterator():
+        email = email.strip().lower()
+        if not email or email in seen:
+            continue
+        seen.add(email)
+        batch.append(UserEmail(user_id=user_id, email=email))
+        if len(batch) >= 1000:
+            UserEmail.objects.bulk_create(batch)
+            batch = []
+    UserEmail.objects.bulk_create(batch)
+
+
+def remove_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('auth', 'User'), EMAIL_INDEX)
+
+
+def add_email_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('auth', 'User'), EMAIL_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BLauth', '0006_verificationcode'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserEmail',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='email_index', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+                ('email', models.CharField(max_length=254, unique=True, verbose_name='邮箱（小写）')),
+            ],
+            options={
+                'verbose_name': '用户邮箱索引',
+                'verbose_name_plural': '用户邮箱索引',
+            },
+        ),
+        migrations.RunPython(fill_user_emails, migrations.RunPython.noop),
+        migrations.RunPython(remove_email_index, add_email_index),
+    ]
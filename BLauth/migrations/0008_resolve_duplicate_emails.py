@@ -0,0 +1,33 @@
+import logging
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_duplicate_emails(apps, schema_editor):
+    """
+    0007 只给同一邮箱最早注册的账号写了 UserEmail，后来的重复账号再完整 save() 时
+    （登录更新 last_login 之外的任何保存）会撞唯一索引。这些账号原本就无法用邮箱登录，
+    这里清空它们的邮箱并停用，逐个记日志，需要时由管理员手动改绑
+    """
+    User = apps.get_model('auth', 'User')
+    UserEmail = apps.get_model('BLauth', 'UserEmail')
+    indexed = UserEmail.objects.values('user_id')
+    duplicates = User.objects.exclude(email='').exclude(pk__in=indexed).order_by('pk')
+    for user_id, username, email in duplicates.values_list('pk', 'username', 'email').iterator():
+        if not email.strip():
+            continue
+        logger.warning('账号 %s（ID %s）的邮箱 %s 已被更早的账号使用，已清空邮箱并停用', username, user_id, email)
+        User.objects.filter(pk=user_id).update(email='', is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BLauth', '0007_useremail'),
+    ]
+
+    operations = [
+        migrations.RunPython(resolve_duplicate_emails, migrations.RunPython.noop),
+    ]
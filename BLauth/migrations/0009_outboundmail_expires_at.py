@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BLauth', '0008_resolve_duplicate_emails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundmail',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='过期时间'),
+        ),
+    ]
@@ -1,10 +1,80 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-class CaptchaModel(models.Model):
-    email = models.EmailField(unique=True)
-    captcha = models.CharField(max_length=4)
-    # 修复：auto_now=True 每次保存都会更新时间
-    create_time = models.DateTimeField(auto_now=True)  
+
+def normalize_email(email):
+    """登录、注册、查重统一用的邮箱形式：去掉首尾空白、全部小写"""
+    return (email or '').strip().lower()
+
+
+class UserEmail(models.Model):
+    """
+    auth_user.email 的唯一索引表（auth_user 是 Django 自带的表，不能直接加唯一约束）。
+    保存用户时由信号同步，按邮箱登录和查重都查这张表
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                related_name='email_index', verbose_name='用户')
+    email = models.CharField(max_length=254, unique=True, verbose_name='邮箱（小写）')
+
+    def __str__(self):
+        return self.email
+
+    class Meta:
+        verbose_name = '用户邮箱索引'
+        verbose_name_plural = verbose_name
+
+
+class VerificationCode(models.Model):
+    """DatabaseCodeStore 的存储：每个 (用途, 对象) 只保留最新的一个验证码，过期行由清理线程批量删除"""
+    purpose = models.CharField(max_length=20, verbose_name='用途')
+    subject = models.CharField(max_length=254, verbose_name='对象')  # 邮箱或用户ID
+    code = models.CharField(max_length=8, verbose_name='验证码')
+    expires_at = models.DateTimeField(db_index=True, verbose_name='过期时间')
+
+    def __str__(self):
+        return f'{self.purpose}:{self.subject}'
+
+    class Meta:
+        verbose_name = '验证码'
+        verbose_name_plural = verbose_name
+        constraints = [
+            models.UniqueConstraint(fields=['purpose', 'subject'], name='verification_code_uniq'),
+        ]
+
+class OutboundMail(models.Model):
+    """待发邮件队列：请求里只入队，由后台线程/run_mail_worker 复用一条 SMTP 连接批量发送"""
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '待发送'),
+        (STATUS_SENDING, '发送中'),
+        (STATUS_SENT, '已发送'),
+        (STATUS_FAILED, '发送失败'),
+    ]
+
+    subject = models.CharField(max_length=255, verbose_name='主题')
+    message = models.TextField(verbose_name='正文')
+    from_email = models.CharField(max_length=254, blank=True, verbose_name='发件人')
+    recipients = models.TextField(verbose_name='收件人')  # 逗号分隔
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name='状态')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='尝试次数')
+    # 待发送：最早可发送时间；发送中：认领租约到期时间（进程中途退出后可被重新认领）
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name='下次尝试时间')
+    last_error = models.TextField(blank=True, verbose_name='最近错误')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='发送时间')
+    # 验证码邮件：过了验证码的有效期还没发出去就不再发送
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name='过期时间')
+
+    def __str__(self):
+        return self.subject
 
     class Meta:
-        ordering = ['-create_time']  # 按时间倒序，优先取最新验证码
\ No newline at end of file
+        verbose_name = '邮件队列'
+        verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_mail_due_idx'),
+        ]
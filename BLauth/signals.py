@@ -0,0 +1,23 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .backends import forget_missing_email
+from .models import UserEmail, normalize_email
+
+
+@receiver(post_save, sender=get_user_model())
+def sync_email_index(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """
+    用户的邮箱写入 UserEmail 唯一索引；邮箱已被别人占用时抛 IntegrityError，
+    调用方放在事务里即可整体回滚。只更新 last_login、password 等字段时跳过
+    """
+    if raw or (update_fields is not None and 'email' not in update_fields):
+        return
+    email = normalize_email(instance.email)
+    if not email:
+        UserEmail.objects.filter(user=instance).delete()
+        return
+    if created or not UserEmail.objects.filter(user=instance).update(email=email):
+        UserEmail.objects.create(user=instance, email=email)
+    forget_missing_email(email)
@@ -1,3 +1,211 @@
-from django.test import TestCase
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from smtplib import SMTPException
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from Djangolearn.flash import FLASH_COOKIE
+from .codes import FORGOT_PASSWORD, REGISTER, STORES
+from .mailqueue import _claim, drain_queue, prune_mail, queue_mail
+from .models import OutboundMail, UserEmail, VerificationCode
+
+User = get_user_model()
+
+
+@override_settings(CODE_STORE_SWEEP_IN_PROCESS=False)
+class CodeStoreTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_codes_are_single_use_and_overwritten(self):
+        for name, store in STORES.items():
+            with self.subTest(store=name):
+                store.issue(REGISTER, 'a@qq.com', '1111')
+                store.issue(REGISTER, 'a@qq.com', '2222')
+                self.assertFalse(store.check(REGISTER, 'a@qq.com', '1111'))
+                self.assertFalse(store.consume(REGISTER, 'a@qq.com', '9999'))
+                self.assertTrue(store.consume(REGISTER, 'a@qq.com', '2222'))
+                self.assertFalse(store.consume(REGISTER, 'a@qq.com', '2222'))
+                self.assertIsNone(store.get(REGISTER, 'a@qq.com'))
+
+    def test_expired_database_codes_are_invisible_and_swept(self):
+        store = STORES['db']
+        store.issue(REGISTER, 'old@qq.com', '1234')
+        store.issue(REGISTER, 'new@qq.com', '5678')
+        VerificationCode.objects.filter(subject='old@qq.com').update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertIsNone(store.get(REGISTER, 'old@qq.com'))
+        self.assertFalse(store.consume(REGISTER, 'old@qq.com', '1234'))
+        call_command('sweep_codes', verbosity=0, stdout=StringIO())
+        self.assertEqual(list(VerificationCode.objects.values_list('subject', flat=True)), ['new@qq.com'])
+
+    @override_settings(CODE_STORE='cache')
+    def test_forgot_password_code_round_trip(self):
+        self.assertEqual(
+            self.client.get(reverse('BLauth:verify_forgot_captcha'), {'email': 'b@qq.com', 'captcha': '1234'}).json()['code'],
+            400,
+        )
+        STORES['cache'].issue(FORGOT_PASSWORD, 'b@qq.com', '1234')
+        self.assertEqual(
+            self.client.get(reverse('BLauth:verify_forgot_captcha'), {'email': 'b@qq.com', 'captcha': '1234'}).json()['code'],
+            200,
+        )
+
+
+@override_settings(RATELIMIT_ENABLE=False)
+class AnonymousSessionWriteTests(TestCase):
+
+    def test_login_flash_uses_signed_cookie(self):
+        response = self.client.post(reverse('BLauth:login'), {'email': 'nobody@qq.com', 'password': 'wrong-pass'})
+        self.assertIn(FLASH_COOKIE, response.cookies)
+        response = self.client.get(reverse('BLauth:login'))
+        self.assertContains(response, '邮箱或密码错误')
+        self.assertEqual(response.context['prev_email'], 'nobody@qq.com')
+        # 读过一次就删除
+        self.assertEqual(response.cookies[FLASH_COOKIE].value, '')
+        self.assertNotContains(self.client.get(reverse('BLauth:login')), '邮箱或密码错误')
+        self.assertFalse(Session.objects.exists())
+
+    def test_login_required_message_and_reads_do_not_create_sessions(self):
+        self.client.get(reverse('blog:blog_edit'))
+        self.assertContains(self.client.get(reverse('BLauth:login')), '请先登录！')
+        self.client.get(reverse('blog:index'))
+        self.assertFalse(Session.objects.exists())
+
+        User.objects.create_user(username='u', email='u@qq.com', password='pass123456')
+        self.client.post(reverse('BLauth:login'), {'email': 'u@qq.com', 'password': 'pass123456'})
+        self.assertEqual(Session.objects.count(), 1)
+
+
+class EmailBackendTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u', email='Mixed@QQ.com', password='pass123456')
+
+    def test_normalized_unique_email_index(self):
+        self.assertEqual(UserEmail.objects.get(user=self.user).email, 'mixed@qq.com')
+        self.assertEqual(authenticate(email=' mixed@qq.COM', password='pass123456'), self.user)
+        self.assertIsNone(authenticate(email='mixed@qq.com', password='wrong'))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='u2', email='mixed@qq.com', password='pass123456')
+
+    def test_missing_email_is_cached_until_registered(self):
+        self.assertIsNone(authenticate(email='new@qq.com', password='pass123456'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(authenticate(email='new@qq.com', password='pass123456'))
+        user = User.objects.create_user(username='new', email='new@qq.com', password='pass123456')
+        self.assertEqual(authenticate(email='new@qq.com', password='pass123456'), user)
+
+    def test_password_hash_upgraded_on_login(self):
+        with override_settings(PASSWORD_HASHERS=[
+            'django.contrib.auth.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher',
+        ]):
+            response = self.client.post(reverse('BLauth:login'), {'email': 'mixed@qq.com', 'password': 'pass123456'})
+        self.assertRedirects(response, '/index', fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+
+
+class DuplicateEmailMigrationTests(TestCase):
+
+    def test_later_duplicates_are_cleared_and_deactivated(self):
+        first = User.objects.create_user(username='first', email='dup@qq.com', password='pass123456')
+        # 0007 之前的重复账号：绕过信号直接插入
+        User.objects.bulk_create([User(username='later', email='DUP@qq.com', password='x')])
+        migration = import_module('BLauth.migrations.0008_resolve_duplicate_emails')
+        with self.assertLogs(migration.__name__, 'WARNING'):
+            migration.resolve_duplicate_emails(django_apps, None)
+
+        later = User.objects.get(username='later')
+        self.assertEqual((later.email, later.is_active), ('', False))
+        # 之后完整保存不再撞唯一索引
+        later.save()
+        first.refresh_from_db()
+        self.assertEqual((first.email, first.is_active), ('dup@qq.com', True))
+
+
+class FailingBackend(BaseEmailBackend):
+    """每次发送都抛异常的邮件后端"""
+
+    def send_messages(self, email_messages):
+        raise SMTPException('连接被拒绝')
+
+
+@override_settings(MAIL_QUEUE_IN_PROCESS=False, EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class MailQueueTests(TestCase):
+
+    def queue(self, **kwargs):
+        return OutboundMail.objects.create(subject='验证码', message='您的验证码是 123456', recipients='a@qq.com', **kwargs)
+
+    def test_sent_once_and_body_cleared(self):
+        mail_row = self.queue()
+        self.assertEqual(drain_queue(), 1)
+        self.assertEqual(drain_queue(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('123456', mail.outbox[0].body)
+        mail_row.refresh_from_db()
+        self.assertEqual(mail_row.status, OutboundMail.STATUS_SENT)
+        self.assertEqual(mail_row.message, '')
+        # 已被认领的邮件不会再被认领
+        self.assertFalse(_claim(mail_row.pk, timezone.now()))
+
+    @override_settings(EMAIL_BACKEND='BLauth.tests.FailingBackend', MAIL_QUEUE_MAX_ATTEMPTS=2)
+    def test_failure_backs_off_then_gives_up(self):
+        mail_row = self.queue()
+        before = timezone.now()
+        drain_queue()
+        mail_row.refresh_from_db()
+        self.assertEqual((mail_row.status, mail_row.attempts), (OutboundMail.STATUS_PENDING, 1))
+        self.assertIn('连接被拒绝', mail_row.last_error)
+        self.assertGreaterEqual(mail_row.next_attempt_at, before + timedelta(seconds=30))
+        # 没到重试时间不会再发
+        self.assertEqual(drain_queue(), 0)
+
+        OutboundMail.objects.filter(pk=mail_row.pk).update(next_attempt_at=timezone.now())
+        drain_queue()
+        mail_row.refresh_from_db()
+        self.assertEqual((mail_row.status, mail_row.attempts), (OutboundMail.STATUS_FAILED, 2))
+        self.assertEqual(drain_queue(), 0)
+
+    def test_expired_code_mail_is_abandoned(self):
+        # 退避重试拖过了验证码有效期
+        expired = self.queue(attempts=2, expires_at=timezone.now() - timedelta(seconds=1))
+        fresh = queue_mail('验证码', '您的验证码是 654321', ['b@qq.com'], expires_in=timedelta(minutes=5))
+        self.assertEqual(drain_queue(), 2)
+        self.assertEqual([m.to for m in mail.outbox], [['b@qq.com']])
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, OutboundMail.STATUS_FAILED)
+        self.assertEqual(expired.message, '')
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, OutboundMail.STATUS_SENT)
+
+    def test_stale_sending_is_requeued(self):
+        stuck = self.queue(status=OutboundMail.STATUS_SENDING, next_attempt_at=timezone.now() - timedelta(seconds=1))
+        leased = self.queue(status=OutboundMail.STATUS_SENDING, next_attempt_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(drain_queue(), 1)
+        stuck.refresh_from_db()
+        leased.refresh_from_db()
+        self.assertEqual(stuck.status, OutboundMail.STATUS_SENT)
+        self.assertEqual(leased.status, OutboundMail.STATUS_SENDING)
+
+    def test_prune_keeps_pending_and_recent_rows(self):
+        old = timezone.now() - timedelta(days=8)
+        self.queue(status=OutboundMail.STATUS_SENT, next_attempt_at=old)
+        self.queue(status=OutboundMail.STATUS_FAILED, next_attempt_at=old)
+        pending = self.queue(next_attempt_at=old)
+        recent = self.queue(status=OutboundMail.STATUS_SENT)
+        self.assertEqual(prune_mail(), 2)
+        self.assertEqual(set(OutboundMail.objects.values_list('pk', flat=True)), {pending.pk, recent.pk})
@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# ASGI 模式下发送验证码换成异步视图
+senders = async_views if settings.ASGI_MODE else views
 
 app_name = 'BLauth'
 
@@ -7,9 +11,11 @@ urlpatterns = [
     path('login', views.BLlogin, name='login'),
     path('logout', views.BLlogout, name='logout'),
     path('register', views.register, name='register'),
-    path('captcha', views.send_email_captcha, name='captcha'),
+    path('captcha', senders.send_email_captcha, name='captcha'),
     path('forgot-password', views.forgot_password, name='forgot_password'),
-    path('send-forgot-captcha', views.send_forgot_captcha, name='send_forgot_captcha'),
+    path('send-forgot-captcha', senders.send_forgot_captcha, name='send_forgot_captcha'),
     path('verify-forgot-captcha', views.verify_forgot_captcha, name='verify_forgot_captcha'),
     path('reset-password', views.reset_password, name='reset_password'),
+    # 整页缓存页面里的导航栏和 CSRF token
+    path('widgets', views.user_widgets, name='widgets'),
 ]
\ No newline at end of file
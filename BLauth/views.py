@@ -2,16 +2,22 @@ from django.shortcuts import render,redirect
 from django.http.response import JsonResponse
 import random
 import string
-from django.core.mail import send_mail
-from .models import CaptchaModel
+from .mailqueue import queue_mail
+from .backends import email_in_use, find_user_by_email
+from .codes import FORGOT_PASSWORD, REGISTER, TTL, get_code_store
 from django.views.decorators.http import require_http_methods
+from django.views.decorators.cache import never_cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
 from .forms import RegisterForm,LoginForm
-from django.contrib.auth import get_user_model,login,logout
+from django.contrib.auth import authenticate,get_user_model,login,logout
+from django.db import IntegrityError, transaction
 from django.urls import reverse
 import json
-import smtplib
 from django_ratelimit.decorators import ratelimit
 
+from Djangolearn.flash import clear_flash, read_flash, set_flash
+
 User = get_user_model()
 
 
@@ -33,22 +39,22 @@ from django.contrib import messages
 @login_required_redirect
 def BLlogin(request):
     if request.method == 'GET':
+        # 一次性提示放在签名 Cookie 里，匿名访问不产生 session 写入
+        flash = read_flash(request)
         context = {
-            'login_error': request.session.pop('login_error', False),
-            'prev_email': request.session.pop('prev_email', ''),
-            'empty_error': request.session.pop('empty_error', False),
-            'register_success': request.session.pop('register_success', False),
+            'login_error': flash.get('login_error', False),
+            'prev_email': flash.get('prev_email', ''),
+            'empty_error': flash.get('empty_error', False),
+            'register_success': flash.get('register_success', False),
         }
-        return render(request, 'login.html', context)
+        response = render(request, 'login.html', context)
+        return clear_flash(response) if flash else response
     else:
         email = request.POST.get('email', '').strip()
         password = request.POST.get('password', '').strip()
 
         if not email or not password:
-            request.session['empty_error'] = True
-            request.session['prev_email'] = email
-            request.session.set_expiry(5)
-            return redirect(reverse('BLauth:login'))
+            return set_flash(redirect(reverse('BLauth:login')), empty_error=True, prev_email=email)
 
         form = LoginForm(request.POST)
         if form.is_valid():
@@ -56,16 +62,14 @@ def BLlogin(request):
             password = form.cleaned_data['password']
             remember_me = form.cleaned_data['remember_me']
 
-            user = User.objects.filter(email=email).first()
-            if user and user.check_password(password):
+            # 按邮箱唯一索引查用户，停用（已注销）的账号返回 None；旧密码哈希登录成功时自动升级
+            user = authenticate(request, email=email, password=password)
+            if user is not None:
                 login(request, user)
                 request.session.set_expiry(0 if not remember_me else 60 * 60 * 24 * 7)
                 return redirect('/index')
 
-        request.session['login_error'] = True
-        request.session['prev_email'] = email
-        request.session.set_expiry(5)
-        return redirect(reverse('BLauth:login'))
+        return set_flash(redirect(reverse('BLauth:login')), login_error=True, prev_email=email)
 
 def BLlogout(request):
     logout(request)
@@ -87,13 +91,18 @@ def register(request):
 
 
 
-            user = User.objects.create_user(username=username, email=email, password=password)
+            try:
+                with transaction.atomic():
+                    user = User.objects.create_user(username=username, email=email, password=password)
+            except IntegrityError:
+                # 同一邮箱并发注册，后到的被邮箱唯一索引拦下
+                form.add_error('email', '该邮箱已注册，请直接登录！')
+                return render(request, 'register.html', {'form': form})
+            get_code_store().discard(REGISTER, email)
 
 
 
-            request.session['register_success'] = True
-            request.session.set_expiry(5)
-            return redirect(reverse('BLauth:login'))
+            return set_flash(redirect(reverse('BLauth:login')), register_success=True)
         else:
             return render(request, 'register.html', {'form': form})
 
@@ -108,37 +117,24 @@ def captcha(request):
         return JsonResponse({'code': 400, 'message': '仅支持QQ邮箱！'})
 
     # 校验邮箱是否已注册
-    if User.objects.filter(email=email).exists():
+    if email_in_use(email):
         return JsonResponse({'code': 400, 'message': '该邮箱已注册，请直接登录！'})
 
     # 生成4位数字验证码
     captcha_code = ''.join(random.choices(string.digits, k=4))
 
-    # 更新/创建验证码记录
-    CaptchaModel.objects.update_or_create(
-        email=email,
-        defaults={'captcha': captcha_code}
-    )
+    # 覆盖该邮箱之前的验证码，6分钟后自动过期
+    get_code_store().issue(REGISTER, email, captcha_code)
 
-    # 发送邮件（精准捕获异常）
-    try:
-        send_mail(
-            subject='注册验证码',
-            message=f'您的注册验证码是：{captcha_code}（有效期6分钟）',
-            from_email='2839788640@qq.com',  # 你的发件邮箱
-            recipient_list=[email],
-            fail_silently=False,
-        )
-        return JsonResponse({'code': 200, 'message': '验证码已发送至您的QQ邮箱！（有效期6分钟）'})
-    except smtplib.SMTPDataError as e:
-        # 捕获“无效收件人”异常
-        if 'non-existent account' in str(e) or '550' in str(e):
-            return JsonResponse({'code': 400, 'message': '该QQ邮箱不存在，请检查邮箱地址！'})
-        else:
-            return JsonResponse({'code': 500, 'message': '验证码发送失败，请稍后再试！'})
-    except Exception as e:
-        print(f'邮件发送其他错误：{e}')
-        return JsonResponse({'code': 500, 'message': '验证码发送失败，请稍后再试！'})
+    # 邮件进入队列由后台发送，请求不再等待 SMTP
+    queue_mail(
+        subject='注册验证码',
+        message=f'您的注册验证码是：{captcha_code}（有效期6分钟）',
+        from_email='2839788640@qq.com',  # 你的发件邮箱
+        recipient_list=[email],
+        expires_in=TTL[REGISTER],
+    )
+    return JsonResponse({'code': 200, 'message': '验证码已发送至您的QQ邮箱！（有效期6分钟）'})
 
 
 
@@ -148,8 +144,8 @@ def send_email_captcha(request):
     if not email:
         return JsonResponse({'code':400,'message':'必须传递邮箱！'})
     captcha = ''.join(random.sample(string.digits,4))
-    CaptchaModel.objects.update_or_create(email=email,defaults={'captcha':captcha})
-    send_mail('BL博客注册验证码',message=f'您的注册验证码是：{captcha}',recipient_list=[email],from_email=None)
+    get_code_store().issue(REGISTER, email, captcha)
+    queue_mail('BL博客注册验证码',message=f'您的注册验证码是：{captcha}',recipient_list=[email],from_email=None,expires_in=TTL[REGISTER])
     return JsonResponse({'code':200,'message':'邮箱验证码发送成功！'})
 
 
@@ -168,17 +164,18 @@ def send_forgot_captcha(request):
     if not email:
         return JsonResponse({'code': 400, 'message': '必须传递邮箱！'})
     # 检查邮箱是否已注册
-    if not User.objects.filter(email=email).exists():
+    if not email_in_use(email):
         return JsonResponse({'code': 400, 'message': '该邮箱未注册！'})
-    # 生成并保存验证码（时间自动更新）
+    # 生成并保存验证码（6分钟后自动过期）
     captcha = ''.join(random.sample(string.digits, 4))
-    CaptchaModel.objects.update_or_create(email=email, defaults={'captcha': captcha})
-    # 发送邮件
-    send_mail(
+    get_code_store().issue(FORGOT_PASSWORD, email, captcha)
+    # 发送邮件（入队）
+    queue_mail(
         'BL博客忘记密码验证码',
         message=f'您的忘记密码验证码是：{captcha}（有效期6分钟）',
         recipient_list=[email],
-        from_email='你的QQ邮箱@qq.com'  # 替换为实际发件邮箱
+        from_email='你的QQ邮箱@qq.com',  # 替换为实际发件邮箱
+        expires_in=TTL[FORGOT_PASSWORD],
     )
     return JsonResponse({'code': 200, 'message': '验证码已发送至邮箱！（有效期6分钟）'})
 
@@ -189,12 +186,9 @@ def verify_forgot_captcha(request):
     captcha = request.GET.get('captcha')
     if not (email and captcha):
         return JsonResponse({'code': 400, 'message': '邮箱和验证码不能为空！'})
-    # 验证验证码
-    captcha_model = CaptchaModel.objects.filter(email=email, captcha=captcha).first()
-    if not captcha_model:
-        return JsonResponse({'code': 400, 'message': '验证码错误！'})
-    # 验证通过，删除验证码（避免重复使用）
-    captcha_model.delete()
+    # 验证通过即删除验证码（避免重复使用）；过期的验证码已不存在
+    if not get_code_store().consume(FORGOT_PASSWORD, email, captcha):
+        return JsonResponse({'code': 400, 'message': '验证码错误或已过期！'})
     return JsonResponse({'code': 200, 'message': '验证码验证成功！'})
 
 
@@ -209,7 +203,7 @@ def reset_password(request):
         if not (email and new_password):
             return JsonResponse({'code': 400, 'message': '参数不全！'})
 
-        user = User.objects.filter(email=email).first()
+        user = find_user_by_email(email)
         if not user:
             return JsonResponse({'code': 400, 'message': '用户不存在！'})
 
@@ -219,4 +213,15 @@ def reset_password(request):
 
         return JsonResponse({'code': 200, 'message': '密码重置成功！'})
     except Exception as e:
-        return JsonResponse({'code': 500, 'message': f'服务器错误：{str(e)}'})
\ No newline at end of file
+        return JsonResponse({'code': 500, 'message': f'服务器错误：{str(e)}'})
+
+@require_http_methods(['GET'])
+@never_cache
+def user_widgets(request):
+    """整页缓存的页面里按访客变化的部分（见 blog/pagecache.py）：登录后的导航栏和 CSRF token"""
+    navbar = render_to_string('navbar_user.html', request=request) if request.user.is_authenticated else ''
+    return JsonResponse({
+        'authenticated': request.user.is_authenticated,
+        'navbar': navbar,
+        'csrf_token': get_token(request),
+    })
@@ -3,6 +3,10 @@ ASGI config for Djangolearn project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+用 uvicorn 启动时默认打开 ASGI_MODE，读接口和发送验证码走异步视图：
+    uvicorn Djangolearn.asgi:application --workers 4 --limit-concurrency 200
+--limit-concurrency 限制单个进程同时处理的连接数，超出直接返回 503，避免数据库连接被占满。
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +16,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Djangolearn.settings')
+os.environ.setdefault('ASGI_MODE', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,71 @@
+"""
+进程内的轻量后台线程。
+
+waitress 只有固定数量的工作线程，耗时的 I/O（发邮件等）放进后台线程处理，
+请求线程只负责把任务写进队列表后 wake() 一下就返回。
+多个进程各自有一个后台线程，任务的认领由各队列自己用条件 UPDATE 保证不重复。
+服务进程启动时各 app 的 ready() 用 serving_requests() 判断后 start() 一次，
+重启前留下的到期任务、租约过期的任务不用等下一次入队就会接着处理。
+"""
+import logging
+import os
+import sys
+import threading
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+MANAGE_SCRIPTS = ('manage.py', 'django-admin', 'django-admin.py')
+
+
+def serving_requests():
+    """
+    当前进程是否是处理请求的服务进程（waitress、uvicorn 的 worker、runserver 的子进程）。
+    其他管理命令（migrate、test 等）和 runserver 自动重载的父进程不启动后台线程
+    """
+    argv = sys.argv or ['']
+    if os.path.basename(argv[0]) not in MANAGE_SCRIPTS:
+        return True
+    if len(argv) < 2 or argv[1] != 'runserver':
+        return False
+    return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in argv
+
+
+class BackgroundWorker:
+
+    def __init__(self, name, handler, idle_interval=30):
+        """
+        handler()：处理一批任务，返回真值表示可能还有任务，会立刻再调用一次；
+        否则休眠 idle_interval 秒或直到 wake()
+        """
+        self.name = name
+        self.handler = handler
+        self.idle_interval = idle_interval
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._event.set()
+
+    def _run(self):
+        while True:
+            busy = False
+            close_old_connections()
+            try:
+                busy = self.handler()
+            except Exception:
+                logger.exception('后台任务 %s 执行失败', self.name)
+            finally:
+                close_old_connections()
+            if not busy:
+                self._event.wait(self.idle_interval)
+                self._event.clear()
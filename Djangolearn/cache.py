@@ -0,0 +1,174 @@
+"""
+多进程共享的本机缓存后端。
+
+LocMemCache 每个 waitress 进程各存一份，限流计数和各种缓存在进程之间互不相通。
+SQLiteCache 把数据放在同一台机器上的一个 SQLite 文件里（WAL 模式），
+add / incr 在 BEGIN IMMEDIATE 事务里完成，跨进程也是原子的，django_ratelimit 可以直接使用。
+
+多台机器部署时改用 Redis（见 settings.CACHES，Django 自带 RedisCache 适配器）。
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    # 平均每多少次写入顺带清理一次过期数据
+    cull_every = 100
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = str(location)
+        self._local = threading.local()
+
+    # ---------- 连接 ----------
+
+    def _connection(self):
+        # 每个线程一条连接；fork 出来的子进程重新建连接
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self._path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache_entry ('
+            ' key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_entry_expires ON cache_entry (expires)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self):
+        return _Immediate(self._connection())
+
+    # ---------- 编码 ----------
+
+    def _encode(self, value):
+        # 整数原样存，incr 才能在 SQL 里直接加；其他类型 pickle
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _expiry(self, timeout):
+        # get_backend_timeout 返回的是绝对过期时间戳，None 表示永不过期
+        return self.get_backend_timeout(timeout)
+
+    # ---------- BaseCache 接口 ----------
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM cache_entry WHERE key = ? AND expires <= ?', (key, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO cache_entry (key, value, expires) VALUES (?, ?, ?)',
+                (key, self._encode(value), self._expiry(timeout)),
+            )
+            return cursor.rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'SELECT value FROM cache_entry WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return default if row is None else self._decode(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache_entry (key, value, expires) VALUES (?, ?, ?)',
+            (key, self._encode(value), self._expiry(timeout)),
+        )
+        self._maybe_cull()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            'UPDATE cache_entry SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._expiry(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute('DELETE FROM cache_entry WHERE key = ?', (key,))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache_entry WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE cache_entry SET value = value + ? "
+                "WHERE key = ? AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?)",
+                (delta, key, time.time()),
+            )
+            if cursor.rowcount == 0:
+                raise ValueError("Key '%s' not found" % key)
+            return conn.execute('SELECT value FROM cache_entry WHERE key = ?', (key,)).fetchone()[0]
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entry')
+
+    def close(self, **kwargs):
+        # 连接按线程复用，请求结束时不关闭
+        pass
+
+    # ---------- 清理 ----------
+
+    def _maybe_cull(self):
+        if random.randrange(self.cull_every) == 0:
+            self.cull()
+
+    def cull(self):
+        """删除过期数据；条目仍超过 MAX_ENTRIES 时按过期时间淘汰一部分"""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM cache_entry WHERE expires <= ?', (time.time(),))
+            count = conn.execute('SELECT COUNT(*) FROM cache_entry').fetchone()[0]
+            if count > self._max_entries:
+                doomed = count // self._cull_frequency if self._cull_frequency else count
+                conn.execute(
+                    'DELETE FROM cache_entry WHERE key IN ('
+                    ' SELECT key FROM cache_entry ORDER BY expires IS NULL, expires LIMIT ?)',
+                    (doomed,),
+                )
+
+
+class _Immediate:
+    """BEGIN IMMEDIATE 事务：一开始就拿写锁，保证读-改-写跨进程原子"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
@@ -0,0 +1,186 @@
+"""
+生产环境的文件下发：强 ETag / Last-Modified、304、单段 Range 请求，
+整文件用 FileResponse 交给 WSGI 服务器的 file_wrapper（可以走 sendfile），
+配置了前置代理内部路径时直接用 X-Accel-Redirect 交给 nginx 发送。
+传入 encodings 时按 Accept-Encoding 挑选预先压缩好的 .br / .gz 副本。
+"""
+import mimetypes
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotAllowed, HttpResponseNotModified, StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def resolve_path(document_root, path):
+    """把 URL 路径映射到 document_root 下的文件，越界或不存在都返回 404"""
+    try:
+        fullpath = Path(safe_join(document_root, path))
+    except SuspiciousFileOperation:
+        raise Http404('文件不存在')
+    if not fullpath.is_file():
+        raise Http404('文件不存在')
+    return fullpath
+
+
+def file_etag(stat):
+    # 修改时间(纳秒)+大小，文件内容变了两者至少有一个会变
+    return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+
+def accepted_encodings(request):
+    """解析 Accept-Encoding，返回 {编码: q 值}"""
+    accepted = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(request, fullpath, encodings):
+    """
+    encodings 是按优先顺序排列的 [(编码, 文件后缀)]。
+    返回 (实际发送的文件, 编码或 None, 是否存在压缩副本)，后者决定要不要带 Vary
+    """
+    accepted = accepted_encodings(request)
+    varies = False
+    for coding, suffix in encodings:
+        candidate = fullpath.with_name(fullpath.name + suffix)
+        if not candidate.is_file():
+            continue
+        varies = True
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return candidate, coding, True
+    return fullpath, None, varies
+
+
+def is_not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag in etags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def parse_range(request, size, etag, mtime):
+    """
+    只支持单段 Range。返回 (start, end)；不带 Range、If-Range 不匹配、
+    或多段 Range 时返回 None（按 RFC 回落为整文件）；无法满足时返回 False
+    """
+    header = request.META.get('HTTP_RANGE')
+    if not header:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range:
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            if if_range != etag:
+                return None
+        elif parse_http_date_safe(if_range) != int(mtime):
+            return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N：最后 N 个字节
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, path, document_root, cache_control='public, max-age=0', accel_prefix='', encodings=()):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    fullpath = resolve_path(document_root, path)
+    content_type, _ = mimetypes.guess_type(str(fullpath))
+    content_type = content_type or 'application/octet-stream'
+
+    filename = fullpath.name
+    coding, varies = None, False
+    if encodings:
+        sent_path, coding, varies = negotiate_encoding(request, fullpath, encodings)
+        if coding:
+            path = path + sent_path.name[len(fullpath.name):]
+            fullpath = sent_path
+
+    # 不同编码的副本各自的 mtime 和大小不同，ETag 自然也不同
+    stat = fullpath.stat()
+    etag = file_etag(stat)
+    mtime = stat.st_mtime
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(mtime),
+        'Cache-Control': cache_control,
+    }
+    if varies:
+        headers['Vary'] = 'Accept-Encoding'
+
+    if is_not_modified(request, etag, mtime):
+        response = HttpResponseNotModified()
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    if accel_prefix:
+        # 交给 nginx 的 internal location 发送（它自己处理 Range），Django 只给校验头
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(path.lstrip('/'))
+    else:
+        byte_range = parse_range(request, stat.st_size, etag, mtime)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%d' % stat.st_size
+            return response
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(_read_range(fullpath, start, length), status=206, content_type=content_type)
+            response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, stat.st_size)
+            response['Content-Length'] = str(length)
+        else:
+            response = FileResponse(fullpath.open('rb'), content_type=content_type, filename=filename)
+        response['Accept-Ranges'] = 'bytes'
+
+    if coding:
+        response['Content-Encoding'] = coding
+    for name, value in headers.items():
+        response[name] = value
+    return response
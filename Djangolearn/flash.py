@@ -0,0 +1,38 @@
+"""
+一次性提示标记（登录失败、注册成功等），放在签名 Cookie 里而不是 session 里。
+
+匿名用户只是为了看一次提示就会在 django_session 里新建/更新一行；
+签名 Cookie 不落库，内容不能被篡改，读过一次就删除。
+"""
+import json
+
+from django.conf import settings
+from django.core import signing
+
+FLASH_COOKIE = 'flash'
+FLASH_SALT = 'Djangolearn.flash'
+# 只在紧接着的那次跳转里使用，过期时间给够慢速网络即可
+FLASH_MAX_AGE = 60
+
+
+def set_flash(response, **flags):
+    response.set_signed_cookie(
+        FLASH_COOKIE, json.dumps(flags), salt=FLASH_SALT, max_age=FLASH_MAX_AGE,
+        secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+    )
+    return response
+
+
+def read_flash(request):
+    """取出标记，没有或签名无效时返回空字典；渲染后要用 clear_flash 删掉 Cookie"""
+    try:
+        value = request.get_signed_cookie(FLASH_COOKIE, salt=FLASH_SALT, max_age=FLASH_MAX_AGE)
+        flags = json.loads(value)
+    except (KeyError, signing.BadSignature, ValueError):
+        return {}
+    return flags if isinstance(flags, dict) else {}
+
+
+def clear_flash(response):
+    response.delete_cookie(FLASH_COOKIE, samesite='Lax')
+    return response
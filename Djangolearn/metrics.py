@@ -0,0 +1,219 @@
+"""
+请求级别的性能统计：每个视图的 SQL 条数、SQL 耗时、模板渲染耗时和总耗时，
+记进进程内的直方图，/metrics 以 Prometheus 文本格式输出（只给 staff）。
+
+超过 settings.REQUEST_BUDGETS 里的预算时记一条 warning；
+REQUEST_BUDGET_STRICT = True（测试里用）时 SQL 条数超预算直接抛 BudgetExceeded，让用例失败。
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template as BackendTemplate
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# 当前请求的统计，SQL 和模板渲染计时通过它找到所属请求。
+# contextvar 会跟着 sync_to_async 进入执行 ORM 的线程，ASGI 下异步视图的查询也能算到请求头上
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class BudgetExceeded(AssertionError):
+    pass
+
+
+class Histogram:
+    """累积直方图，桶的含义和 Prometheus 一致（le = 小于等于）"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, n in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += n
+            yield bound, total
+
+
+class Registry:
+    # {指标名: (说明, 桶)}
+    METRICS = {
+        'request_duration_seconds': ('请求总耗时', DURATION_BUCKETS),
+        'request_sql_queries': ('每个请求的 SQL 条数', QUERY_BUCKETS),
+        'request_sql_seconds': ('每个请求的 SQL 总耗时', DURATION_BUCKETS),
+        'request_template_seconds': ('每个请求的模板渲染耗时', DURATION_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, view, values):
+        with self._lock:
+            for name, value in values.items():
+                key = (name, view)
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(self.METRICS[name][1])
+                self._histograms[key].observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        """Prometheus 文本格式"""
+        with self._lock:
+            lines = []
+            for name, (help_text, _) in self.METRICS.items():
+                full_name = f'django_{name}'
+                lines.append(f'# HELP {full_name} {help_text}')
+                lines.append(f'# TYPE {full_name} histogram')
+                for (metric, view), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    label = view.replace('\\', '\\\\').replace('"', '\\"')
+                    for bound, total in histogram.cumulative():
+                        lines.append(f'{full_name}_bucket{{view="{label}",le="{bound}"}} {total}')
+                    lines.append(f'{full_name}_sum{{view="{label}"}} {histogram.sum:.6g}')
+                    lines.append(f'{full_name}_count{{view="{label}"}} {histogram.count}')
+            return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestStats:
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+
+
+def _count_sql(execute, sql, params, many, context):
+    """常驻在每个数据库连接上的 execute_wrapper，不在请求里时直接执行"""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_seconds += time.perf_counter() - start
+        stats.queries += 1
+
+
+def _install_wrapper(connection):
+    # 连接对象按线程区分，每个线程的连接各装一次
+    if _count_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_sql)
+
+
+connection_created.connect(lambda sender, connection, **kwargs: _install_wrapper(connection))
+
+
+def _timed_render(self, context=None, request=None):
+    stats = _current.get()
+    if stats is None:
+        return BackendTemplate._untimed_render(self, context, request)
+    start = time.perf_counter()
+    try:
+        return BackendTemplate._untimed_render(self, context, request)
+    finally:
+        stats.template_seconds += time.perf_counter() - start
+
+
+def install_template_timer():
+    """
+    只包后端的 Template.render：render()/TemplateResponse 都经过这里，{% include %} 不会重复计时。
+    由中间件初始化时调用，没装中间件就不改动；原方法只保存一次，重复调用（或模块被重新加载）不会层层包裹
+    """
+    if not hasattr(BackendTemplate, '_untimed_render'):
+        BackendTemplate._untimed_render = BackendTemplate.render
+    BackendTemplate.render = _timed_render
+
+
+def budget_for(view):
+    budgets = getattr(settings, 'REQUEST_BUDGETS', {})
+    return {**budgets.get('default', {}), **budgets.get(view, {})}
+
+
+def check_budget(view, queries, seconds):
+    budget = budget_for(view)
+    if 'queries' in budget and queries > budget['queries']:
+        message = f'{view} 超出预算：SQL {queries} 条，预算 {budget["queries"]} 条'
+        if getattr(settings, 'REQUEST_BUDGET_STRICT', False):
+            raise BudgetExceeded(message)
+        logger.warning(message)
+    if 'seconds' in budget and seconds > budget['seconds']:
+        # 耗时受机器负载影响，严格模式下也只记 warning，免得测试时好时坏
+        logger.warning('%s 超出预算：耗时 %.0fms，预算 %.0fms', view, seconds * 1000, budget['seconds'] * 1000)
+
+
+class RequestMetricsMiddleware:
+    """放在 MIDDLEWARE 最前面，统计范围才包含其余中间件。同步、异步两种模式都支持"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        install_template_timer()
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        # 中间件加载前就已打开的连接收不到 connection_created
+        for connection in connections.all(initialized_only=True):
+            _install_wrapper(connection)
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, stats, time.perf_counter() - start)
+        return response
+
+    def record(self, request, stats, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or '<unresolved>'
+        registry.observe(view, {
+            'request_duration_seconds': elapsed,
+            'request_sql_queries': stats.queries,
+            'request_sql_seconds': stats.sql_seconds,
+            'request_template_seconds': stats.template_seconds,
+        })
+        check_budget(view, stats.queries, elapsed)
+
@@ -0,0 +1,29 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django_ratelimit import ALL
+from django_ratelimit.core import is_ratelimited
+from django_ratelimit.exceptions import Ratelimited
+
+
+def aratelimit(group=None, key=None, rate=None, method=ALL, block=True):
+    """
+    django_ratelimit 的 @ratelimit 只能包同步视图（包异步视图会返回协程对象），
+    这是给 ASGI 模式下异步视图用的同名参数版本
+    """
+    def decorator(fn):
+        @wraps(fn)
+        async def _wrapped(request, *args, **kw):
+            old_limited = getattr(request, 'limited', False)
+            ratelimited = await sync_to_async(is_ratelimited)(
+                request=request, group=group, fn=fn, key=key, rate=rate, method=method, increment=True,
+            )
+            request.limited = ratelimited or old_limited
+            if ratelimited and block:
+                cls = getattr(settings, 'RATELIMIT_EXCEPTION_CLASS', Ratelimited)
+                raise (import_string(cls) if isinstance(cls, str) else cls)()
+            return await fn(request, *args, **kw)
+        return _wrapped
+    return decorator
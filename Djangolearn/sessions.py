@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+
+
+class ReadOnlySessionMiddleware(SessionMiddleware):
+    """
+    代替 Django 的 SessionMiddleware：没有 session Cookie 的 GET/HEAD 请求（匿名访客浏览页面）
+    即使读写了 request.session 也不保存，不会为匿名访问新建 django_session 行。
+    一次性提示用签名 Cookie（Djangolearn.flash、CookieStorage），不依赖 session。
+    """
+
+    def process_response(self, request, response):
+        if request.method in ('GET', 'HEAD') and settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            session = getattr(request, 'session', None)
+            if session is not None:
+                session.modified = False
+        return super().process_response(request, response)
@@ -49,8 +49,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # 统计每个请求的 SQL 条数/耗时、模板耗时和总耗时，见 Djangolearn/metrics.py
+    'Djangolearn.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # 匿名的 GET/HEAD 请求不保存 session，见 Djangolearn/sessions.py
+    'Djangolearn.sessions.ReadOnlySessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -70,6 +73,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                # 匿名整页缓存的页面不带访客自己的 CSRF token，见 blog/pagecache.py
+                'blog.pagecache.shared_page',
             ],
         },
     },
@@ -110,15 +115,37 @@ USE_TZ = False
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = os.path.join(BASE_DIR, 'static_collect')
+# 文件名带内容哈希，另外生成 .gz/.br；部署时运行 manage.py syncstatic（内容有变化才会 collectstatic）
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'Djangolearn.staticstorage.CompressedManifestStaticFilesStorage'},
+}
+# 带哈希的文件内容永远不变
+STATIC_HASHED_MAX_AGE = 60 * 60 * 24 * 365
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# 上传文件名都带随机 uuid，内容不会原地变化，可以缓存较久
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 7
+# 设置为 nginx 的 internal location（例如 /protected-media/）后由 nginx 直接发送文件
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+
+# 头像上传：超过大小的请求体不再继续读取；像素数上限防止解压炸弹
+AVATAR_MAX_UPLOAD_SIZE = 5 * 1024 * 1024
+AVATAR_MAX_PIXELS = 40_000_000
 
-# 登录配置
+# 登录配置：前台按邮箱登录（BLauth/backends.py），后台 admin 仍按用户名登录
 LOGIN_URL = '/BLauth/login'
+AUTHENTICATION_BACKENDS = [
+    'BLauth.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_COOKIE_AGE = 3600
+# session 先读缓存，只有登录/退出等修改时才写库；一次性提示和 messages 都放签名 Cookie，不写 session
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -132,14 +159,85 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# 邮件队列：请求里只入队；默认每个进程起一个后台线程发送，
+# 设为 False 时改由 manage.py run_mail_worker 单独发送
+MAIL_QUEUE_IN_PROCESS = os.environ.get('MAIL_QUEUE_IN_PROCESS', 'True').lower() == 'true'
+MAIL_QUEUE_MAX_ATTEMPTS = 5
+MAIL_QUEUE_RETRY_BASE_SECONDS = 30
+# 已发送、已放弃的邮件记录保留多久
+MAIL_QUEUE_RETENTION_SECONDS = 60 * 60 * 24 * 7
+
+# 注销账号：请求里只停用账号并登记任务，数据由后台线程分批删除；
+# 设为 False 时改由 manage.py run_account_purge 单独处理
+ACCOUNT_PURGE_IN_PROCESS = os.environ.get('ACCOUNT_PURGE_IN_PROCESS', 'True').lower() == 'true'
+ACCOUNT_PURGE_BATCH_SIZE = 500
+ACCOUNT_PURGE_MAX_ATTEMPTS = 5
+ACCOUNT_PURGE_RETRY_BASE_SECONDS = 60
+
+# 邮箱验证码存储：cache（默认，存在上面的共享缓存里，自动过期）或 db（VerificationCode 表）；
+# db 模式下每个进程有一个后台线程定期删除过期行，设为 False 时改由 manage.py sweep_codes 定时清理
+CODE_STORE = os.environ.get('CODE_STORE', 'cache')
+CODE_STORE_SWEEP_IN_PROCESS = os.environ.get('CODE_STORE_SWEEP_IN_PROCESS', 'True').lower() == 'true'
+
+# ASGI 模式（uvicorn 启动，asgi.py 默认打开）：首页、详情、搜索和发送验证码的接口换成 async_views 里的异步视图，
+# 等缓存、邮件入队时不占线程；WSGI（waitress）下仍用同步视图
+ASGI_MODE = os.environ.get('ASGI_MODE', 'False').lower() == 'true'
+
 # 信任域名
 CSRF_TRUSTED_ORIGINS = [origin for origin in os.environ.get('CSRF_TRUSTED_ORIGINS', '').split(',') if origin]
 
 # Ratelimit
 RATELIMIT_MESSAGE = "请求过于频繁，请稍后再试。"
+
+# 缓存：限流计数和页面缓存都要在多个 waitress 进程之间共享
+#   sqlite（默认）：本机共享，数据放在 CACHE_LOCATION 指定的 SQLite 文件里
+#   redis：多机部署，CACHE_LOCATION 填 redis://host:6379/0（需要安装 redis 包）
+#   locmem：单进程开发调试
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'sqlite')
+CACHE_BACKENDS = {
+    'sqlite': ('Djangolearn.cache.SQLiteCache', os.path.join(BASE_DIR, 'cache', 'default.sqlite3')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/0'),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'unique-snowflake'),
+}
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'OPTIONS': {'MAX_ENTRIES': 100000} if CACHE_BACKEND == 'sqlite' else {},
     }
-}
\ No newline at end of file
+}
+
+# blog_detail 片段缓存（秒）：正文片段按博客 id 缓存，评论片段额外带评论版本号，
+# 作者改名/换头像最多延迟这么久才在旧片段里生效
+BLOG_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('BLOG_FRAGMENT_CACHE_TIMEOUT', '600'))
+# 匿名访客整页缓存（秒）：首页、详情页按版本号缓存，内容变化立即换键，这里只决定旧页面多久被淘汰；0 表示不缓存
+BLOG_PAGE_CACHE_TIMEOUT = int(os.environ.get('BLOG_PAGE_CACHE_TIMEOUT', '300'))
+
+# 请求预算：超过时记 warning（logger Djangolearn.metrics），REQUEST_BUDGET_STRICT 为 True 时 SQL 条数超预算直接抛异常（测试用）
+# 键是 URL 名（app:name），default 对所有视图生效
+REQUEST_BUDGETS = {
+    'default': {'queries': 20, 'seconds': 1.0},
+    'blog:index': {'queries': 6, 'seconds': 0.3},
+    'blog:category': {'queries': 7, 'seconds': 0.3},
+    'blog:month_archive': {'queries': 7, 'seconds': 0.3},
+    'blog:blog_detail': {'queries': 8, 'seconds': 0.3},
+    'blog:search': {'queries': 8, 'seconds': 0.5},
+    'private:user_profile': {'queries': 8, 'seconds': 0.5},
+}
+REQUEST_BUDGET_STRICT = False
+# /metrics 除了 staff 登录，也可以用 Authorization: Bearer <METRICS_TOKEN> 抓取；为空时只允许 staff
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'Djangolearn': {'handlers': ['console'], 'level': 'INFO'},
+        'blog': {'handlers': ['console'], 'level': 'INFO'},
+        'BLauth': {'handlers': ['console'], 'level': 'INFO'},
+        'private': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
@@ -0,0 +1,88 @@
+"""
+静态文件存储：文件名带内容哈希（ManifestStaticFilesStorage），
+并给文本类文件额外写一份 .gz 和 .br，由 views.serve_static 按 Accept-Encoding 挑选。
+
+带哈希的文件内容永远不变，压缩副本已存在就直接跳过，重复 collectstatic 不会重新压缩。
+没有安装 brotli 时只生成 .gz。
+"""
+import gzip
+import hashlib
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.md'}
+# 压缩后至少要小这么多才值得保留副本
+MIN_SAVING_RATIO = 0.95
+# [(Content-Encoding, 文件后缀)]，按优先顺序排列
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')] if brotli else [('gzip', '.gz')]
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    # mtime=0 保证同样的内容压出同样的字节
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # 清单里没有的文件（或者还没跑过 collectstatic）退回原文件名，不报错
+    manifest_strict = False
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def tolerant_converter(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                # 第三方 css/js 里引用了没有带上的文件（比如 .map），保留原样
+                return matchobj.group(0)
+
+        return tolerant_converter
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        # 带哈希的文件和原名文件内容大多相同，同一份内容只压缩一次
+        self._compressed = {}
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not dry_run and not isinstance(processed, Exception) and hashed_name:
+                self.write_compressed(hashed_name)
+            yield name, hashed_name, processed
+        if not dry_run:
+            # 不带哈希的原名文件也可能被 js 按路径动态加载，同样给压缩副本
+            for name in paths:
+                self.write_compressed(name, replace=True)
+
+    def write_compressed(self, name, replace=False):
+        """生成 name 的压缩副本；replace=False 时已有副本直接跳过（带哈希的文件内容不会变）"""
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        source = self.path(name)
+        data = None
+        for encoding, suffix in ENCODINGS:
+            target = source + suffix
+            if os.path.exists(target) and not (replace and os.path.getmtime(target) < os.path.getmtime(source)):
+                continue
+            if data is None:
+                with open(source, 'rb') as f:
+                    data = f.read()
+            key = (hashlib.sha256(data).digest(), encoding)
+            if key not in self._compressed:
+                self._compressed[key] = compress(data, encoding)
+            compressed = self._compressed[key]
+            if len(compressed) < len(data) * MIN_SAVING_RATIO:
+                with open(target, 'wb') as f:
+                    f.write(compressed)
+            elif os.path.exists(target):
+                os.remove(target)
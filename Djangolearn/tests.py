@@ -0,0 +1,188 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase
+
+from .background import serving_requests
+from .cache import SQLiteCache
+from .fileserve import serve_file
+
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_add_keeps_live_key_and_replaces_expired(self):
+        self.assertTrue(self.cache.add('k', 'first'))
+        self.assertFalse(self.cache.add('k', 'second'))
+        self.assertEqual(self.cache.get('k'), 'first')
+
+        self.cache.set('gone', 'old', timeout=0.1)
+        time.sleep(0.2)
+        self.assertTrue(self.cache.add('gone', 'new'))
+        self.assertEqual(self.cache.get('gone'), 'new')
+
+    def test_expiry(self):
+        self.cache.set('short', {'a': 1}, timeout=0.1)
+        self.cache.set('forever', 1, timeout=None)
+        self.assertTrue(self.cache.has_key('short'))
+        time.sleep(0.2)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertFalse(self.cache.has_key('short'))
+        self.assertFalse(self.cache.touch('short'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('short')
+        self.assertEqual(self.cache.get('forever'), 1)
+
+    def test_incr_is_atomic_across_threads(self):
+        self.cache.set('counter', 0)
+        rounds = 200
+
+        def worker():
+            # 每个线程有自己的连接，和多进程一样靠 BEGIN IMMEDIATE 互斥
+            for _ in range(rounds):
+                self.cache.incr('counter')
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 2 * rounds)
+        # 另一个实例（另一个进程）看到同一份数据
+        self.assertEqual(self.make_cache().incr('counter', 5), 2 * rounds + 5)
+
+    def test_delete_many_and_clear(self):
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'c': 3})
+        self.assertTrue(self.cache.delete('c'))
+        self.assertFalse(self.cache.delete('c'))
+
+        self.cache.set_many({'x': 1, 'y': 2})
+        self.cache.clear()
+        self.assertEqual(self.cache.get_many(['x', 'y']), {})
+
+    def test_cull_respects_max_entries(self):
+        cache = self.make_cache(MAX_ENTRIES=10, CULL_FREQUENCY=2)
+        cache.set('expired', 1, timeout=0.1)
+        for i in range(12):
+            # 过期时间越晚越晚被淘汰
+            cache.set(f'key{i}', i, timeout=100 + i)
+        cache.set('pinned', 'x', timeout=None)
+        time.sleep(0.2)
+        cache.cull()
+
+        remaining = [key for key in ['pinned', *(f'key{i}' for i in range(12))] if cache.has_key(key)]
+        # 过期的先删，剩 13 条超过上限，淘汰 13 // 2 条最早过期的
+        self.assertEqual(len(remaining), 13 - 13 // 2)
+        self.assertIn('pinned', remaining)
+        self.assertEqual(remaining[-1], 'key11')
+        self.assertNotIn('key0', remaining)
+
+
+class FileServeTests(SimpleTestCase):
+    # serve_file 的额外参数，个别用例里替换
+    options = {}
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.body = bytes(range(100))
+        with open(os.path.join(self.root, 'data.bin'), 'wb') as f:
+            f.write(self.body)
+        self.factory = RequestFactory()
+
+    def get(self, path='data.bin', **headers):
+        response = serve_file(self.factory.get('/' + path, headers=headers), path, self.root, **self.options)
+        self.addCleanup(response.close)
+        return response
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_range(self):
+        response = self.get(range='bytes=0-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 0-9/100')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(self.content(response), self.body[:10])
+
+    def test_suffix_range(self):
+        response = self.get(range='bytes=-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 95-99/100')
+        self.assertEqual(self.content(response), self.body[-5:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(range='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_if_none_match(self):
+        etag = self.get()['ETag']
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.get(if_none_match='"other"').status_code, 200)
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(range='bytes=0-9', if_range=etag).status_code, 206)
+        response = self.get(range='bytes=0-9', if_range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), self.body)
+
+    def test_precompressed_variants(self):
+        with open(os.path.join(self.root, 'data.bin.br'), 'wb') as f:
+            f.write(b'brotli')
+        with open(os.path.join(self.root, 'data.bin.gz'), 'wb') as f:
+            f.write(b'gzip')
+        self.options = {'encodings': [('br', '.br'), ('gzip', '.gz')]}
+
+        response = self.get(accept_encoding='gzip, br')
+        self.assertEqual((response['Content-Encoding'], self.content(response)), ('br', b'brotli'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        response = self.get(accept_encoding='gzip, br;q=0')
+        self.assertEqual((response['Content-Encoding'], self.content(response)), ('gzip', b'gzip'))
+        response = self.get()
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(self.content(response), self.body)
+
+    def test_accel_redirect(self):
+        self.options = {'accel_prefix': '/protected/'}
+        response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/data.bin')
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+
+
+class ServingRequestsTests(SimpleTestCase):
+
+    def check(self, argv, run_main=None):
+        env = {'RUN_MAIN': run_main} if run_main else {}
+        with mock.patch('sys.argv', argv), mock.patch.dict(os.environ, env):
+            if not run_main:
+                os.environ.pop('RUN_MAIN', None)
+            return serving_requests()
+
+    def test_only_server_processes_start_workers(self):
+        self.assertTrue(self.check(['/venv/lib/waitress/__main__.py', 'Djangolearn.wsgi:application']))
+        self.assertTrue(self.check(['manage.py', 'runserver'], run_main='true'))
+        self.assertTrue(self.check(['manage.py', 'runserver', '--noreload']))
+        # 自动重载的父进程、其他管理命令
+        self.assertFalse(self.check(['manage.py', 'runserver']))
+        self.assertFalse(self.check(['manage.py', 'migrate']))
+        self.assertFalse(self.check(['/venv/bin/django-admin', 'test']))
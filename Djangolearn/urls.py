@@ -21,7 +21,9 @@ urlpatterns = [
 handler429 = views.ratelimited_view
 
 
-from django.views.static import serve
 urlpatterns += [
-    path('media/<path:path>', serve, {'document_root': settings.MEDIA_ROOT}),
+    path('media/<path:path>', views.serve_media),
+    # DEBUG 下 runserver 自己从各个 static 目录发文件，走不到这里
+    path('static/<path:path>', views.serve_static),
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -1,6 +1,50 @@
+import re
+from hmac import compare_digest
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .fileserve import serve_file
+from .metrics import registry
+from .staticstorage import ENCODINGS
+
+# ManifestStaticFilesStorage 生成的文件名：name.<12位哈希>.ext
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}(\.[^./]+)?$')
+
 
 def ratelimited_view(request, exception=None):
     """自定义 429 错误页面视图"""
     return render(request, '429.html', status=429)
+
+
+def serve_media(request, path):
+    """/media/ 下的上传文件（头像等）：带校验头、支持 Range，可交给 nginx 发送"""
+    return serve_file(
+        request, path, settings.MEDIA_ROOT,
+        cache_control='public, max-age=%d' % settings.MEDIA_CACHE_MAX_AGE,
+        accel_prefix=settings.MEDIA_ACCEL_REDIRECT_PREFIX,
+    )
+
+
+def serve_static(request, path):
+    """
+    collectstatic 之后的 STATIC_ROOT：带内容哈希的文件一年不变、不必再校验，
+    原文件名（被 js 按路径加载的文件）每次协商缓存；文本类文件按 Accept-Encoding 发预压缩副本
+    """
+    if HASHED_NAME_RE.search(path):
+        cache_control = 'public, max-age=%d, immutable' % settings.STATIC_HASHED_MAX_AGE
+    else:
+        cache_control = 'public, max-age=0, must-revalidate'
+    return serve_file(request, path, settings.STATIC_ROOT, cache_control=cache_control, encodings=ENCODINGS)
+
+
+def metrics(request):
+    """Prometheus 抓取入口：staff 登录后可看，抓取程序用 Authorization: Bearer <METRICS_TOKEN>"""
+    token = settings.METRICS_TOKEN
+    auth = request.META.get('HTTP_AUTHORIZATION', '')
+    allowed = request.user.is_staff or (token and compare_digest(auth, f'Bearer {token}'))
+    if not allowed:
+        # 不暴露这个地址的存在
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -4,7 +4,7 @@ from .models import Blog,BlogComment,BlogCategory
 # Register your models here.
 
 class BlogCategoryAdmin(admin.ModelAdmin):
-    list_display = ['name']
+    list_display = ['name', 'blog_count']
 
 class BlogAdmin(admin.ModelAdmin):
     list_display = ['title','content','edit_time','category','author']
@@ -0,0 +1,106 @@
+"""
+分类、月份归档的博客数。
+
+每个分类的博客数冗余在 BlogCategory.blog_count，每个月的在 BlogMonthArchive，归档页只读这两张小表，
+不对 Blog 做 GROUP BY。发布、删除博客时在同一个事务里调用 adjust_archive_counts 增减
+（blog_edit、private.delete_blog、注销清理），其它途径（后台删除、级联删除）产生的偏差
+用 manage.py rebuild_archive_counts 修复。
+"""
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Blog, BlogCategory, BlogMonthArchive
+
+
+def month_of(edit_time):
+    """按当前时区划分的月份（当月 1 日）"""
+    if timezone.is_aware(edit_time):
+        edit_time = timezone.localtime(edit_time)
+    return edit_time.date().replace(day=1)
+
+
+def month_bounds(year, month):
+    """[当月 1 日 0 点, 下月 1 日 0 点)，月份不合法时抛 ValueError"""
+    start = date(year, month, 1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    bounds = tuple(datetime.combine(day, time.min) for day in (start, end))
+    if settings.USE_TZ:
+        bounds = tuple(timezone.make_aware(bound) for bound in bounds)
+    return bounds
+
+
+def _grouped(counter):
+    """{键: 数量} → {数量: [键]}，同样增减量的一组一条 UPDATE"""
+    by_amount = defaultdict(list)
+    for key, amount in counter.items():
+        by_amount[amount].append(key)
+    return by_amount
+
+
+def adjust_archive_counts(rows, sign):
+    """
+    rows：[(category_id, edit_time)]，新发布的博客 sign=1，删除的 sign=-1。
+    调用方负责事务（和博客的插入/删除放在一起）
+    """
+    per_category = Counter(category_id for category_id, _ in rows)
+    per_month = Counter(month_of(edit_time) for _, edit_time in rows)
+
+    if sign > 0:
+        for amount, ids in _grouped(per_category).items():
+            BlogCategory.objects.filter(pk__in=ids).update(blog_count=F('blog_count') + amount)
+        for month, amount in per_month.items():
+            _add_to_month(month, amount)
+        return
+
+    for amount, ids in _grouped(per_category).items():
+        BlogCategory.objects.filter(pk__in=ids, blog_count__gte=amount).update(blog_count=F('blog_count') - amount)
+        # 计数本来就有偏差的，不减成负数
+        BlogCategory.objects.filter(pk__in=ids, blog_count__lt=amount).update(blog_count=0)
+    for amount, months in _grouped(per_month).items():
+        BlogMonthArchive.objects.filter(month__in=months, blog_count__gte=amount).update(blog_count=F('blog_count') - amount)
+        BlogMonthArchive.objects.filter(month__in=months, blog_count__lt=amount).update(blog_count=0)
+
+
+def _add_to_month(month, amount):
+    if BlogMonthArchive.objects.filter(month=month).update(blog_count=F('blog_count') + amount):
+        return
+    try:
+        with transaction.atomic():
+            BlogMonthArchive.objects.create(month=month, blog_count=amount)
+    except IntegrityError:
+        # 并发请求先建了这个月
+        BlogMonthArchive.objects.filter(month=month).update(blog_count=F('blog_count') + amount)
+
+
+def rebuild_archive_counts(dry_run=False):
+    """按 Blog 表重新统计，返回 [(说明, 记录值, 实际值)]"""
+    drifts = []
+
+    actual = dict(Blog.objects.order_by().values_list('category').annotate(n=Count('pk')))
+    for category_id, name, stored in BlogCategory.objects.values_list('pk', 'name', 'blog_count').iterator():
+        real = actual.get(category_id, 0)
+        if stored != real:
+            drifts.append((f'分类 {name}', stored, real))
+            if not dry_run:
+                BlogCategory.objects.filter(pk=category_id).update(blog_count=real)
+
+    # 月份按时区划分，在 Python 里统计，不依赖 MySQL 的时区表
+    months = Counter(month_of(edit_time) for edit_time in Blog.objects.values_list('edit_time', flat=True).iterator())
+    stored_months = dict(BlogMonthArchive.objects.values_list('month', 'blog_count'))
+    for month in sorted(months.keys() | stored_months.keys()):
+        stored, real = stored_months.get(month, 0), months.get(month, 0)
+        if stored == real:
+            continue
+        drifts.append((f'月份 {month:%Y-%m}', stored, real))
+        if dry_run:
+            continue
+        if real:
+            BlogMonthArchive.objects.update_or_create(month=month, defaults={'blog_count': real})
+        else:
+            BlogMonthArchive.objects.filter(month=month).delete()
+    return drifts
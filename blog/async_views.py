@@ -0,0 +1,58 @@
+"""
+ASGI 模式（settings.ASGI_MODE = True，见 Djangolearn/asgi.py）下的首页、详情和搜索。
+
+查询走异步 ORM，等数据库时不占用线程；模板渲染里还有片段缓存读写和详情正文的延迟加载，
+整体放进 sync_to_async。分页、上下文的拼法和 views.py 里的同步版本共用。
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_GET
+from django.views.decorators.vary import vary_on_headers
+
+from Djangolearn.ratelimit import aratelimit
+
+from .cache import acomment_version
+from .conditional import aconditional, detail_validators, index_validators
+from .pagecache import cache_anonymous_page, detail_page_key, index_page_key
+from .models import Blog
+from .search import asearch_blogs
+from .views import DETAIL_QUERYSET, comment_page_for, comment_page_url, detail_context, feed_page_args, feed_paginator
+
+arender = sync_to_async(render)
+
+
+@vary_on_headers('User-Agent')
+@aconditional(index_validators)
+@cache_anonymous_page(index_page_key)
+async def index(request):
+    blogs = await feed_paginator(request).apage(**feed_page_args(request))
+    return await arender(request, 'index.html', {'blogs': blogs})
+
+
+@aconditional(detail_validators)
+@cache_anonymous_page(detail_page_key)
+async def blog_detail(request, blog_id):
+    target = await sync_to_async(comment_page_url)(blog_id, request.GET.get('comment_id'))
+    if target:
+        return redirect(target)
+    try:
+        blog = await DETAIL_QUERYSET.aget(pk=blog_id)
+    except Blog.DoesNotExist:
+        raise Http404('博客不存在')
+    paginator, comments, comment_page = comment_page_for(request, blog)
+    comments.object_list = [comment async for comment in comments.object_list]
+    context = detail_context(blog, paginator, comments, comment_page, await acomment_version(blog.id))
+    return await arender(request, 'blog_detail.html', context=context)
+
+
+@require_GET
+@aratelimit(key='ip', rate='30/m', method='GET', block=True)
+async def search(request):
+    q = request.GET.get('q', '').strip()
+    results = await asearch_blogs(q, page=request.GET.get('page', 1))
+    return await arender(request, 'search.html', context={
+        'q': q,
+        'results': results,
+        'page_range': results.paginator.get_elided_page_range(results.number, on_each_side=2, on_ends=1),
+    })
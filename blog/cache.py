@@ -0,0 +1,64 @@
+import time
+
+from django.core.cache import cache
+
+COMMENT_VERSION_KEY = 'blog:%s:comment_version'
+FEED_VERSION_KEY = 'blog:feed_version'
+CATEGORY_VERSION_KEY = 'blog:category_version'
+
+
+def _now_ms():
+    return time.time_ns() // 1_000_000
+
+
+def _version(key):
+    """缓存里没有时（首次访问或被淘汰）以当前时间初始化，相当于整体失效一次"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _now_ms(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    version = max(_now_ms(), (cache.get(key) or 0) + 1)
+    cache.set(key, version, timeout=None)
+    return version
+
+
+def comment_version(blog_id):
+    """博客评论的版本号（毫秒时间戳），作为评论分页片段缓存键和详情页 ETag 的一部分"""
+    return _version(COMMENT_VERSION_KEY % blog_id)
+
+
+async def acomment_version(blog_id):
+    """comment_version() 的异步版本"""
+    key = COMMENT_VERSION_KEY % blog_id
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _now_ms(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_comment_version(blog_id):
+    """评论新增/删除、博客修改/删除后调用，旧的评论分页片段和详情页 ETag 随即失效"""
+    return _bump(COMMENT_VERSION_KEY % blog_id)
+
+
+def feed_version():
+    """首页列表的版本号（毫秒时间戳）：博客增删、评论数或作者头像变化时更新"""
+    return _version(FEED_VERSION_KEY)
+
+
+def bump_feed_version():
+    return _bump(FEED_VERSION_KEY)
+
+
+def category_version():
+    """分类列表的版本号：分类新增、改名、删除时更新"""
+    return _version(CATEGORY_VERSION_KEY)
+
+
+def bump_category_version():
+    return _bump(CATEGORY_VERSION_KEY)
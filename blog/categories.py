@@ -0,0 +1,48 @@
+"""
+博客分类：按规范化名称查找/创建，以及发布页用的分类列表缓存。
+
+分类列表两级缓存：共享缓存里按版本号存一份（多个进程共用），进程内再记住最近一份；
+每次取列表只读一次版本号，没变就直接用进程内的。分类变化时信号更新版本号（见 signals.py）。
+"""
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .cache import category_version
+from .models import BlogCategory, normalize_category_name
+
+CATEGORY_LIST_KEY = 'blog:categories:%s'
+# 版本号变了旧列表就不会再读，留一天后由缓存淘汰
+CATEGORY_LIST_TIMEOUT = 24 * 3600
+
+# 进程内最近一份：(版本号, 分类名列表)，整体替换，多线程读写不用加锁
+_latest = (None, [])
+
+
+def get_or_create_category(name):
+    """按规范化名称查找分类，没有就创建；并发创建同名分类时唯一索引保证只有一个插入成功"""
+    normalized = normalize_category_name(name)
+    category = BlogCategory.objects.filter(normalized_name=normalized).first()
+    if category is not None:
+        return category
+    try:
+        with transaction.atomic():
+            return BlogCategory.objects.create(name=' '.join(name.split()))
+    except IntegrityError:
+        # 并发请求先插入了
+        return BlogCategory.objects.get(normalized_name=normalized)
+
+
+def category_names():
+    """全部分类名（按创建先后），发布页的下拉选项用"""
+    global _latest
+    version = category_version()
+    if _latest[0] == version:
+        return _latest[1]
+
+    key = CATEGORY_LIST_KEY % version
+    names = cache.get(key)
+    if names is None:
+        names = list(BlogCategory.objects.order_by('pk').values_list('name', flat=True))
+        cache.set(key, names, timeout=CATEGORY_LIST_TIMEOUT)
+    _latest = (version, names)
+    return names
@@ -0,0 +1,100 @@
+"""
+首页和详情页的条件 GET（ETag / Last-Modified），内容没变时直接回 304，不查库、不渲染模板。
+
+校验值只来自缓存里的版本号（见 cache.py）：
+    首页  feed_version + 每页条数（手机/电脑分开）+ 访问者
+    详情  该博客的 comment_version + 访问者
+访问者部分是登录用户和 CSRF cookie 的摘要：导航栏随登录状态变化，页面里表单的 token 由 CSRF cookie 派生。
+有待显示的提示消息时不做条件处理，否则 304 会让消息一直显示不出来。
+Last-Modified 只给匿名访问者：只带 If-Modified-Since 的客户端区分不了登录状态。
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.views.decorators.http import condition
+
+from Djangolearn.flash import FLASH_COOKIE
+from .cache import comment_version, feed_version
+
+
+def feed_page_size(request):
+    # 手机8个，电脑6个 —— 只改数量
+    user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
+    is_mobile = 'mobile' in user_agent or 'android' in user_agent or 'iphone' in user_agent
+    return 8 if is_mobile else 6
+
+
+def _viewer(request):
+    user_part = f'u{request.user.pk}' if request.user.is_authenticated else 'anon'
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    return f'{user_part}.{hashlib.sha1(csrf_cookie.encode()).hexdigest()[:8]}'
+
+
+def pending_messages(request):
+    # 删除后的空 cookie 不算
+    return bool(request.COOKIES.get(CookieStorage.cookie_name) or request.COOKIES.get(FLASH_COOKIE))
+
+
+def _memo(func):
+    """一个请求里 etag 和 last_modified 共用一次计算（版本号要读缓存）"""
+    attr = f'_{func.__name__}'
+
+    @wraps(func)
+    def inner(request, *args, **kwargs):
+        if not hasattr(request, attr):
+            setattr(request, attr, func(request, *args, **kwargs))
+        return getattr(request, attr)
+    return inner
+
+
+@_memo
+def index_validators(request, *args, **kwargs):
+    """返回 (etag, last_modified)，不做条件处理时都是 None"""
+    if pending_messages(request):
+        return None, None
+    version = feed_version()
+    return _validators(request, f'{version}.{feed_page_size(request)}', version)
+
+
+@_memo
+def detail_validators(request, blog_id, *args, **kwargs):
+    if pending_messages(request):
+        return None, None
+    version = comment_version(blog_id)
+    return _validators(request, str(version), version)
+
+
+def _validators(request, tag, version):
+    # 页面里有每次都不同的 csrf token，只能是弱 ETag
+    etag = f'W/"{tag}.{_viewer(request)}"'
+    if request.user.is_authenticated:
+        return etag, None
+    return etag, datetime.fromtimestamp(version / 1000, tz=timezone.utc)
+
+
+def conditional(validators):
+    """按 validators 返回的 (etag, last_modified) 处理条件请求"""
+    return condition(
+        etag_func=lambda request, *args, **kwargs: validators(request, *args, **kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: validators(request, *args, **kwargs)[1],
+    )
+
+
+def aconditional(validators):
+    """
+    conditional() 的异步视图版本：condition 在事件循环里同步调用校验函数，
+    而校验值要读 session 和缓存，所以先放到线程里算好，condition 再取时直接命中
+    """
+    def decorator(view):
+        conditional_view = conditional(validators)(view)
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            await sync_to_async(validators)(request, *args, **kwargs)
+            return await conditional_view(request, *args, **kwargs)
+        return inner
+    return decorator
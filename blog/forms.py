@@ -1,6 +1,6 @@
 # forms.py 完整代码
 from django import forms
-from blog.models import BlogCategory
+from blog.categories import get_or_create_category
 
 class EditBlogForm(forms.Form):
     title = forms.CharField(max_length=200, min_length=1, error_messages={
@@ -21,9 +21,6 @@ class EditBlogForm(forms.Form):
     def clean_category_name(self):
         """关键：验证分类，存在则返回ID，不存在则创建并返回ID"""
         category_name = self.cleaned_data.get("category_name").strip()
-        # 查找已有分类（不区分大小写）
-        category, created = BlogCategory.objects.get_or_create(
-            name__iexact=category_name,  # 忽略大小写匹配
-            defaults={"name": category_name}  # 不匹配则创建新分类
-        )
+        # 按规范化名称（忽略大小写和多余空白）查找，唯一索引上的等值查询
+        category = get_or_create_category(category_name)
         return category.id  # 返回分类ID，供视图使用
\ No newline at end of file
@@ -0,0 +1,117 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from BLauth.models import UserEmail
+from blog.models import Blog, BlogComment, BlogSearchToken
+from blog.pagination import KeysetPaginator
+from blog.search import search_postings
+from blog.seed import delete_seed, seed_dataset
+
+SEED_PREFIX = 'plan_audit_'
+
+
+def audit_queries():
+    """
+    和主要页面一致的查询：[(名称, queryset, 是否允许排序)]。
+    搜索按命中词元聚合后的得分排序，排的是命中的少量行，允许临时表排序
+    """
+    blog = Blog.objects.order_by('-comment_count').first()
+    # 翻页游标取列表中间的一篇
+    middle = Blog.objects.order_by('-edit_time', '-pk').values_list('edit_time', 'pk')[Blog.objects.count() // 2:][:1]
+    comment = BlogComment.objects.order_by('-pk').first()
+    token = BlogSearchToken.objects.order_by('-pk').values_list('token', flat=True).first()
+    email = UserEmail.objects.values_list('email', flat=True).last()
+    if blog is None or comment is None or token is None or email is None or not middle:
+        raise CommandError('库里没有博客、评论或搜索索引，先用 --seed 生成测试数据')
+
+    feed = Blog.objects.select_related('author__profile', 'category').defer('content', 'plain_text')
+    return [
+        ('首页', feed.order_by('-edit_time', '-pk')[:8], False),
+        ('首页翻页', feed.filter(KeysetPaginator._older_than(middle[0])).order_by('-edit_time', '-pk')[:8], False),
+        ('详情', Blog.objects.select_related('author__profile', 'category').defer('content', 'plain_text').filter(pk=blog.pk), False),
+        ('详情评论', blog.comments.select_related('author__profile').order_by('-edit_time', '-id')[:6], False),
+        ('评论定位', BlogComment.objects.filter(
+            Q(edit_time__gt=comment.edit_time) | Q(edit_time=comment.edit_time, pk__gt=comment.pk), blog_id=comment.blog_id
+        ).values('pk'), False),
+        ('个人主页博客', Blog.objects.filter(author_id=blog.author_id).filter(
+            Q(title__icontains='') | Q(content__icontains='')
+        ).select_related('category').defer('content', 'plain_text').order_by('-edit_time')[:10], False),
+        ('个人主页评论', BlogComment.objects.filter(author_id=comment.author_id, content__icontains='')
+            .select_related('blog').defer('blog__content', 'blog__plain_text').order_by('-edit_time')[:10], False),
+        ('搜索', search_postings([(token, False)])[:10], True),
+        ('登录', UserEmail.objects.select_related('user').filter(email=email), False),
+    ]
+
+
+def explain(queryset):
+    """返回 [(表, 问题)]，问题只有“全表扫描”和“文件排序”两种"""
+    sql, params = queryset.query.sql_with_params()
+    problems = []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [col[0].lower() for col in cursor.description]
+            for row in cursor.fetchall():
+                row = dict(zip(columns, row))
+                if row['type'] == 'ALL':
+                    problems.append((row['table'], '全表扫描'))
+                if 'Using filesort' in (row['extra'] or ''):
+                    problems.append((row['table'], '文件排序'))
+        elif connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            for row in cursor.fetchall():
+                detail = row[-1]
+                if detail.startswith('SCAN ') and ' USING ' not in detail:
+                    problems.append((detail[5:].split()[0], '全表扫描'))
+                if detail.startswith('USE TEMP B-TREE FOR') and 'ORDER BY' in detail:
+                    problems.append(('', '文件排序'))
+        else:
+            raise CommandError(f'不支持的数据库：{connection.vendor}')
+    return problems
+
+
+class Command(BaseCommand):
+    help = '对首页、详情、个人主页、搜索、登录的查询执行 EXPLAIN，出现全表扫描或文件排序时失败'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='先生成这么多篇测试博客（结束后删除），小表上优化器可能直接扫表')
+        parser.add_argument('--verbose-plan', action='store_true', help='输出每条查询的 SQL')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'])
+        try:
+            failures = self.audit(options['verbose_plan'])
+        finally:
+            if options['seed']:
+                self.cleanup()
+        if failures:
+            raise CommandError(f'{failures} 条查询的执行计划有问题')
+        self.stdout.write(self.style.SUCCESS('所有查询都走了索引'))
+
+    def audit(self, verbose):
+        failures = 0
+        for name, queryset, allow_sort in audit_queries():
+            problems = [
+                (table, problem) for table, problem in explain(queryset)
+                if not (allow_sort and problem == '文件排序')
+            ]
+            if verbose:
+                self.stdout.write(f'{name}: {queryset.query}')
+            if problems:
+                failures += 1
+                detail = '，'.join(f'{table} {problem}'.strip() for table, problem in problems)
+                self.stdout.write(self.style.ERROR(f'✗ {name}: {detail}'))
+            else:
+                self.stdout.write(f'✓ {name}')
+        return failures
+
+    def seed(self, count):
+        # 上次中途退出留下的数据先清掉
+        delete_seed(SEED_PREFIX)
+        counts = seed_dataset(users=count // 10, blogs=count, comments=count * 3, prefix=SEED_PREFIX, avatars=False)
+        self.stdout.write(f'已生成 {counts["blogs"]} 篇博客、{counts["comments"]} 条评论')
+
+    def cleanup(self):
+        delete_seed(SEED_PREFIX)
@@ -0,0 +1,224 @@
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from blog.models import Blog, BlogComment
+from blog.pagination import encode_cursor
+from blog.seed import LATIN_WORDS, WORDS
+
+User = get_user_model()
+
+SCENARIOS = ['index', 'detail', 'search', 'profile', 'comment']
+COMMENTS_PER_PAGE = 6
+FEED_PER_PAGE = 6
+
+
+class QueryCounter:
+    """connection.execute_wrapper 回调，只计数，不像 CaptureQueriesContext 那样保存 SQL"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(sorted_values, p):
+    """最近秩法"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = '用测试客户端压首页、详情（评论深分页）、搜索、个人主页和发表评论，输出 p50/p95/p99、每请求 SQL 数和吞吐量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='每个场景的请求数')
+        parser.add_argument('--warmup', type=int, default=20, help='每个场景正式计时前的预热请求数')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='逗号分隔，可选：' + ','.join(SCENARIOS))
+        parser.add_argument('--prefix', default='seed_', help='seed_data 生成数据时用的前缀，登录用户从中挑选')
+        parser.add_argument('--seed', type=int, default=0, help='随机种子，决定请求序列')
+        parser.add_argument('--cold', action='store_true', help='每个请求前清空缓存（测缓存未命中的最坏情况）')
+        parser.add_argument('--output', help='结果写入的 JSON 文件')
+        parser.add_argument('--compare', help='和之前保存的 JSON 结果对比')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'未知场景：{", ".join(sorted(unknown))}')
+
+        users = list(User.objects.filter(username__startswith=options['prefix']).order_by('pk')[:50])
+        if not users or not Blog.objects.exists():
+            raise CommandError('没有测试数据，先运行 manage.py seed_data')
+        self.rng = random.Random(options['seed'])
+        self.users = users
+        self.prefix = options['prefix']
+        self.prepare_targets()
+
+        # 测试客户端的 Host 是 testserver；评论接口的限流在压测时关掉；
+        # 压测用进程内单独的缓存，--cold 清空的是它，不碰线上共享的缓存（会话、验证码、限流计数都在里面）
+        overrides = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}},
+            RATELIMIT_ENABLE=False,
+            REQUEST_BUDGET_STRICT=False,
+        )
+        results = {}
+        with overrides:
+            for name in scenarios:
+                results[name] = self.run_scenario(name, options)
+                self.print_result(name, results[name])
+
+        report = {
+            'commit': git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': {
+                'users': User.objects.count(),
+                'blogs': Blog.objects.count(),
+                'comments': BlogComment.objects.count(),
+            },
+            'options': {key: options[key] for key in ('requests', 'warmup', 'seed', 'cold')},
+            'scenarios': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f'结果已写入 {options["output"]}')
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    # ---------- 请求目标 ----------
+
+    def prepare_targets(self):
+        # 首页：每隔一页取一个游标，随机翻到任意深度
+        keys = list(Blog.objects.order_by('-edit_time', '-pk').values_list('edit_time', 'pk'))
+        self.feed_urls = [reverse('blog:index')] + [
+            f'{reverse("blog:index")}?before={encode_cursor(*keys[i - 1])}&p={i // FEED_PER_PAGE + 1}'
+            for i in range(FEED_PER_PAGE, len(keys), FEED_PER_PAGE)
+        ]
+        # 详情：评论最多的 20 篇，评论页随机（包括最后几页）
+        self.hot_blogs = list(Blog.objects.order_by('-comment_count').values_list('pk', 'comment_count')[:20])
+        # 发表评论只发到生成的博客上，delete_seed 连同博客一起删掉，不碰真实博客的评论数
+        self.seed_blog_ids = list(
+            Blog.objects.filter(author__username__startswith=self.prefix).values_list('pk', flat=True)
+        )
+        if not self.seed_blog_ids:
+            raise CommandError(f'没有 {self.prefix} 开头的用户发布的博客，先运行 manage.py seed_data')
+
+    def next_request(self, name):
+        """返回 (client, method, url, data)"""
+        rng = self.rng
+        if name == 'index':
+            return self.anonymous, 'get', rng.choice(self.feed_urls), None
+        if name == 'detail':
+            blog_id, comment_count = rng.choice(self.hot_blogs)
+            pages = max(1, -(-comment_count // COMMENTS_PER_PAGE))
+            url = f'{reverse("blog:blog_detail", args=[blog_id])}?comment_page={rng.randint(1, pages)}'
+            return self.anonymous, 'get', url, None
+        if name == 'search':
+            words = rng.choice([WORDS, LATIN_WORDS])
+            return self.anonymous, 'get', reverse('blog:search'), {'q': ' '.join(rng.sample(words, rng.randint(1, 2)))}
+        if name == 'profile':
+            tab = rng.choice(['blogs', 'comments'])
+            return self.member, 'get', reverse('private:user_profile'), {'tab': tab, 'page': rng.randint(1, 3)}
+        return self.member, 'post', reverse('blog:pub_comment'), {
+            'blog_id': rng.choice(self.seed_blog_ids), 'content': f'压测评论 {rng.random():.6f}',
+        }
+
+    # ---------- 执行 ----------
+
+    def run_scenario(self, name, options):
+        self.anonymous = Client()
+        self.member = Client()
+        self.member.force_login(self.rng.choice(self.users))
+
+        for _ in range(options['warmup']):
+            self.send(name, options['cold'])
+
+        latencies, queries, errors = [], [], 0
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            for _ in range(options['requests']):
+                counter.count = 0
+                elapsed, status = self.send(name, options['cold'])
+                latencies.append(elapsed)
+                queries.append(counter.count)
+                if status >= 400:
+                    errors += 1
+
+        latencies.sort()
+        total = sum(latencies)
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'mean_ms': round(total / len(latencies) * 1000, 2) if latencies else 0,
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else 0,
+            'max_queries': max(queries, default=0),
+            # 单个客户端顺序请求的吞吐量
+            'requests_per_second': round(len(latencies) / total, 1) if total else 0,
+        }
+
+    def send(self, name, cold):
+        client, method, url, data = self.next_request(name)
+        if cold:
+            cache.clear()
+        start = time.perf_counter()
+        response = getattr(client, method)(url, data)
+        return time.perf_counter() - start, response.status_code
+
+    # ---------- 输出 ----------
+
+    def print_result(self, name, result):
+        self.stdout.write(
+            f'{name:<8} p50 {result["p50_ms"]:>8.2f}ms  p95 {result["p95_ms"]:>8.2f}ms  p99 {result["p99_ms"]:>8.2f}ms  '
+            f'SQL {result["queries_per_request"]:>5.1f}/请求  {result["requests_per_second"]:>7.1f} 请求/秒'
+            + (f'  错误 {result["errors"]}' if result['errors'] else '')
+        )
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as f:
+            previous = json.load(f)
+        self.stdout.write(f'\n对比 {path}（提交 {previous.get("commit")}）：')
+        for name, result in results.items():
+            old = previous.get('scenarios', {}).get(name)
+            if not old:
+                continue
+            parts = []
+            for key in ('p50_ms', 'p95_ms', 'queries_per_request'):
+                before, after = old[key], result[key]
+                change = f'{(after - before) / before * 100:+.1f}%' if before else 'n/a'
+                parts.append(f'{key} {before} → {after} ({change})')
+            self.stdout.write(f'{name:<8} ' + '，'.join(parts))
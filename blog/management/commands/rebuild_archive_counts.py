@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from blog.archive import rebuild_archive_counts
+
+
+class Command(BaseCommand):
+    help = '按博客表重新统计分类和月份归档的博客数，修复计数偏差'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='只报告偏差，不写入')
+
+    def handle(self, *args, **options):
+        drifts = rebuild_archive_counts(dry_run=options['dry_run'])
+        for label, stored, real in drifts:
+            self.stdout.write(f'{label}: 记录 {stored}，实际 {real}')
+        action = '发现' if options['dry_run'] else '修复'
+        self.stdout.write(self.style.SUCCESS(f'{action} {len(drifts)} 处计数偏差'))
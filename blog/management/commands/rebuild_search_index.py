@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Blog, BlogSearchToken
+from blog.search import index_blog
+
+
+class Command(BaseCommand):
+    help = '重建博客搜索倒排索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='每批读取的博客数')
+
+    def handle(self, *args, **options):
+        BlogSearchToken.objects.all().delete()
+        total = tokens = 0
+        blogs = Blog.objects.only('id', 'title', 'plain_text').order_by('pk')
+        for blog in blogs.iterator(chunk_size=options['batch_size']):
+            tokens += index_blog(blog)
+            total += 1
+            if total % options['batch_size'] == 0:
+                self.stdout.write(f'已索引 {total} 篇博客')
+        self.stdout.write(self.style.SUCCESS(f'索引重建完成：{total} 篇博客，{tokens} 个词元'))
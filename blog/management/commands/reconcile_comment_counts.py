@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.models import Blog, BlogComment
+
+
+class Command(BaseCommand):
+    help = '按评论表重新统计 Blog.comment_count，修复计数偏差'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的博客数（按主键区间）')
+        parser.add_argument('--dry-run', action='store_true', help='只报告偏差，不写入')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        actual = Coalesce(Subquery(
+            BlogComment.objects.filter(blog=OuterRef('pk')).order_by().values('blog').annotate(n=Count('pk')).values('n')
+        ), 0)
+
+        checked = fixed = 0
+        last_id = 0
+        while True:
+            ids = list(Blog.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            drifted = (
+                Blog.objects.filter(pk__in=ids)
+                .annotate(actual=actual)
+                .exclude(comment_count=actual)
+                .values_list('pk', 'comment_count', 'actual')
+            )
+            for blog_id, stored, real in drifted:
+                self.stdout.write(f'博客 {blog_id}: 记录 {stored}，实际 {real}')
+                if not options['dry_run']:
+                    Blog.objects.filter(pk=blog_id).update(comment_count=real)
+                fixed += 1
+            checked += len(ids)
+
+        action = '发现' if options['dry_run'] else '修复'
+        self.stdout.write(self.style.SUCCESS(f'检查 {checked} 篇博客，{action} {fixed} 处计数偏差'))
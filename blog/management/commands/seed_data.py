@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from blog.seed import SEED_PASSWORD, delete_seed, seed_dataset
+
+
+class Command(BaseCommand):
+    help = '生成压测/调试用的测试数据（同样的参数和 --seed 生成同样的数据）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='用户数')
+        parser.add_argument('--blogs', type=int, default=2000, help='博客数')
+        parser.add_argument('--comments', type=int, default=20000, help='评论总数（按 Zipf 分布分给博客）')
+        parser.add_argument('--seed', type=int, default=0, help='随机种子')
+        parser.add_argument('--prefix', default='seed_', help='用户名和分类名的前缀，清理时按它查找')
+        parser.add_argument('--no-avatars', action='store_true', help='不生成头像文件')
+        parser.add_argument('--clear', action='store_true', help='只删除此前生成的数据')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        delete_seed(prefix)
+        if options['clear']:
+            self.stdout.write(self.style.SUCCESS(f'已删除前缀为 {prefix} 的测试数据'))
+            return
+
+        counts = seed_dataset(
+            users=options['users'], blogs=options['blogs'], comments=options['comments'],
+            prefix=prefix, seed=options['seed'], avatars=not options['no_avatars'],
+            log=lambda message: self.stdout.write(f'  {message}'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'生成完成：用户 {counts["users"]}，博客 {counts["blogs"]}，评论 {counts["comments"]}，'
+            f'登录密码 {SEED_PASSWORD}'
+        ))
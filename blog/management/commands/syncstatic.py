@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+DIGEST_FILE = '.source_digests.json'
+
+
+def source_digests():
+    """所有待收集静态文件的 {路径: sha256}，和 collectstatic 用同一套 finder"""
+    digests = {}
+    for finder in finders.get_finders():
+        for path, storage in finder.list(['CVS', '.*', '*~']):
+            prefixed = os.path.join(getattr(storage, 'prefix', None) or '', path).replace('\\', '/')
+            if prefixed in digests:
+                # 同名文件以先找到的为准，和 collectstatic 一致
+                continue
+            sha = hashlib.sha256()
+            with storage.open(path) as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    sha.update(chunk)
+            digests[prefixed] = sha.hexdigest()
+    return digests
+
+
+class Command(BaseCommand):
+    help = '静态文件内容有变化时才运行 collectstatic（按内容摘要比较，不看修改时间）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='不比较摘要，直接收集')
+
+    def handle(self, *args, **options):
+        digest_path = os.path.join(settings.STATIC_ROOT, DIGEST_FILE)
+        manifest_path = os.path.join(settings.STATIC_ROOT, 'staticfiles.json')
+        current = source_digests()
+
+        previous = {}
+        if os.path.exists(digest_path):
+            with open(digest_path, encoding='utf-8') as f:
+                previous = json.load(f)
+
+        changed = sorted(p for p, d in current.items() if previous.get(p) != d)
+        removed = sorted(set(previous) - set(current))
+        if not options['force'] and not changed and not removed and os.path.exists(manifest_path):
+            self.stdout.write('静态文件没有变化，跳过 collectstatic')
+            return
+
+        for path in changed[:20]:
+            self.stdout.write(f'  变化: {path}')
+        if len(changed) > 20:
+            self.stdout.write(f'  ……共 {len(changed)} 个文件变化')
+        for path in removed:
+            self.stdout.write(f'  删除: {path}')
+
+        # 删除的源文件需要 --clear 才会从 STATIC_ROOT 里清掉
+        call_command('collectstatic', interactive=False, clear=bool(removed), verbosity=0)
+
+        os.makedirs(settings.STATIC_ROOT, exist_ok=True)
+        with open(digest_path, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, sort_keys=True, indent=0)
+        self.stdout.write(self.style.SUCCESS(f'collectstatic 完成，{len(current)} 个源文件'))
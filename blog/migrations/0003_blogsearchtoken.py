@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_alter_blog_options_alter_blogcategory_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32, verbose_name='词元')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='权重')),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='blog.blog', verbose_name='所属博客')),
+            ],
+            options={
+                'verbose_name': '搜索索引',
+                'verbose_name_plural': '搜索索引',
+                'constraints': [models.UniqueConstraint(fields=('token', 'blog'), name='blog_search_token_uniq')],
+            },
+        ),
+    ]
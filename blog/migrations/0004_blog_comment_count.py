@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_comment_count(apps, schema_editor):
+    Blog = apps.get_model('blog', 'Blog')
+    BlogComment = apps.get_model('blog', 'BlogComment')
+    counts = BlogComment.objects.filter(blog=OuterRef('pk')).order_by().values('blog').annotate(n=Count('pk')).values('n')
+    Blog.objects.update(comment_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_blogsearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='评论数'),
+        ),
+        migrations.RunPython(fill_comment_count, migrations.RunPython.noop),
+    ]
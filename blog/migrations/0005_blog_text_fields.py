@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:35
+
+from django.db import migrations, models
+
+from blog.utils import count_words, html_to_text, make_excerpt
+
+
+def fill_text_fields(apps, schema_editor):
+    Blog = apps.get_model('blog', 'Blog')
+    for blog in Blog.objects.only('id', 'content').iterator(chunk_size=200):
+        plain_text = html_to_text(blog.content)
+        Blog.objects.filter(pk=blog.pk).update(
+            plain_text=plain_text,
+            excerpt=make_excerpt(plain_text),
+            word_count=count_words(plain_text),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_blog_comment_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='摘要'),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='plain_text',
+            field=models.TextField(blank=True, default='', verbose_name='纯文本'),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='字数'),
+        ),
+        migrations.RunPython(fill_text_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_blog_text_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['edit_time', 'id'], name='blog_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['author', 'edit_time'], name='blog_author_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogcomment',
+            index=models.Index(fields=['blog', 'edit_time'], name='comment_blog_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogcomment',
+            index=models.Index(fields=['author', 'edit_time'], name='comment_author_time_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:31
+
+from django.db import migrations, models
+
+
+def fill_normalized_names(apps, schema_editor):
+    """
+    写入规范化名称；规范化后同名的分类合并到最早建的那个（和原来 get_or_create(name__iexact=...) 的效果一致），
+    其余分类下的博客改挂过去后删除
+    """
+    BlogCategory = apps.get_model('blog', 'BlogCategory')
+    Blog = apps.get_model('blog', 'Blog')
+    survivors = {}
+    for category in BlogCategory.objects.order_by('pk').iterator():
+        normalized = ' '.join(category.name.split()).casefold()
+        survivor = survivors.get(normalized)
+        if survivor is None:
+            survivors[normalized] = category.pk
+            BlogCategory.objects.filter(pk=category.pk).update(normalized_name=normalized)
+        else:
+            Blog.objects.filter(category_id=category.pk).update(category_id=survivor)
+            BlogCategory.objects.filter(pk=category.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogcategory',
+            name='normalized_name',
+            field=models.CharField(editable=False, max_length=200, null=True, verbose_name='规范化名称'),
+        ),
+        migrations.RunPython(fill_normalized_names, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='blogcategory',
+            name='normalized_name',
+            field=models.CharField(editable=False, max_length=200, unique=True, verbose_name='规范化名称'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:23
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+
+def fill_archive_counts(apps, schema_editor):
+    """按现有博客统计一次（之后由发布/删除时增减，偏差用 rebuild_archive_counts 修复）"""
+    Blog = apps.get_model('blog', 'Blog')
+    BlogCategory = apps.get_model('blog', 'BlogCategory')
+    BlogMonthArchive = apps.get_model('blog', 'BlogMonthArchive')
+    for category_id, n in Blog.objects.order_by().values_list('category').annotate(n=Count('pk')):
+        BlogCategory.objects.filter(pk=category_id).update(blog_count=n)
+    months = Counter(
+        (timezone.localtime(edit_time) if timezone.is_aware(edit_time) else edit_time).date().replace(day=1)
+        for edit_time in Blog.objects.values_list('edit_time', flat=True).iterator()
+    )
+    BlogMonthArchive.objects.bulk_create([BlogMonthArchive(month=month, blog_count=n) for month, n in months.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_blogcategory_normalized_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogMonthArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True, verbose_name='月份')),
+                ('blog_count', models.PositiveIntegerField(default=0, verbose_name='博客数')),
+            ],
+            options={
+                'verbose_name': '月份归档',
+                'verbose_name_plural': '月份归档',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AddField(
+            model_name='blogcategory',
+            name='blog_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='博客数'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['category', 'edit_time', 'id'], name='blog_category_time_idx'),
+        ),
+        migrations.RunPython(fill_archive_counts, migrations.RunPython.noop),
+    ]
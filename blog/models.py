@@ -1,15 +1,33 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .utils import count_words, html_to_text, make_excerpt
+
 User = get_user_model()
 
 
+def normalize_category_name(name):
+    """分类名去掉首尾和重复的空白、忽略大小写后相同即视为同一分类"""
+    return ' '.join(name.split()).casefold()
+
+
 class BlogCategory(models.Model):
     name = models.CharField(max_length=200,verbose_name='分类名称')
+    # 唯一索引：按名称查找分类走等值查询，并发创建同名分类时只有一个能插入
+    normalized_name = models.CharField(max_length=200,unique=True,editable=False,verbose_name='规范化名称')
+    # 冗余计数：发布/删除博客时原子更新，偏差用 rebuild_archive_counts 修复
+    blog_count = models.PositiveIntegerField(default=0,verbose_name='博客数')
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_category_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_name'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name='博客分类'
         verbose_name_plural=verbose_name
@@ -17,17 +35,58 @@ class BlogCategory(models.Model):
 class Blog(models.Model):
     title = models.CharField(max_length=200,verbose_name='标题')
     content = models.TextField(verbose_name='内容')
+    # 以下三个字段由 content 在保存时生成，列表页只读它们，不再加载整篇正文
+    plain_text = models.TextField(blank=True,default='',verbose_name='纯文本')
+    excerpt = models.CharField(max_length=255,blank=True,default='',verbose_name='摘要')
+    word_count = models.PositiveIntegerField(default=0,verbose_name='字数')
     edit_time = models.DateTimeField(auto_now_add=True,verbose_name='发布时间')
     category = models.ForeignKey(BlogCategory, on_delete=models.CASCADE,verbose_name='分类')
     author = models.ForeignKey(User, on_delete=models.CASCADE,verbose_name='作者')
+    # 冗余计数：由发表/删除评论时原子更新，偏差用 reconcile_comment_counts 修复
+    comment_count = models.PositiveIntegerField(default=0,verbose_name='评论数')
 
     def __str__(self):
         return self.title
 
+    def refresh_text_fields(self):
+        self.plain_text = html_to_text(self.content)
+        self.excerpt = make_excerpt(self.plain_text)
+        self.word_count = count_words(self.plain_text)
+
+    def save(self, *args, **kwargs):
+        if 'content' not in self.get_deferred_fields():
+            self.refresh_text_fields()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'content' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'plain_text', 'excerpt', 'word_count'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name='博客'
         verbose_name_plural=verbose_name
         ordering=['-edit_time']
+        indexes=[
+            # 首页游标分页按 (edit_time, id) 排序和比较
+            models.Index(fields=['edit_time', 'id'], name='blog_feed_idx'),
+            # 个人主页：某个作者的博客按时间排序
+            models.Index(fields=['author', 'edit_time'], name='blog_author_time_idx'),
+            # 分类归档：某个分类的博客按 (edit_time, id) 游标分页
+            models.Index(fields=['category', 'edit_time', 'id'], name='blog_category_time_idx'),
+        ]
+
+
+class BlogMonthArchive(models.Model):
+    """按月归档的博客数（月份按 settings.TIME_ZONE 划分），和 BlogCategory.blog_count 一样由发布/删除时维护"""
+    month = models.DateField(unique=True,verbose_name='月份')  # 当月 1 日
+    blog_count = models.PositiveIntegerField(default=0,verbose_name='博客数')
+
+    def __str__(self):
+        return self.month.strftime('%Y-%m')
+
+    class Meta:
+        verbose_name='月份归档'
+        verbose_name_plural=verbose_name
+        ordering=['-month']
 
 class BlogComment(models.Model):
     content = models.TextField(verbose_name='内容')
@@ -41,4 +100,27 @@ class BlogComment(models.Model):
     class Meta:
         verbose_name='评论'
         verbose_name_plural=verbose_name
-        ordering=['-edit_time']
\ No newline at end of file
+        ordering=['-edit_time']
+        indexes=[
+            # 详情页：某篇博客的评论按时间分页
+            models.Index(fields=['blog', 'edit_time'], name='comment_blog_time_idx'),
+            # 个人主页：某个用户的评论按时间排序
+            models.Index(fields=['author', 'edit_time'], name='comment_author_time_idx'),
+        ]
+
+class BlogSearchToken(models.Model):
+    """搜索倒排索引：每篇博客的每个词元一行，权重=标题出现次数*3+正文出现次数"""
+    token = models.CharField(max_length=32, verbose_name='词元')
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='search_tokens', verbose_name='所属博客')
+    weight = models.PositiveIntegerField(default=1, verbose_name='权重')
+
+    def __str__(self):
+        return self.token
+
+    class Meta:
+        verbose_name='搜索索引'
+        verbose_name_plural=verbose_name
+        constraints=[
+            # 联合唯一索引同时承担按词元查找（token 在最左）
+            models.UniqueConstraint(fields=['token', 'blog'], name='blog_search_token_uniq'),
+        ]
@@ -0,0 +1,102 @@
+"""
+匿名访客的整页缓存（首页、详情页）。
+
+没有 session cookie、也没有待显示提示消息的 GET/HEAD 请求可以共用同一份页面，
+命中时只读一次缓存，不查库、不渲染模板。缓存键带着版本号（见 cache.py），
+内容变化后旧页面自然不再命中，到期由缓存淘汰：
+    首页  feed_version + 每页条数（手机/电脑各一份）+ 完整路径（游标参数）
+    详情  该博客的 comment_version + 完整路径（评论页码）
+
+共用页面里不能有访客自己的东西：渲染时 csrf_token 置空（否则第一个访客的 CSRF 密钥会发给所有人），
+页面加载后由 base.html 的脚本请求 BLauth:widgets，拿当前访客的导航栏和 CSRF token 填回去。
+"""
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .cache import comment_version, feed_version
+from .conditional import feed_page_size, pending_messages
+
+PAGE_KEY = 'page:%s:%s'
+
+
+def shareable(request):
+    # 超时设为 0 表示关闭整页缓存：直接走视图，页面照常带访客自己的 CSRF token
+    return (
+        settings.BLOG_PAGE_CACHE_TIMEOUT
+        and request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and not pending_messages(request)
+    )
+
+
+def index_page_key(request, *args, **kwargs):
+    return f'index:{feed_version()}:{feed_page_size(request)}'
+
+
+def detail_page_key(request, blog_id, *args, **kwargs):
+    return f'detail:{blog_id}:{comment_version(blog_id)}'
+
+
+def _full_key(request, page_key):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return PAGE_KEY % (page_key, path)
+
+
+def _restore(cached):
+    content, content_type = cached
+    return HttpResponse(content, content_type=content_type)
+
+
+def _storable(response):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None
+    return response.content, response['Content-Type']
+
+
+def cache_anonymous_page(key_func):
+    """key_func(request, *args, **kwargs) 返回不含路径的缓存键，版本号要放在里面"""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                if not shareable(request):
+                    return await view(request, *args, **kwargs)
+                key = _full_key(request, await sync_to_async(key_func)(request, *args, **kwargs))
+                cached = await cache.aget(key)
+                if cached is not None:
+                    return _restore(cached)
+                request.shared_page = True
+                response = await view(request, *args, **kwargs)
+                if stored := _storable(response):
+                    await cache.aset(key, stored, settings.BLOG_PAGE_CACHE_TIMEOUT)
+                return response
+            return inner
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if not shareable(request):
+                return view(request, *args, **kwargs)
+            key = _full_key(request, key_func(request, *args, **kwargs))
+            cached = cache.get(key)
+            if cached is not None:
+                return _restore(cached)
+            request.shared_page = True
+            response = view(request, *args, **kwargs)
+            if stored := _storable(response):
+                cache.set(key, stored, settings.BLOG_PAGE_CACHE_TIMEOUT)
+            return response
+        return inner
+    return decorator
+
+
+def shared_page(request):
+    """模板上下文处理器：共用页面不带访客自己的 CSRF token，并让 base.html 加载访客相关的部分"""
+    if getattr(request, 'shared_page', False):
+        return {'shared_page': True, 'csrf_token': ''}
+    return {}
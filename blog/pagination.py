@@ -0,0 +1,162 @@
+from datetime import datetime
+
+from django.db.models import Q
+
+# 游标格式：发布时间(微秒精度)_主键，例如 20250101120000000000_42
+CURSOR_TIME_FORMAT = '%Y%m%d%H%M%S%f'
+
+
+def encode_cursor(edit_time, pk):
+    return f'{edit_time.strftime(CURSOR_TIME_FORMAT)}_{pk}'
+
+
+def decode_cursor(value):
+    """解析游标，非法游标返回 None（当作第一页处理）"""
+    try:
+        time_part, pk_part = value.split('_', 1)
+        return datetime.strptime(time_part, CURSOR_TIME_FORMAT), int(pk_part)
+    except (AttributeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    """游标分页的一页，接口尽量和 django Page 保持一致，模板用法相同"""
+
+    def __init__(self, object_list, number, newer_cursor, older_cursor, window):
+        self.object_list = object_list
+        self.number = number
+        self.newer_cursor = newer_cursor
+        self.older_cursor = older_cursor
+        # [(页码, 查询参数)]，当前页参数为 None
+        self.window = window
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self.newer_cursor is not None
+
+    def has_next(self):
+        return self.older_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+class KeysetPaginator:
+    """
+    按 (edit_time, id) 倒序的游标分页，不做 COUNT，也没有 OFFSET。
+    ?before=游标 取更旧的一页，?after=游标 取更新的一页，?p= 只用于显示页码。
+    页码窗口通过只取主键和时间的“探测查询”得到，最多向前、向后各 window 页。
+    """
+
+    def __init__(self, queryset, per_page, window=2):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.window = window
+
+    # 外层多加一个冗余的 edit_time 范围条件：只有 OR 时优化器可能放弃 (edit_time, id) 索引
+    @staticmethod
+    def _older_than(key):
+        edit_time, pk = key
+        return Q(edit_time__lte=edit_time) & (Q(edit_time__lt=edit_time) | Q(edit_time=edit_time, pk__lt=pk))
+
+    @staticmethod
+    def _newer_than(key):
+        edit_time, pk = key
+        return Q(edit_time__gte=edit_time) & (Q(edit_time__gt=edit_time) | Q(edit_time=edit_time, pk__gt=pk))
+
+    def _descending(self, qs):
+        return qs.order_by('-edit_time', '-pk')
+
+    def _ascending(self, qs):
+        return qs.order_by('edit_time', 'pk')
+
+    def page(self, before=None, after=None, number=1):
+        steps = self._steps(before, after, number)
+        try:
+            queryset = next(steps)
+            while True:
+                queryset = steps.send(list(queryset))
+        except StopIteration as stop:
+            return stop.value
+
+    async def apage(self, before=None, after=None, number=1):
+        """page() 的异步版本，查询走异步 ORM（ASGI 模式的首页用）"""
+        steps = self._steps(before, after, number)
+        try:
+            queryset = next(steps)
+            while True:
+                queryset = steps.send([row async for row in queryset])
+        except StopIteration as stop:
+            return stop.value
+
+    def _steps(self, before, after, number):
+        """
+        分页逻辑写成生成器：每 yield 一个 queryset，由 page()/apage() 执行后把结果列表 send 回来，
+        同步和异步两个版本共用同一套判断
+        """
+        before = decode_cursor(before) if before else None
+        after = decode_cursor(after) if after else None
+        try:
+            number = max(1, int(number))
+        except (TypeError, ValueError):
+            number = 1
+
+        rows = None
+        if after:
+            rows = yield self._ascending(self.queryset.filter(self._newer_than(after)))[:self.per_page]
+            rows.reverse()
+            if len(rows) < self.per_page:
+                # 已经翻到最前面，直接回到第一页，避免首页不满
+                rows = None
+        elif before:
+            rows = (yield self._descending(self.queryset.filter(self._older_than(before)))[:self.per_page]) or None
+        at_top = rows is None
+        if at_top:
+            rows = yield self._descending(self.queryset)[:self.per_page]
+            number = 1
+
+        if not rows:
+            return KeysetPage([], 1, None, None, [(1, None)])
+
+        first = (rows[0].edit_time, rows[0].pk)
+        last = (rows[-1].edit_time, rows[-1].pk)
+        keys_only = self.queryset.values_list('edit_time', 'pk')
+        limit = self.per_page * self.window
+
+        older_keys = (yield self._descending(keys_only.filter(self._older_than(last)))[:limit]) if len(rows) == self.per_page else []
+        newer_keys = (yield self._ascending(keys_only.filter(self._newer_than(first)))[:limit]) if not at_top else []
+
+        # 向前探测没到上限，说明已经看到了最新一条，用真实位置修正页码
+        if len(newer_keys) < limit:
+            number = -(-len(newer_keys) // self.per_page) + 1
+        else:
+            number = max(number, self.window + 1)
+
+        window = []
+        newer_pages = -(-len(newer_keys) // self.per_page)
+        for k in range(newer_pages, 0, -1):
+            window.append((number - k, self._newer_query(number - k, first if k == 1 else newer_keys[(k - 1) * self.per_page - 1])))
+        window.append((number, None))
+        older_pages = -(-len(older_keys) // self.per_page)
+        for k in range(1, older_pages + 1):
+            window.append((number + k, self._older_query(number + k, last if k == 1 else older_keys[(k - 1) * self.per_page - 1])))
+
+        newer_cursor = self._newer_query(number - 1, first) if newer_keys else None
+        older_cursor = self._older_query(number + 1, last) if older_keys else None
+        return KeysetPage(rows, number, newer_cursor, older_cursor, window)
+
+    @staticmethod
+    def _newer_query(number, key):
+        # 第一页不带游标，保证首页链接稳定
+        if number <= 1:
+            return ''
+        return 'after=%s&p=%d' % (encode_cursor(*key), number)
+
+    @staticmethod
+    def _older_query(number, key):
+        return 'before=%s&p=%d' % (encode_cursor(*key), number)
@@ -0,0 +1,163 @@
+import re
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Blog, BlogSearchToken
+from .utils import CJK_CHARS
+
+# 中日韩文字按单字+二元组切分，其余按字母数字单词切分
+TOKEN_RE = re.compile(f'[{CJK_CHARS}]+|[0-9a-z_]+')
+CJK_RE = re.compile(f'[{CJK_CHARS}]')
+
+MAX_TOKEN_LENGTH = 32
+MAX_QUERY_TERMS = 8
+# 更短的英文数字词只做精确匹配：一两个字母的前缀会命中索引里很大一部分行
+MIN_PREFIX_LENGTH = 3
+TITLE_WEIGHT = 3
+
+
+def tokenize(text):
+    """建索引用：CJK 连续片段产出单字和相邻二元组，英文数字产出整词"""
+    for run in TOKEN_RE.findall((text or '').lower()):
+        if CJK_RE.match(run):
+            yield from run
+            for i in range(len(run) - 1):
+                yield run[i:i + 2]
+        else:
+            yield run[:MAX_TOKEN_LENGTH]
+
+
+def query_terms(query):
+    """
+    查询用：CJK 单字查单字，多字查二元组（全部命中才算匹配，相当于短语近似）；
+    英文数字按前缀匹配，保留原来 icontains 能搜到半个单词的体验（不足 MIN_PREFIX_LENGTH 的精确匹配）。
+    返回 [(词元, 是否前缀匹配)]
+    """
+    terms = []
+    for run in TOKEN_RE.findall((query or '').lower()):
+        if CJK_RE.match(run):
+            grams = [run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)]
+            terms.extend((gram, False) for gram in grams)
+        else:
+            terms.append((run[:MAX_TOKEN_LENGTH], len(run) >= MIN_PREFIX_LENGTH))
+    return list(dict.fromkeys(terms))[:MAX_QUERY_TERMS]
+
+
+def build_tokens(title, plain_text):
+    weights = Counter()
+    for token in tokenize(title):
+        weights[token] += TITLE_WEIGHT
+    for token in tokenize(plain_text):
+        weights[token] += 1
+    return weights
+
+
+def index_blog(blog):
+    """重建单篇博客的索引（先删后插）"""
+    weights = build_tokens(blog.title, blog.plain_text)
+    with transaction.atomic():
+        BlogSearchToken.objects.filter(blog_id=blog.pk).delete()
+        BlogSearchToken.objects.bulk_create(
+            [BlogSearchToken(token=token, blog_id=blog.pk, weight=weight) for token, weight in weights.items()],
+            batch_size=1000,
+        )
+    return len(weights)
+
+
+def search_postings(terms):
+    """按博客聚合命中的词元：每个查询词都要命中，按权重和排序"""
+    # 词元和查询词都已转小写，用区分大小写的 startswith，LIKE 'x%' 才能走 token 索引
+    conditions = [Q(token__startswith=token) if prefix else Q(token=token) for token, prefix in terms]
+    hits = {f'hit{i}': Count('pk', filter=condition) for i, condition in enumerate(conditions)}
+    return (
+        BlogSearchToken.objects.filter(reduce(or_, conditions))
+        .values('blog')
+        .annotate(score=Sum('weight'), **hits)
+        .filter(**{f'{name}__gt': 0 for name in hits})
+        .order_by('-score', '-blog')
+    )
+
+
+def highlight_words(query):
+    """高亮用的词：查询里的原始片段优先（长的先匹配），再加上切分后的词元"""
+    runs = TOKEN_RE.findall((query or '').lower())
+    return sorted(set(runs) | {token for token, _ in query_terms(query)}, key=len, reverse=True)
+
+
+def highlight(text, words):
+    """转义后给命中的词加 <mark>"""
+    if not words:
+        return escape(text)
+    pattern = re.compile('|'.join(re.escape(word) for word in words), re.IGNORECASE)
+    parts, last = [], 0
+    for match in pattern.finditer(text):
+        parts.append(escape(text[last:match.start()]))
+        parts.append(f'<mark>{escape(match.group())}</mark>')
+        last = match.end()
+    parts.append(escape(text[last:]))
+    return mark_safe(''.join(parts))
+
+
+def make_snippet(text, words, width=120):
+    """截取第一个命中位置附近的一段文字"""
+    lowered = text.lower()
+    positions = [lowered.find(word) for word in words]
+    positions = [pos for pos in positions if pos >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    snippet = text[start:start + width]
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + width < len(text) else ''
+    return mark_safe(prefix + highlight(snippet, words) + suffix)
+
+
+def search_blogs(query, page=1, per_page=10):
+    """
+    返回分页后的搜索结果，page.object_list 里的博客带有
+    highlighted_title / snippet 两个属性供模板使用
+    """
+    postings = _postings(query)
+    paginator = Paginator(postings, per_page)
+    page_obj = paginator.get_page(page)
+    ids = [row['blog'] for row in page_obj.object_list]
+    return _fill_page(page_obj, ids, _result_blogs().in_bulk(ids), query)
+
+
+async def asearch_blogs(query, page=1, per_page=10):
+    """search_blogs() 的异步版本（ASGI 模式的搜索页用）"""
+    postings = _postings(query)
+    paginator = Paginator(postings, per_page)
+    # 先异步算好总数，get_page 就不会再同步 COUNT，取到的 object_list 还是惰性的 queryset
+    paginator.count = await postings.acount()
+    page_obj = paginator.get_page(page)
+    ids = [row['blog'] async for row in page_obj.object_list]
+    return _fill_page(page_obj, ids, await _result_blogs().ain_bulk(ids), query)
+
+
+def _postings(query):
+    terms = query_terms(query)
+    return search_postings(terms) if terms else BlogSearchToken.objects.none().values('blog')
+
+
+def _result_blogs():
+    return Blog.objects.select_related('author__profile', 'category').defer('content')
+
+
+def _fill_page(page_obj, ids, blogs, query):
+    words = highlight_words(query)
+    results = []
+    for blog_id in ids:
+        blog = blogs.get(blog_id)
+        if blog is None:
+            continue
+        blog.highlighted_title = highlight(blog.title, words)
+        blog.snippet = make_snippet(blog.plain_text, words)
+        results.append(blog)
+    page_obj.object_list = results
+    return page_obj
@@ -0,0 +1,241 @@
+"""
+生成可复现的测试数据（seed_data、audit_query_plans 共用）。
+
+同样的参数和随机种子生成同样的数据：博客正文是长度接近真实分布的 HTML，
+评论数按 Zipf 分布集中在少数热门博客上，用来压测评论的深分页。
+所有生成的行都用 prefix 标记（用户名、分类名），delete_seed 据此清理。
+"""
+import math
+import os
+import random
+import shutil
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image
+
+from BLauth.models import UserEmail
+from private.avatars import AVATAR_FORMATS, render_variants, store_variants
+from private.models import UserProfile
+from .archive import rebuild_archive_counts
+from .cache import bump_category_version, bump_comment_version, bump_feed_version
+from .models import Blog, BlogCategory, BlogComment, BlogSearchToken, normalize_category_name
+from .search import build_tokens
+
+User = get_user_model()
+
+SEED_PASSWORD = 'seed-password-123'
+CATEGORY_NAMES = ['Python', 'Django', '数据库', '前端', '运维', '算法', '随笔', '读书']
+WORDS = ['数据库', '索引', '缓存', '分页', '查询', '优化', '部署', '前端', '接口', '并发',
+         '事务', '模板', '视图', '中间件', '日志', '测试', '性能', '评论', '搜索', '用户']
+LATIN_WORDS = ['django', 'mysql', 'redis', 'nginx', 'python', 'query', 'index', 'cache', 'select', 'waitress']
+PHRASES = ['今天记录一下', '踩坑之后发现', '简单来说', '需要注意的是', '最后总结一下', '对比之前的写法']
+CODE_SAMPLE = (
+    '<pre><code class="language-python">def get_queryset(self):\n'
+    '    return Blog.objects.select_related(&quot;author&quot;).order_by(&quot;-edit_time&quot;)\n'
+    '</code></pre>'
+)
+# 正文长度（字符）的对数正态分布参数：中位数约 4000，长文偶尔到几万
+CONTENT_MEDIAN = 4000
+CONTENT_SIGMA = 0.8
+CONTENT_MAX = 60000
+COMMENT_ZIPF = 1.1
+AVATAR_PALETTE = [(231, 76, 60), (52, 152, 219), (46, 204, 113), (155, 89, 182), (241, 196, 15), (52, 73, 94)]
+
+
+@contextmanager
+def explicit_edit_time(*models):
+    """批量插入时保留生成的 edit_time（auto_now_add 默认会改成当前时间）"""
+    fields = [model._meta.get_field('edit_time') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def sentence(rng):
+    words = rng.choices(WORDS, k=rng.randint(4, 10)) + rng.choices(LATIN_WORDS, k=rng.randint(0, 2))
+    rng.shuffle(words)
+    return rng.choice(PHRASES) + '，' + ''.join(w if w in WORDS else f' {w} ' for w in words) + '。'
+
+
+def make_content(rng):
+    target = min(CONTENT_MAX, int(rng.lognormvariate(math.log(CONTENT_MEDIAN), CONTENT_SIGMA)))
+    parts, size = [], 0
+    while size < target:
+        roll = rng.random()
+        if roll < 0.1:
+            part = f'<h2>{rng.choice(WORDS)}{rng.choice(WORDS)}</h2>'
+        elif roll < 0.2:
+            part = CODE_SAMPLE
+        elif roll < 0.25:
+            part = '<ul>' + ''.join(f'<li>{sentence(rng)}</li>' for _ in range(3)) + '</ul>'
+        else:
+            part = '<p>' + ''.join(sentence(rng) for _ in range(rng.randint(2, 6))) + '</p>'
+        parts.append(part)
+        size += len(part)
+    return ''.join(parts)
+
+
+def _avatar_variants():
+    """几种纯色头像，各生成一次缩略图，写文件时复用"""
+    palette = []
+    for color in AVATAR_PALETTE:
+        buffer = BytesIO()
+        Image.new('RGB', (300, 300), color).save(buffer, 'JPEG')
+        buffer.seek(0)
+        palette.append(render_variants(buffer))
+    return palette
+
+
+def seed_dataset(users=50, blogs=500, comments=5000, prefix='seed_', seed=0, avatars=True, log=None):
+    """生成数据，返回各表插入的行数"""
+    # 整体放进一个事务：SQLite 自动提交模式下 executemany 会逐行提交
+    with transaction.atomic():
+        counts = _seed(users, blogs, comments, prefix, seed, avatars, log or (lambda message: None))
+        # bulk_create 没有逐篇计入归档，整体重新统计一次
+        rebuild_archive_counts()
+    # MySQL 的 ANALYZE TABLE 会隐式提交，放在事务外面
+    analyze()
+    # bulk_create 不发信号，首页的 ETag 手动失效
+    bump_feed_version()
+    return counts
+
+
+def _seed(users, blogs, comments, prefix, seed, avatars, log):
+    rng = random.Random(seed)
+    now = timezone.now().replace(microsecond=0)
+
+    password = make_password(SEED_PASSWORD)
+    User.objects.bulk_create([
+        User(username=f'{prefix}user{i}', email=f'{prefix}user{i}@example.com', password=password,
+             date_joined=now - timedelta(days=rng.randint(0, 730)))
+        for i in range(max(users, 2))
+    ], batch_size=1000)
+    # MySQL 的 bulk_create 拿不到主键，插入后重新查
+    user_list = list(User.objects.filter(username__startswith=prefix).order_by('pk'))
+    # bulk_create 不发 post_save，邮箱索引手动补上，生成的用户才能按邮箱登录
+    UserEmail.objects.bulk_create([UserEmail(user=user, email=user.email) for user in user_list], batch_size=1000)
+
+    profiles = [UserProfile(user=user) for user in user_list]
+    if avatars:
+        palette = _avatar_variants()
+        for profile in profiles:
+            profile.avatar.name = store_variants(profile.user_id, rng.choice(palette))
+            profile.avatar_formats = AVATAR_FORMATS
+    UserProfile.objects.bulk_create(profiles, batch_size=1000)
+    log(f'用户 {len(user_list)} 个')
+
+    # bulk_create 不调用 save()，规范化名称手动填；也不发信号，分类列表缓存手动失效
+    BlogCategory.objects.bulk_create([
+        BlogCategory(name=f'{prefix}{name}', normalized_name=normalize_category_name(f'{prefix}{name}'))
+        for name in CATEGORY_NAMES
+    ])
+    bump_category_version()
+    categories = list(BlogCategory.objects.filter(name__startswith=prefix))
+
+    # 少数作者写大部分博客
+    author_weights = list(accumulate(1 / (rank + 1) for rank in range(len(user_list))))
+    blog_objs = []
+    for i in range(blogs):
+        blog = Blog(
+            title=f'{rng.choice(WORDS)}{rng.choice(WORDS)}：{rng.choice(LATIN_WORDS)} 实践 {i}',
+            content=make_content(rng),
+            category=rng.choice(categories),
+            author=rng.choices(user_list, cum_weights=author_weights)[0],
+            edit_time=now - timedelta(seconds=rng.randint(0, 730 * 86400)),
+        )
+        blog.refresh_text_fields()
+        blog_objs.append(blog)
+
+    # 评论数按 Zipf 分布分给博客，热门博客的评论足够深分页
+    blog_weights = [1 / (rank + 1) ** COMMENT_ZIPF for rank in range(blogs)]
+    rng.shuffle(blog_weights)
+    targets = rng.choices(range(blogs), blog_weights, k=comments) if blogs else []
+    for index in targets:
+        blog_objs[index].comment_count += 1
+
+    with explicit_edit_time(Blog, BlogComment):
+        Blog.objects.bulk_create(blog_objs, batch_size=200)
+        blog_list = list(
+            Blog.objects.filter(author__username__startswith=prefix)
+            .only('id', 'title', 'plain_text', 'edit_time', 'comment_count').order_by('pk')
+        )
+        log(f'博客 {len(blog_list)} 篇')
+
+        comment_objs = []
+        for blog in blog_list:
+            span = max(1, int((now - blog.edit_time).total_seconds()))
+            for _ in range(blog.comment_count):
+                comment_objs.append(BlogComment(
+                    content=sentence(rng),
+                    blog=blog,
+                    author=rng.choice(user_list),
+                    edit_time=blog.edit_time + timedelta(seconds=rng.randint(0, span)),
+                ))
+        BlogComment.objects.bulk_create(comment_objs, batch_size=1000)
+        log(f'评论 {len(comment_objs)} 条')
+
+    # 索引行数是博客数的几百倍，直接 executemany，不逐行构造模型对象
+    tokens = [
+        (token, blog.pk, weight)
+        for blog in blog_list
+        for token, weight in build_tokens(blog.title, blog.plain_text).items()
+    ]
+    table = connection.ops.quote_name(BlogSearchToken._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(tokens), 5000):
+            cursor.executemany(
+                f'INSERT INTO {table} (token, blog_id, weight) VALUES (%s, %s, %s)', tokens[start:start + 5000]
+            )
+    log(f'搜索索引 {len(tokens)} 行')
+    return {'users': len(user_list), 'blogs': len(blog_list), 'comments': len(comment_objs), 'tokens': len(tokens)}
+
+
+def analyze():
+    """更新统计信息，让优化器按真实数据量选执行计划"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            for model in (User, Blog, BlogComment, BlogSearchToken):
+                cursor.execute(f'ANALYZE TABLE {connection.ops.quote_name(model._meta.db_table)}')
+                cursor.fetchall()
+        elif connection.vendor == 'sqlite':
+            cursor.execute('ANALYZE')
+
+
+def delete_seed(prefix):
+    """删除 prefix 标记的全部数据和头像文件"""
+    seeded_blogs = Blog.objects.filter(author__username__startswith=prefix)
+    # 大表直接删，不走逐行的级联收集
+    BlogSearchToken.objects.filter(blog__in=seeded_blogs.values('pk'))._raw_delete(connection.alias)
+    BlogComment.objects.filter(blog__in=seeded_blogs.values('pk'))._raw_delete(connection.alias)
+    seeded_blogs._raw_delete(connection.alias)
+
+    user_ids = list(User.objects.filter(username__startswith=prefix).values_list('pk', flat=True))
+    # 生成的用户在其他博客下的评论（比如压测发的），删掉并扣回那些博客的评论数
+    stray = Counter(BlogComment.objects.filter(author_id__in=user_ids).values_list('blog_id', flat=True).iterator())
+    with transaction.atomic():
+        BlogComment.objects.filter(author_id__in=user_ids)._raw_delete(connection.alias)
+        for blog_id, amount in stray.items():
+            Blog.objects.filter(pk=blog_id, comment_count__gte=amount).update(comment_count=F('comment_count') - amount)
+            Blog.objects.filter(pk=blog_id, comment_count__lt=amount).update(comment_count=0)
+    for blog_id in stray:
+        bump_comment_version(blog_id)
+    for user_id in user_ids:
+        shutil.rmtree(os.path.join(settings.MEDIA_ROOT, 'avatars', str(user_id)), ignore_errors=True)
+    User.objects.filter(pk__in=user_ids).delete()
+    BlogCategory.objects.filter(name__startswith=prefix, blog__isnull=True).delete()
+    rebuild_archive_counts()
+    bump_feed_version()
@@ -0,0 +1,46 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from private.models import UserProfile
+from .cache import bump_category_version, bump_comment_version, bump_feed_version
+from .models import Blog, BlogCategory, BlogComment
+from .search import index_blog
+
+
+@receiver(post_save, sender=Blog)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """新建/修改标题正文时同步搜索索引；删除博客时索引随外键级联删除"""
+    if update_fields is not None and not {'title', 'plain_text'} & set(update_fields):
+        return
+    index_blog(instance)
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def expire_blog_pages(sender, instance, **kwargs):
+    """博客新增、修改或删除后首页和该博客详情页的 ETag 失效"""
+    bump_feed_version()
+    bump_comment_version(instance.pk)
+
+
+@receiver(post_save, sender=BlogComment)
+@receiver(post_delete, sender=BlogComment)
+def expire_comment_fragments(sender, instance, **kwargs):
+    """评论发表、修改或删除（包括级联删除）后让该博客的评论片段缓存失效，首页卡片上的评论数也随之变化"""
+    bump_comment_version(instance.blog_id)
+    bump_feed_version()
+
+
+@receiver(post_save, sender=UserProfile)
+def expire_feed_avatars(sender, instance, update_fields=None, **kwargs):
+    """首页卡片上有作者头像"""
+    if update_fields is not None and 'avatar' not in update_fields:
+        return
+    bump_feed_version()
+
+
+@receiver(post_save, sender=BlogCategory)
+@receiver(post_delete, sender=BlogCategory)
+def expire_category_list(sender, **kwargs):
+    """发布页的分类列表缓存失效"""
+    bump_category_version()
@@ -1,3 +1,642 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from itertools import count
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.http import Http404
+from django.template.backends.django import Template as BackendTemplate
+from django.templatetags.static import static
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from BLauth.codes import CHANGE_EMAIL, STORES
+from BLauth.models import OutboundMail
+from Djangolearn.metrics import BudgetExceeded, install_template_timer, registry
+from private import async_views as private_async_views
+from private.models import UserProfile
+from . import async_views
+from .categories import category_names, get_or_create_category
+from .models import Blog, BlogCategory, BlogComment, BlogMonthArchive
+from .search import query_terms
+from .seed import delete_seed
+from .utils import EXCERPT_LENGTH, count_words
+
+User = get_user_model()
+
+_seq = count(1)
+
+
+def make_user(with_avatar=True):
+    """创建测试用户，默认带头像资料"""
+    n = next(_seq)
+    user = User.objects.create_user(username=f'user{n}', email=f'{n}@qq.com', password='pass123456')
+    if with_avatar:
+        UserProfile.objects.create(user=user, avatar=f'avatars/{user.id}/a.png')
+    return user
+
+
+def make_blog(author=None, category=None, **kwargs):
+    category = category or BlogCategory.objects.create(name=f'分类{next(_seq)}')
+    return Blog.objects.create(
+        title=kwargs.pop('title', f'标题{next(_seq)}'),
+        content=kwargs.pop('content', '<p>正文内容</p>'),
+        category=category,
+        author=author or make_user(),
+        **kwargs
+    )
+
+
+class QueryCountMixin:
+    """查询数断言：数据量增长后，同一页面的 SQL 条数必须保持不变"""
+
+    def count_queries(self, url, client=None):
+        # 每次都清空缓存，量的是缓存未命中时的最坏情况
+        cache.clear()
+        client = client or self.client
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertFlatQueryCount(self, url, add_rows, client=None, rounds=2):
+        """先请求一次记录基准查询数，每轮调用 add_rows() 增加数据后再请求，查询数不得增加"""
+        baseline = self.count_queries(url, client)
+        for _ in range(rounds):
+            add_rows()
+            self.assertEqual(
+                self.count_queries(url, client), baseline,
+                f'{url} 的查询数随数据量增长，存在 N+1 查询'
+            )
+        return baseline
+
+
+class ListQueryCountTests(QueryCountMixin, TestCase):
+
+    def test_index_query_count_is_flat(self):
+        # 先铺满一页，翻页探测查询从一开始就计入基准
+        for _ in range(7):
+            make_blog()
+        self.assertFlatQueryCount(reverse('blog:index'), lambda: [make_blog() for _ in range(3)])
+
+    def test_blog_detail_query_count_is_flat(self):
+        blog = make_blog()
+
+        def add_comments():
+            for _ in range(3):
+                BlogComment.objects.create(content='评论', blog=blog, author=make_user())
+            Blog.objects.filter(pk=blog.pk).update(comment_count=F('comment_count') + 3)
+
+        add_comments()
+        self.assertFlatQueryCount(reverse('blog:blog_detail', args=[blog.id]), add_comments)
+
+    def test_search_query_count_is_flat(self):
+        make_blog(title='关键字 first')
+        self.assertFlatQueryCount(
+            reverse('blog:search') + '?q=关键字',
+            lambda: [make_blog(title='关键字 more') for _ in range(3)]
+        )
+
+
+class QueryPlanAuditTests(TestCase):
+
+    def test_main_queries_use_indexes(self):
+        # 出现全表扫描或文件排序时命令抛 CommandError
+        out = StringIO()
+        call_command('audit_query_plans', seed=300, stdout=out)
+        self.assertIn('所有查询都走了索引', out.getvalue())
+        self.assertFalse(Blog.objects.exists())
+
+
+class BenchmarkTests(TestCase):
+
+    def test_seed_is_reproducible_and_benchmark_writes_json(self):
+        call_command('seed_data', users=5, blogs=20, comments=80, no_avatars=True, stdout=StringIO())
+        titles = list(Blog.objects.order_by('title').values_list('title', flat=True))
+        self.assertEqual(BlogComment.objects.count(), 80)
+        self.assertEqual(sum(Blog.objects.values_list('comment_count', flat=True)), 80)
+
+        call_command('seed_data', users=5, blogs=20, comments=80, no_avatars=True, stdout=StringIO())
+        self.assertEqual(list(Blog.objects.order_by('title').values_list('title', flat=True)), titles)
+
+        output = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        call_command('benchmark', requests=3, warmup=1, output=output, stdout=StringIO())
+        with open(output, encoding='utf-8') as f:
+            report = json.load(f)
+        for name in ('index', 'detail', 'search', 'profile', 'comment'):
+            self.assertEqual(report['scenarios'][name]['errors'], 0, name)
+            self.assertGreater(report['scenarios'][name]['queries_per_request'], 0)
+
+    def test_cold_benchmark_leaves_shared_cache_alone(self):
+        call_command('seed_data', users=3, blogs=5, comments=10, no_avatars=True, stdout=StringIO())
+        cache.set('bench:keep', 1)
+        call_command('benchmark', requests=1, warmup=0, scenarios='index', cold=True, stdout=StringIO())
+        self.assertEqual(cache.get('bench:keep'), 1)
+
+    def test_delete_seed_restores_counts_on_real_blogs(self):
+        real = make_blog()
+        call_command('seed_data', users=3, blogs=5, comments=10, no_avatars=True, stdout=StringIO())
+        seeded = User.objects.filter(username__startswith='seed_').first()
+        self.client.force_login(seeded)
+        self.client.post(reverse('blog:pub_comment'), {'blog_id': real.id, 'content': '压测评论'})
+        real.refresh_from_db()
+        self.assertEqual(real.comment_count, 1)
+
+        delete_seed('seed_')
+        real.refresh_from_db()
+        self.assertEqual(real.comment_count, 0)
+        self.assertFalse(BlogComment.objects.exists())
+
+
+class DerivedTextFieldTests(TestCase):
+
+    def test_html_stripped_and_mixed_words_counted(self):
+        blog = make_blog(content='<h2>数据库&amp;索引</h2>\n<p>用 <b>Django</b> ORM 查询，共 2 次。</p><script>x</script>')
+        self.assertEqual(blog.plain_text, '数据库&索引 用 Django ORM 查询，共 2 次。x')
+        # 汉字逐字计数，英文和数字按词计数
+        self.assertEqual(count_words('数据库索引 用 Django ORM 查询，共 2 次'), 13)
+        self.assertEqual(count_words('foo_bar baz-qux'), 4)
+        self.assertEqual(blog.excerpt, blog.plain_text)
+
+    def test_excerpt_truncated_and_refreshed_on_content_update(self):
+        blog = make_blog(content='<p>' + '字' * 300 + '</p>')
+        self.assertEqual(len(blog.excerpt), EXCERPT_LENGTH)
+        # 末尾换成省略号（中文环境下是 ...），总长度不超过上限
+        self.assertNotEqual(blog.excerpt, blog.plain_text)
+        self.assertTrue(blog.plain_text.startswith(blog.excerpt.rstrip('.…')))
+        self.assertEqual(blog.word_count, 300)
+
+        blog.content = '<p>short text</p>'
+        blog.save(update_fields=['content'])
+        blog.refresh_from_db()
+        self.assertEqual((blog.plain_text, blog.excerpt, blog.word_count), ('short text', 'short text', 2))
+
+        # 正文没加载时保存其他字段，不会把派生字段清空
+        partial = Blog.objects.defer('content').get(pk=blog.pk)
+        partial.title = '新标题'
+        partial.save(update_fields=['title'])
+        blog.refresh_from_db()
+        self.assertEqual(blog.word_count, 2)
+
+
+class KeysetPaginationTests(TestCase):
+
+    def test_walks_feed_without_gaps_or_duplicates(self):
+        author = make_user()
+        category = BlogCategory.objects.create(name='分类')
+        ids = [make_blog(author=author, category=category).id for _ in range(15)]
+        # 同一时间戳的多条记录也要靠 id 区分先后
+        Blog.objects.filter(id__in=ids[5:10]).update(edit_time=Blog.objects.get(id=ids[5]).edit_time)
+
+        seen, query, numbers = [], '', []
+        while query is not None:
+            response = self.client.get(reverse('blog:index') + '?' + query)
+            page = response.context['blogs']
+            seen.extend(blog.id for blog in page)
+            numbers.append(page.number)
+            query = page.older_cursor
+        expected = list(Blog.objects.order_by('-edit_time', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(numbers, [1, 2, 3])
+
+        # 从最后一页往回翻，页码和内容保持一致
+        page = response.context['blogs']
+        response = self.client.get(reverse('blog:index') + '?' + page.newer_cursor)
+        self.assertEqual(response.context['blogs'].number, 2)
+        self.assertEqual([blog.id for blog in response.context['blogs']], expected[6:12])
+
+
+class SearchTests(TestCase):
+
+    def test_cjk_and_prefix_search_ranked_and_highlighted(self):
+        title_hit = make_blog(title='数据库索引优化', content='<p>正文</p>')
+        body_hit = make_blog(title='杂谈', content='<p>聊聊<b>数据库</b>和 Django 的事</p>')
+        make_blog(title='无关', content='<p>数据 与 仓库</p>')
+
+        response = self.client.get(reverse('blog:search'), {'q': '数据库'})
+        results = list(response.context['results'])
+        self.assertEqual([blog.id for blog in results], [title_hit.id, body_hit.id])
+        self.assertIn('<mark>数据库</mark>', results[1].snippet)
+
+        response = self.client.get(reverse('blog:search'), {'q': 'djan'})
+        self.assertEqual([blog.id for blog in response.context['results']], [body_hit.id])
+
+    def test_short_latin_terms_match_exactly(self):
+        self.assertEqual(query_terms('a go djan'), [('a', False), ('go', False), ('djan', True)])
+        go = make_blog(title='go 并发')
+        make_blog(title='google 搜索')
+        response = self.client.get(reverse('blog:search'), {'q': 'go'})
+        self.assertEqual([blog.id for blog in response.context['results']], [go.id])
+        self.assertEqual(self.client.get(reverse('blog:search'), {'q': 'goo'}).context['results'].paginator.count, 1)
+
+    def test_index_follows_delete(self):
+        blog = make_blog(title='一次性文章')
+        blog.delete()
+        response = self.client.get(reverse('blog:search'), {'q': '一次性'})
+        self.assertEqual(response.context['results'].paginator.count, 0)
+
+
+class CategoryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_normalized_names_are_unique(self):
+        category = get_or_create_category('  Django   Tips ')
+        self.assertEqual(category.name, 'Django Tips')
+        self.assertEqual(get_or_create_category('django tips').pk, category.pk)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BlogCategory.objects.create(name='DJANGO TIPS')
+
+    def test_category_list_cached_until_categories_change(self):
+        BlogCategory.objects.create(name='Python')
+        self.assertEqual(category_names(), ['Python'])
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(category_names(), ['Python'])
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        get_or_create_category('数据库')
+        self.assertEqual(category_names(), ['Python', '数据库'])
+
+
+class ArchiveTests(QueryCountMixin, TestCase):
+
+    def test_publish_and_delete_maintain_counts(self):
+        user = make_user()
+        self.client.force_login(user)
+        self.client.post(reverse('blog:blog_edit'), {'title': '归档', 'content': '<p>正文</p>', 'category_name': 'Python'})
+        blog = Blog.objects.get(title='归档')
+        month = BlogMonthArchive.objects.get()
+        self.assertEqual((blog.category.blog_count, month.blog_count), (1, 1))
+
+        response = self.client.get(reverse('blog:month_archive', args=[month.month.year, month.month.month]))
+        self.assertContains(response, '（共 1 篇）')
+        self.assertEqual([b.id for b in response.context['blogs']], [blog.id])
+
+        self.client.post(reverse('private:delete_blog', args=[blog.id]))
+        month.refresh_from_db()
+        self.assertEqual((BlogCategory.objects.get(pk=blog.category_id).blog_count, month.blog_count), (0, 0))
+
+    def test_category_page_is_flat_and_rebuild_fixes_drift(self):
+        category = BlogCategory.objects.create(name='分页')
+        for _ in range(7):
+            make_blog(category=category)
+        make_blog()
+        self.assertFlatQueryCount(
+            reverse('blog:category', args=[category.id]),
+            lambda: [make_blog(category=category) for _ in range(3)],
+        )
+
+        out = StringIO()
+        call_command('rebuild_archive_counts', stdout=out)
+        self.assertIn('分类 分页: 记录 0，实际 13', out.getvalue())
+        self.assertEqual(BlogMonthArchive.objects.get().blog_count, Blog.objects.count())
+        self.assertContains(self.client.get(reverse('blog:archives')), '分页（13）')
+
+
+class CommentCountTests(TestCase):
+
+    def test_publish_and_delete_keep_counter_in_sync(self):
+        blog = make_blog()
+        user = make_user()
+        self.client.force_login(user)
+        self.client.post(reverse('blog:pub_comment'), {'blog_id': blog.id, 'content': '第一条'})
+        self.client.post(reverse('blog:pub_comment'), {'blog_id': blog.id, 'content': '第二条'})
+        blog.refresh_from_db()
+        self.assertEqual(blog.comment_count, 2)
+
+        comment = BlogComment.objects.filter(blog=blog).first()
+        self.client.post(reverse('private:delete_comment', args=[comment.id]))
+        blog.refresh_from_db()
+        self.assertEqual(blog.comment_count, 1)
+
+    def test_ajax_publish_returns_fragment_and_count(self):
+        blog = make_blog()
+        self.client.force_login(make_user())
+        ajax = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+        response = self.client.post(reverse('blog:pub_comment'), {'blog_id': blog.id, 'content': '原地插入'}, **ajax)
+        data = response.json()
+        self.assertEqual(data['code'], 200)
+        self.assertEqual(data['data']['comment_count'], 1)
+        self.assertIn(f'id="comment-{data["data"]["comment_id"]}"', data['data']['html'])
+        self.assertIn('原地插入', data['data']['html'])
+        # 没有留下要在下一页显示的提示
+        detail = self.client.get(reverse('blog:blog_detail', args=[blog.id]))
+        self.assertEqual(list(detail.context['messages']), [])
+
+        self.assertEqual(
+            self.client.post(reverse('blog:pub_comment'), {'blog_id': blog.id, 'content': ' '}, **ajax).json()['code'], 400
+        )
+        response = self.client.post(reverse('private:delete_comment', args=[data['data']['comment_id']]), **ajax)
+        self.assertEqual(response.json()['comment_count'], 0)
+
+    def test_ajax_publish_requires_login(self):
+        blog = make_blog()
+        response = self.client.post(reverse('blog:pub_comment'), {'blog_id': blog.id, 'content': '匿名'},
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json()['code'], 401)
+        self.assertFalse(BlogComment.objects.exists())
+
+    def test_form_post_still_redirects(self):
+        blog = make_blog()
+        self.client.force_login(make_user())
+        response = self.client.post(reverse('blog:pub_comment'), {'blog_id': blog.id, 'content': '无脚本'})
+        comment = BlogComment.objects.get()
+        self.assertRedirects(
+            response, f"{reverse('blog:blog_detail', args=[blog.id])}?comment_page=1#comment-{comment.id}",
+            fetch_redirect_response=False,
+        )
+
+
+class CommentDeepLinkTests(TestCase):
+
+    def setUp(self):
+        self.blog = make_blog()
+        self.user = make_user()
+        comments = [BlogComment.objects.create(content=f'评论{i}', blog=self.blog, author=self.user) for i in range(14)]
+        Blog.objects.filter(pk=self.blog.pk).update(comment_count=14)
+        # 一半评论发布时间相同，靠 id 区分先后
+        BlogComment.objects.filter(pk__in=[c.pk for c in comments[:7]]).update(edit_time=comments[0].edit_time)
+        self.ordered = list(BlogComment.objects.filter(blog=self.blog).order_by('-edit_time', '-id'))
+
+    def test_comment_id_redirects_to_its_page(self):
+        url = reverse('blog:blog_detail', args=[self.blog.id])
+        for position in (0, 5, 6, 13):
+            comment = self.ordered[position]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, {'comment_id': comment.id})
+            # 取发布时间 + 一次 COUNT
+            self.assertEqual(len(ctx.captured_queries), 2)
+            expected = f'{url}?comment_page={position // 6 + 1}#comment-{comment.id}'
+            self.assertRedirects(response, expected, fetch_redirect_response=False)
+            self.assertContains(self.client.get(expected.split('#')[0]), f'id="comment-{comment.id}"')
+
+    def test_profile_link_skips_extra_hop_and_unknown_id_is_ignored(self):
+        self.client.force_login(self.user)
+        comment = self.ordered[8]
+        response = self.client.get(reverse('private:comment_redirect', args=[comment.id]))
+        self.assertRedirects(
+            response, f"{reverse('blog:blog_detail', args=[self.blog.id])}?comment_page=2#comment-{comment.id}",
+            fetch_redirect_response=False,
+        )
+        with mock.patch('private.views.comment_page_url', return_value=None):
+            response = self.client.get(reverse('private:comment_redirect', args=[comment.id]))
+        self.assertRedirects(response, reverse('blog:blog_detail', args=[self.blog.id]), fetch_redirect_response=False)
+        other = make_blog()
+        response = self.client.get(reverse('blog:blog_detail', args=[other.id]), {'comment_id': comment.id})
+        self.assertEqual(response.status_code, 200)
+
+
+# 匿名整页缓存关掉，量的是片段缓存
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class DetailFragmentCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.blog = make_blog(content='<p>缓存正文</p>')
+        self.url = reverse('blog:blog_detail', args=[self.blog.id])
+
+    def test_hot_page_skips_body_and_comment_queries(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertContains(response, '缓存正文')
+        # 只剩取博客本身这一条
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_new_comment_shows_up_immediately(self):
+        user = make_user()
+        self.client.force_login(user)
+        self.client.get(self.url)
+        self.client.post(reverse('blog:pub_comment'), {'blog_id': self.blog.id, 'content': '新鲜评论'})
+        self.assertContains(self.client.get(self.url), '新鲜评论')
+
+
+class StaticAssetTests(TestCase):
+
+    def setUp(self):
+        source = tempfile.mkdtemp()
+        target = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, target, ignore_errors=True)
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'site.css'), 'w') as f:
+            f.write('body { color: #333; }\n' * 200)
+        override = override_settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=target,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_hashed_precompressed_and_immutable(self):
+        call_command('syncstatic', stdout=StringIO())
+        url = static('css/site.css')
+        self.assertRegex(url, r'^/static/css/site\.[0-9a-f]{12}\.css$')
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        # 原文件名每次都要协商
+        self.assertIn('max-age=0', self.client.get('/static/css/site.css')['Cache-Control'])
+
+
+@override_settings(REQUEST_BUDGET_STRICT=True)
+class RequestBudgetTests(TestCase):
+
+    def test_main_pages_stay_within_query_budget(self):
+        # 超出 settings.REQUEST_BUDGETS 时中间件抛 BudgetExceeded，用例直接失败
+        user = make_user()
+        blog = make_blog(author=user)
+        for _ in range(8):
+            make_blog()
+        BlogComment.objects.create(content='评论', blog=blog, author=user)
+        self.client.force_login(user)
+        for url in [reverse('blog:index'), reverse('blog:blog_detail', args=[blog.id]),
+                    reverse('blog:search') + '?q=标题', reverse('private:user_profile')]:
+            cache.clear()
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_over_budget_raises_and_metrics_are_staff_only(self):
+        registry.reset()
+        with override_settings(REQUEST_BUDGETS={'blog:index': {'queries': 0}}):
+            with self.assertRaises(BudgetExceeded):
+                self.client.get(reverse('blog:index'))
+
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        staff = make_user()
+        staff.is_staff = True
+        staff.save()
+        self.client.force_login(staff)
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('django_request_sql_queries_count{view="blog:index"} 1', body)
+
+    def test_template_timer_wraps_once(self):
+        original = BackendTemplate._untimed_render
+        install_template_timer()
+        install_template_timer()
+        self.assertIs(BackendTemplate._untimed_render, original)
+        self.assertIsNot(original, BackendTemplate.render)
+        registry.reset()
+        self.client.get(reverse('blog:index'))
+        self.assertIn('django_request_template_seconds_count{view="blog:index"} 1', registry.render())
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.blog = make_blog()
+
+    def test_index_answers_304_until_feed_changes(self):
+        url = reverse('blog:index')
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        # 手机和电脑每页条数不同
+        self.assertNotEqual(self.client.get(url, HTTP_USER_AGENT='iPhone Mobile')['ETag'], etag)
+
+        make_blog()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_validators_follow_comments_and_viewer(self):
+        url = reverse('blog:blog_detail', args=[self.blog.id])
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        user = make_user()
+        self.client.force_login(user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        etag = response['ETag']
+        self.client.post(reverse('blog:pub_comment'), {'blog_id': self.blog.id, 'content': '新评论'})
+        # 带着提示消息的请求不做条件处理
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, '新评论')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+
+class PageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.blog = make_blog()
+
+    def test_anonymous_hits_skip_orm_and_templates(self):
+        url = reverse('blog:blog_detail', args=[self.blog.id])
+        response = self.client.get(url)
+        # 共用页面里没有访客自己的 CSRF token，由 widgets 接口补上
+        self.assertNotContains(response, 'name="csrfmiddlewaretoken" value=')
+        self.assertContains(response, reverse('BLauth:widgets'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.templates, [])
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        # 新评论换了版本号，旧页面不再命中
+        BlogComment.objects.create(content='新评论', blog=self.blog, author=self.blog.author)
+        Blog.objects.filter(pk=self.blog.pk).update(comment_count=1)
+        self.assertContains(self.client.get(url), '新评论')
+
+    def test_device_variants_and_session_bypass(self):
+        url = reverse('blog:index')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url).templates, [])
+        self.assertNotEqual(self.client.get(url, HTTP_USER_AGENT='Android Mobile').templates, [])
+
+        user = make_user()
+        self.client.force_login(user)
+        response = self.client.get(url)
+        self.assertNotEqual(response.templates, [])
+        self.assertContains(response, '个人中心')
+
+        data = self.client.get(reverse('BLauth:widgets')).json()
+        self.assertTrue(data['authenticated'])
+        self.assertIn('个人中心', data['navbar'])
+        self.client.logout()
+        data = self.client.get(reverse('BLauth:widgets')).json()
+        self.assertEqual((data['authenticated'], data['navbar']), (False, ''))
+        self.assertTrue(data['csrf_token'])
+
+
+    @override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+    def test_zero_timeout_disables_shared_pages(self):
+        url = reverse('blog:blog_detail', args=[self.blog.id])
+        response = self.client.get(url)
+        # 不缓存时表单照常带 CSRF token，也不需要 widgets 脚本
+        self.assertContains(response, 'name="csrfmiddlewaretoken" value=')
+        self.assertNotContains(response, reverse('BLauth:widgets'))
+        self.assertNotEqual(self.client.get(url).templates, [])
+
+
+@override_settings(MAIL_QUEUE_IN_PROCESS=False, CODE_STORE='cache')
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+
+    def request(self, method, path, user=None, **kwargs):
+        request = getattr(self.factory, method)(path, **kwargs)
+        request.user = user or AnonymousUser()
+
+        async def auser():
+            return request.user
+        request.auser = auser
+        return request
+
+    async def test_async_read_views_render_same_pages(self):
+        blog = await sync_to_async(make_blog)(title='异步数据库笔记')
+        await BlogComment.objects.acreate(content='异步评论', blog=blog, author=blog.author)
+        await Blog.objects.filter(pk=blog.pk).aupdate(comment_count=1)
+
+        response = await async_views.index(self.request('get', '/index'))
+        self.assertContains(response, '异步数据库笔记')
+        response = await async_views.blog_detail(self.request('get', f'/blog/{blog.id}'), blog.id)
+        self.assertContains(response, '异步评论')
+        response = await async_views.search(self.request('get', '/search', data={'q': '数据库'}))
+        self.assertContains(response, '<mark>数据库</mark>')
+        with self.assertRaises(Http404):
+            await async_views.blog_detail(self.request('get', '/blog/0'), 0)
+
+    async def test_async_send_code_stores_code_and_queues_mail(self):
+        user = await sync_to_async(make_user)(with_avatar=False)
+        request = self.request(
+            'post', '/private/send-email-change-code/', user=user,
+            data=json.dumps({'new_email': '77777@qq.com'}), content_type='application/json',
+        )
+        response = await private_async_views.send_email_change_code(request)
+        self.assertEqual(json.loads(response.content)['status'], 'success')
+        self.assertIsNotNone(await sync_to_async(STORES['cache'].get)(CHANGE_EMAIL, f'{user.id}:77777@qq.com'))
+        self.assertEqual(await OutboundMail.objects.filter(recipients__contains='77777@qq.com').acount(), 1)
+
+    async def test_metrics_middleware_counts_queries_under_asgi(self):
+        await sync_to_async(make_blog)()
+        registry.reset()
+        response = await self.async_client.get(reverse('blog:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('django_request_sql_queries_count{view="blog:index"} 1', registry.render())
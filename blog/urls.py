@@ -1,13 +1,20 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# ASGI 模式下读接口换成异步视图
+reads = async_views if settings.ASGI_MODE else views
 
 app_name = 'blog'
 
 urlpatterns = [
-    path('', views.index),
-    path('index', views.index, name='index'),
-    path('blog/<int:blog_id>', views.blog_detail, name='blog_detail'),
+    path('', reads.index),
+    path('index', reads.index, name='index'),
+    path('blog/<int:blog_id>', reads.blog_detail, name='blog_detail'),
     path('blog/edit',views.blog_edit,name='blog_edit'),
     path('blog/comment/pub',views.pub_comment,name='pub_comment'),
-    path('search',views.search,name='search'),
+    path('search',reads.search,name='search'),
+    path('archives', views.archives, name='archives'),
+    path('category/<int:category_id>', views.category_archive, name='category'),
+    path('archive/<int:year>/<int:month>', views.month_archive, name='month_archive'),
 ]
\ No newline at end of file
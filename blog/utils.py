@@ -0,0 +1,27 @@
+import html
+import re
+
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+EXCERPT_LENGTH = 200
+
+# 中日韩文字范围（假名、汉字、谚文、兼容汉字）
+CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+
+# 字数统计：中日韩文字一个字算一个，其余按连续字母数字算一个词
+WORD_RE = re.compile(f'[{CJK_CHARS}]|[^\W_]+')
+
+
+def html_to_text(content):
+    """富文本正文转纯文本（去标签、反转义、合并空白）"""
+    return re.sub(r'\s+', ' ', html.unescape(strip_tags(content or ''))).strip()
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """和模板里 truncatechars 的效果一致"""
+    return Truncator(text).chars(length)
+
+
+def count_words(text):
+    return len(WORD_RE.findall(text))
@@ -1,20 +1,46 @@
+from django.conf import settings
 from django.shortcuts import render,redirect,get_object_or_404
+from django.template.loader import render_to_string
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.urls import reverse_lazy,reverse
 from django.contrib.auth.decorators import login_required as django_login_required
 from django.views.decorators.http import require_http_methods,require_POST,require_GET
+from django.views.decorators.vary import vary_on_headers
 from .models import *
 from .forms import EditBlogForm
+from .archive import adjust_archive_counts, month_bounds
+from .cache import comment_version
+from .categories import category_names
+from .conditional import conditional, detail_validators, feed_page_size, index_validators
+from .pagecache import cache_anonymous_page, detail_page_key, index_page_key
+from .pagination import KeysetPaginator
+from .search import search_blogs
 from django.http.response import JsonResponse
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import Http404
 from django.contrib import messages
 from django_ratelimit.decorators import ratelimit
+import logging
+
+logger = logging.getLogger(__name__)
+
+def is_ajax(request):
+    """页面脚本发起的请求（fetch 带 X-Requested-With），返回 JSON 而不是重定向"""
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
 
 # 自定义登录装饰器，添加登录提示
 def login_required(function=None, login_url=None):
     def decorator(view_func):
         def _wrapped_view(request, *args, **kwargs):
             if not request.user.is_authenticated:
+                if is_ajax(request):
+                    return JsonResponse({
+                        'code': 401,
+                        'message': '请先登录！',
+                        'data': {'redirect_url': str(login_url or reverse_lazy('BLauth:login'))}
+                    })
                 messages.info(request, '请先登录！')
                 return redirect(login_url or reverse_lazy('BLauth:login'))
             return view_func(request, *args, **kwargs)
@@ -25,31 +51,92 @@ def login_required(function=None, login_url=None):
 
 # Create your views here.
 
+def feed_paginator(request, *filters):
+    # 作者、头像、分类一次性 JOIN 取出，避免模板里逐条查询
+    # 卡片只用摘要，正文和纯文本都不加载
+    blog_list = Blog.objects.filter(*filters).select_related('author__profile', 'category').defer('content', 'plain_text')
+
+    # 游标分页：按 (edit_time, id) 翻页，不再 COUNT(*) + OFFSET
+    return KeysetPaginator(blog_list, feed_page_size(request))
+
+
+def feed_page_args(request):
+    return {
+        'before': request.GET.get('before'),
+        'after': request.GET.get('after'),
+        'number': request.GET.get('p', 1),
+    }
+
+
+# 每页条数按 User-Agent 区分手机/电脑
+@vary_on_headers('User-Agent')
+@conditional(index_validators)
+@cache_anonymous_page(index_page_key)
 def index(request):
-    blog_list = Blog.objects.all().order_by('-edit_time')
+    blogs = feed_paginator(request).page(**feed_page_args(request))
+    return render(request, 'index.html', {'blogs': blogs})
+
+
+def archives(request):
+    """归档总览：各分类、各月份的博客数直接读冗余计数，不对博客表 GROUP BY"""
+    return render(request, 'archives.html', {
+        'categories': BlogCategory.objects.filter(blog_count__gt=0).order_by('-blog_count', 'pk'),
+        'months': BlogMonthArchive.objects.filter(blog_count__gt=0),
+    })
 
-    # 手机8个，电脑6个 —— 只改数量
-    user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
-    is_mobile = 'mobile' in user_agent or 'android' in user_agent or 'iphone' in user_agent
-    per_page = 8 if is_mobile else 6
 
-    paginator = Paginator(blog_list, per_page)
-    page = request.GET.get('page', 1)
+def category_archive(request, category_id):
+    category = get_object_or_404(BlogCategory, pk=category_id)
+    # (category, edit_time, id) 索引上的游标分页，代价只和页大小有关
+    blogs = feed_paginator(request, Q(category_id=category.pk)).page(**feed_page_args(request))
+    return render(request, 'archive_list.html', {
+        'blogs': blogs,
+        'archive_title': f'分类：{category.name}',
+        'archive_count': category.blog_count,
+    })
 
+
+def month_archive(request, year, month):
     try:
-        blogs = paginator.page(page)
-    except PageNotAnInteger:
-        blogs = paginator.page(1)
-    except EmptyPage:
-        blogs = paginator.page(paginator.num_pages)
+        start, end = month_bounds(year, month)
+    except ValueError:
+        raise Http404('月份不存在')
+    # edit_time 范围 + (edit_time, id) 索引上的游标分页
+    blogs = feed_paginator(request, Q(edit_time__gte=start, edit_time__lt=end)).page(**feed_page_args(request))
+    archive = BlogMonthArchive.objects.filter(month=start.date()).first()
+    return render(request, 'archive_list.html', {
+        'blogs': blogs,
+        'archive_title': f'{year} 年 {month} 月',
+        'archive_count': archive.blog_count if archive else 0,
+    })
 
-    return render(request, 'index.html', {'blogs': blogs})
 
+COMMENTS_PER_PAGE = 6
 
+# 正文延迟加载：只有正文片段缓存未命中时模板才会去取
+DETAIL_QUERYSET = Blog.objects.select_related('author__profile', 'category').defer('content', 'plain_text')
+
+
+@conditional(detail_validators)
+@cache_anonymous_page(detail_page_key)
 def blog_detail(request, blog_id):
-    blog = get_object_or_404(Blog, pk=blog_id)
-    comment_list = blog.comments.all().order_by('-edit_time')
-    paginator = Paginator(comment_list, 6)
+    # ?comment_id=N：直接跳到这条评论所在的页
+    target = comment_page_url(blog_id, request.GET.get('comment_id'))
+    if target:
+        return redirect(target)
+    blog = get_object_or_404(DETAIL_QUERYSET, pk=blog_id)
+    paginator, comments, comment_page = comment_page_for(request, blog)
+    context = detail_context(blog, paginator, comments, comment_page, comment_version(blog.id))
+    return render(request, 'blog_detail.html', context=context)
+
+
+def comment_page_for(request, blog):
+    """评论分页：返回 (paginator, page, 页码)，page.object_list 仍是未执行的 queryset"""
+    # 发布时间相同的按 id 排，和 comment_page_url 的计数规则一致
+    comment_list = blog.comments.select_related('author__profile').order_by('-edit_time', '-id')
+    paginator = Paginator(comment_list, COMMENTS_PER_PAGE)
+    # 总数直接用冗余计数，省掉一次 COUNT
+    paginator.count = blog.comment_count
 
     # 新增：页码范围校验
     comment_page = request.GET.get('comment_page', 1)
@@ -67,13 +154,38 @@ def blog_detail(request, blog_id):
         comments = paginator.page(1)
     except EmptyPage:
         comments = paginator.page(paginator.num_pages)
+    return paginator, comments, comment_page
+
 
-    return render(request, 'blog_detail.html', context={
+def comment_page_url(blog_id, comment_id):
+    """
+    评论所在页的地址（带 #comment-N 锚点），评论不存在或不属于这篇博客时返回 None。
+    页码 = 同一篇博客里排在它前面（更新）的评论数 // 每页条数 + 1，
+    一次 (blog, edit_time) 索引上的范围 COUNT，不逐页查找
+    """
+    try:
+        comment_id = int(comment_id)
+    except (TypeError, ValueError):
+        return None
+    edit_time = BlogComment.objects.filter(pk=comment_id, blog_id=blog_id).values_list('edit_time', flat=True).first()
+    if edit_time is None:
+        return None
+    newer = BlogComment.objects.filter(
+        Q(edit_time__gt=edit_time) | Q(edit_time=edit_time, pk__gt=comment_id), blog_id=blog_id
+    ).count()
+    page = newer // COMMENTS_PER_PAGE + 1
+    return f"{reverse('blog:blog_detail', args=[blog_id])}?comment_page={page}#comment-{comment_id}"
+
+
+def detail_context(blog, paginator, comments, comment_page, version):
+    return {
         'blog': blog,
         'comments': comments,
         'comment_paginator': paginator,
-        'current_comment_page': comment_page  # 用校验后的页码
-    })
+        'current_comment_page': comment_page,  # 用校验后的页码
+        'comment_version': version,
+        'fragment_timeout': settings.BLOG_FRAGMENT_CACHE_TIMEOUT,
+    }
 
 
 
@@ -87,8 +199,8 @@ def blog_detail(request, blog_id):
 @login_required(login_url=reverse_lazy('BLauth:login'))
 def blog_edit(request):
     if request.method == 'GET':
-        categories = BlogCategory.objects.all()
-        return render(request,'blog_edit.html',context={'categories':categories})
+        # 分类列表走两级缓存，不再每次全表读取
+        return render(request,'blog_edit.html',context={'categories':category_names()})
     else:
         form = EditBlogForm(request.POST)
         if form.is_valid():
@@ -106,12 +218,14 @@ def blog_edit(request):
             # ========================================================================
 
             try:
-                blog = Blog.objects.create(
-                    title=title,
-                    content=content,
-                    category_id=category_id,
-                    author=request.user
-                )
+                with transaction.atomic():
+                    blog = Blog.objects.create(
+                        title=title,
+                        content=content,
+                        category_id=category_id,
+                        author=request.user
+                    )
+                    adjust_archive_counts([(blog.category_id, blog.edit_time)], 1)
                 messages.success(request, '博客发布成功！')
                 return JsonResponse({
                     'code':200,
@@ -119,7 +233,7 @@ def blog_edit(request):
                     "data":{"blog_id":blog.id, "redirect_url": f"/blog/{blog.id}"}
                 })
             except Exception as e:
-                print(f"创建博客失败：{str(e)}")
+                logger.exception('创建博客失败')
                 messages.error(request, f'博客发布失败：{str(e)}')
                 return JsonResponse({
                     'code':500,
@@ -130,7 +244,7 @@ def blog_edit(request):
             error_msg = {}
             for field, errors in form.errors.items():
                 error_msg[field] = errors[0]
-            print("表单错误：", error_msg)
+            logger.info('发布博客表单错误：%s', error_msg)
             return JsonResponse({
                 'code':400,
                 'message':'参数错误！',
@@ -155,26 +269,48 @@ def pub_comment(request):
     content = request.POST.get('content', '').strip()
 
     if not content:
+        if is_ajax(request):
+            return JsonResponse({'code': 400, 'message': '评论内容不能为空！'})
         messages.error(request, '评论内容不能为空！')
         comment_page = request.GET.get('comment_page', 1)
         return redirect(f"{reverse('blog:blog_detail', args=[blog_id])}?comment_page={comment_page}")
 
-    blog = get_object_or_404(Blog, pk=blog_id)
+    blog = get_object_or_404(Blog.objects.only('id'), pk=blog_id)
 
     try:
-        BlogComment.objects.create(
-            content=content,
-            blog=blog,
-            author=request.user
-        )
-        messages.success(request, '评论发布成功！')
+        with transaction.atomic():
+            comment = BlogComment.objects.create(
+                content=content,
+                blog=blog,
+                author=request.user
+            )
+            Blog.objects.filter(pk=blog.pk).update(comment_count=F('comment_count') + 1)
+            # 同一事务里读回，拿到的是包含这条评论的计数
+            comment_count = Blog.objects.filter(pk=blog.pk).values_list('comment_count', flat=True).get()
     except Exception as e:
+        logger.exception('发表评论失败')
+        if is_ajax(request):
+            return JsonResponse({'code': 500, 'message': '评论发布失败！', 'error': str(e)})
         messages.error(request, f'评论发布失败：{str(e)}')
         comment_page = request.GET.get('comment_page', 1)
         return redirect(f"{reverse('blog:blog_detail', args=[blog_id])}?comment_page={comment_page}")
 
     # 修复：最新评论在第1页，所以跳转到第1页
-    return redirect(f"{reverse('blog:blog_detail', args=[blog_id])}?comment_page=1#comment-area")
+    redirect_url = f"{reverse('blog:blog_detail', args=[blog.pk])}?comment_page=1#comment-{comment.pk}"
+    if is_ajax(request):
+        # 只返回这一条评论的片段和新的评论数，页面原地插入，不再重定向后整页重新渲染
+        return JsonResponse({
+            'code': 200,
+            'message': '评论发布成功！',
+            'data': {
+                'comment_id': comment.pk,
+                'comment_count': comment_count,
+                'html': render_to_string('comment_item.html', {'comment': comment}, request),
+                'redirect_url': redirect_url,
+            }
+        })
+    messages.success(request, '评论发布成功！')
+    return redirect(redirect_url)
 
 
 
@@ -183,7 +319,11 @@ def pub_comment(request):
 @require_GET
 @ratelimit(key='ip', rate='30/m', method='GET', block=True)
 def search(request):
-    #/search?q=xxx
-    q=request.GET.get('q')
-    blogs=Blog.objects.filter(Q(title__icontains=q) | Q(content__icontains=q)).all()
-    return render(request,'index.html',context={'blogs':blogs})
\ No newline at end of file
+    #/search?q=xxx&page=2
+    q = request.GET.get('q', '').strip()
+    results = search_blogs(q, page=request.GET.get('page', 1))
+    return render(request, 'search.html', context={
+        'q': q,
+        'results': results,
+        'page_range': results.paginator.get_elided_page_range(results.number, on_each_side=2, on_ends=1),
+    })
@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import AccountPurge
 
 # Register your models here.
+
+class AccountPurgeAdmin(admin.ModelAdmin):
+    list_display = ['username','user_id','status','stage','deleted_blogs','deleted_comments','attempts','created_at','finished_at']
+    list_filter = ['status']
+
+admin.site.register(AccountPurge,AccountPurgeAdmin)
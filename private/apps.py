@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PrivateConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'private'
+
+    def ready(self):
+        from Djangolearn.background import serving_requests
+        from .purge import purge_worker
+
+        # 重启前登记的、做到一半租约过期的注销清理接着做，不必等下一个账号注销
+        if settings.ACCOUNT_PURGE_IN_PROCESS and serving_requests():
+            purge_worker.start()
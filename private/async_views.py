@@ -0,0 +1,84 @@
+"""
+ASGI 模式下的三个发送验证码接口：写验证码、邮件入队都用异步接口。
+校验和返回内容和 views.py 里的同名视图一致。
+"""
+import json
+import random
+import re
+import string
+
+from django import forms
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+
+from BLauth.backends import aemail_in_use
+from BLauth.codes import CHANGE_EMAIL, CHANGE_PASSWORD, DELETE_ACCOUNT, TTL, get_code_store
+from BLauth.mailqueue import aqueue_mail
+
+
+async def _send_account_code(request, purpose, subject, message):
+    """注销、修改密码共用：验证码发到当前账号的邮箱"""
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'msg': '请求方式错误'})
+    user = await request.auser()
+    if not user.email:
+        return JsonResponse({'status': 'error', 'msg': '账号未绑定邮箱，无法发送验证码'})
+
+    code = ''.join(random.choices(string.digits, k=6))
+    await get_code_store().aissue(purpose, user.id, code)
+    await aqueue_mail(
+        subject=subject,
+        message=message.format(code=code),
+        from_email=None,  # 使用DEFAULT_FROM_EMAIL
+        recipient_list=[user.email],
+        expires_in=TTL[purpose],
+    )
+    return JsonResponse({'status': 'success', 'msg': '验证码已发送至你的邮箱'})
+
+
+@login_required
+async def send_logout_verify_code(request):
+    return await _send_account_code(
+        request, DELETE_ACCOUNT, '账号注销验证码', '你的账号注销验证码为：{code}（5分钟内有效），请勿泄露给他人！',
+    )
+
+
+@login_required
+async def send_change_pwd_verify_code(request):
+    return await _send_account_code(
+        request, CHANGE_PASSWORD, '修改密码验证码', '你的修改密码验证码为：{code}（5分钟内有效），请勿泄露给他人！',
+    )
+
+
+@login_required
+async def send_email_change_code(request):
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'msg': '请求方式错误'})
+    user = await request.auser()
+    try:
+        data = json.loads(request.body)
+        new_email = data.get('new_email', '').strip()
+
+        if not re.match(r'^\d+@qq\.com$', new_email):
+            return JsonResponse({'status': 'error', 'msg': '新邮箱必须是QQ邮箱（格式：数字@qq.com）'})
+        if new_email == user.email:
+            return JsonResponse({'status': 'error', 'msg': '新邮箱不能与原邮箱相同'})
+        if await aemail_in_use(new_email, exclude_user_id=user.id):
+            return JsonResponse({'status': 'error', 'msg': '该邮箱已被其他账号绑定，请更换邮箱'})
+        try:
+            forms.EmailField().clean(new_email)
+        except forms.ValidationError:
+            return JsonResponse({'status': 'error', 'msg': '发送失败，请输入一个有效的邮箱地址'})
+
+        code = ''.join(random.choices(string.digits, k=6))
+        await get_code_store().aissue(CHANGE_EMAIL, f'{user.id}:{new_email}', code)
+        await aqueue_mail(
+            subject='邮箱修改验证码',
+            message=f'你的邮箱修改验证码为：{code}（5分钟内有效），请勿泄露给他人！',
+            from_email=None,
+            recipient_list=[new_email],
+            expires_in=TTL[CHANGE_EMAIL],
+        )
+        return JsonResponse({'status': 'success', 'msg': '验证码已发送至新邮箱'})
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'msg': f'发送失败：{str(e)}'})
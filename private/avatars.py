@@ -0,0 +1,157 @@
+"""
+头像处理：上传时流式限制大小，解码后按 EXIF 转正、居中裁成正方形，
+缩放成几个固定尺寸，每个尺寸各存一份 JPEG 和 WebP。
+
+文件命名（和原图同目录）：
+    avatars/<用户ID>/<uuid>.jpg          主图，AVATAR_SIZES 中最大的尺寸，同时就是这个尺寸的 JPEG 缩略图
+    avatars/<用户ID>/<uuid>_<尺寸>.jpg   其余尺寸
+    avatars/<用户ID>/<uuid>_<尺寸>.webp
+"""
+import io
+import os
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+AVATAR_SIZES = (32, 64, 128, 256)
+MAIN_SIZE = AVATAR_SIZES[-1]
+WEBP_ENABLED = features.check('webp')
+# 存进 UserProfile.avatar_formats 的值
+AVATAR_FORMATS = 'jpg,webp' if WEBP_ENABLED else 'jpg'
+
+
+class AvatarTooLarge(Exception):
+    pass
+
+
+class InvalidAvatar(Exception):
+    pass
+
+
+class AvatarUploadLimitHandler(FileUploadHandler):
+    """放在上传处理器最前面：超过 AVATAR_MAX_UPLOAD_SIZE 立即停止读取请求体"""
+
+    def __init__(self, request=None, limit=None):
+        super().__init__(request)
+        self.limit = limit or settings.AVATAR_MAX_UPLOAD_SIZE
+        self.exceeded = False
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # 请求体声明的长度已经超了，不必开始解析
+        if content_length > self.limit + 64 * 1024:
+            self.exceeded = True
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        if self.exceeded:
+            raise StopUpload(connection_reset=True)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.limit:
+            self.exceeded = True
+            raise StopUpload(connection_reset=True)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def variant_name(avatar_name, size, ext):
+    # 最大尺寸的 JPEG 就是主图本身，不另存一份
+    if size == MAIN_SIZE and ext == 'jpg':
+        return avatar_name
+    stem = os.path.splitext(avatar_name)[0]
+    return f'{stem}_{size}.{ext}'
+
+
+def _square(image, size):
+    return ImageOps.fit(image, (size, size), Image.LANCZOS, centering=(0.5, 0.5))
+
+
+def _encode(image, ext):
+    buffer = io.BytesIO()
+    if ext == 'webp':
+        image.save(buffer, 'WEBP', quality=80, method=4)
+    else:
+        if image.mode != 'RGB':
+            # JPEG 不支持透明，铺白底
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+            image = background
+        image.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def render_variants(fileobj):
+    """解码并生成 {(尺寸, 扩展名): 字节}，主图也包含在内（尺寸为 MAIN_SIZE 的 jpg）"""
+    try:
+        image = Image.open(fileobj)
+        if image.width * image.height > settings.AVATAR_MAX_PIXELS:
+            raise InvalidAvatar('图片分辨率过大')
+        # JPEG 可以直接按较小尺寸解码，手机大图能省掉大部分解码时间
+        image.draft('RGB', (MAIN_SIZE * 2, MAIN_SIZE * 2))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidAvatar('无法识别的图片文件') from e
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    variants = {}
+    for size in AVATAR_SIZES:
+        resized = _square(image, size)
+        variants[(size, 'jpg')] = _encode(resized, 'jpg')
+        if WEBP_ENABLED:
+            variants[(size, 'webp')] = _encode(resized, 'webp')
+    return variants
+
+
+def delete_avatar_files(avatar_name):
+    if not avatar_name:
+        return
+    names = [avatar_name]
+    names += [variant_name(avatar_name, size, ext) for size in AVATAR_SIZES for ext in ('jpg', 'webp')]
+    for name in names:
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def store_variants(user_id, variants):
+    """把 render_variants 的结果写进 avatars/<用户ID>/，返回主图文件名"""
+    main_name = default_storage.save(
+        os.path.join('avatars', str(user_id), f'{uuid4()}.jpg'),
+        ContentFile(variants[(MAIN_SIZE, 'jpg')]),
+    )
+    for (size, ext), data in variants.items():
+        if (size, ext) != (MAIN_SIZE, 'jpg'):
+            default_storage.save(variant_name(main_name, size, ext), ContentFile(data))
+    return main_name
+
+
+def save_avatar(profile, fileobj):
+    """处理图片并保存到 profile，删除旧头像文件，返回新的主图文件名"""
+    variants = render_variants(fileobj)
+    old_name = profile.avatar.name if profile.avatar else ''
+
+    main_name = store_variants(profile.user_id, variants)
+    profile.avatar.name = main_name
+    profile.avatar_formats = AVATAR_FORMATS
+    profile.save(update_fields=['avatar', 'avatar_formats'])
+    if old_name and old_name != main_name:
+        delete_avatar_files(old_name)
+    return main_name
+
+
+def pick_size(display_size):
+    """按 2 倍屏挑一个不小于显示尺寸的缩略图"""
+    for size in AVATAR_SIZES:
+        if size >= display_size * 2:
+            return size
+    return MAIN_SIZE
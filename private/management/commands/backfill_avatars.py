@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from private.avatars import InvalidAvatar, save_avatar
+from private.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = '为已有头像生成固定尺寸缩略图和 WebP（原图处理后删除）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='已经处理过的头像也重新生成')
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.exclude(avatar='').exclude(avatar__isnull=True)
+        if not options['force']:
+            profiles = profiles.filter(avatar_formats='')
+
+        done = failed = 0
+        for profile in profiles.iterator(chunk_size=100):
+            try:
+                with profile.avatar.open('rb') as f:
+                    save_avatar(profile, f)
+                done += 1
+            except (InvalidAvatar, OSError) as e:
+                failed += 1
+                self.stderr.write(f'用户 {profile.user_id} 的头像处理失败：{e}')
+        self.stdout.write(self.style.SUCCESS(f'处理完成：成功 {done} 个，失败 {failed} 个'))
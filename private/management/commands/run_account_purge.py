@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from private.purge import drain_purges
+
+
+class Command(BaseCommand):
+    help = '执行注销账号的清理任务（独立进程运行，配合 ACCOUNT_PURGE_IN_PROCESS = False）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='处理完当前到期的任务就退出')
+        parser.add_argument('--interval', type=float, default=10, help='没有任务时的轮询间隔（秒）')
+        parser.add_argument('--batch-size', type=int, default=None, help='每批删除的行数，默认 ACCOUNT_PURGE_BATCH_SIZE')
+
+    def handle(self, *args, **options):
+        while True:
+            steps = drain_purges(batch_size=options['batch_size'], progress=self.report)
+            if steps:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def report(self, job):
+        line = f'{job.username}（{job.user_id}）：阶段 {job.stage}，已删博客 {job.deleted_blogs} 篇、评论 {job.deleted_comments} 条'
+        if job.status == job.STATUS_DONE:
+            line = self.style.SUCCESS(line + '，已完成')
+        self.stdout.write(line)
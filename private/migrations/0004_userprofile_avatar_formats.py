@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('private', '0003_alter_userprofile_options_alter_userprofile_avatar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_formats',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:04
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('private', '0004_userprofile_avatar_formats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPurge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(unique=True, verbose_name='用户ID')),
+                ('username', models.CharField(max_length=150, verbose_name='用户名')),
+                ('status', models.CharField(choices=[('pending', '待处理'), ('running', '处理中'), ('done', '已完成'), ('failed', '失败')], default='pending', max_length=10, verbose_name='状态')),
+                ('stage', models.CharField(blank=True, default='', max_length=20, verbose_name='当前阶段')),
+                ('deleted_comments', models.PositiveIntegerField(default=0, verbose_name='已删评论')),
+                ('deleted_blogs', models.PositiveIntegerField(default=0, verbose_name='已删博客')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='尝试次数')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='下次尝试时间')),
+                ('last_error', models.TextField(blank=True, verbose_name='最近错误')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+            ],
+            options={
+                'verbose_name': '账号注销任务',
+                'verbose_name_plural': '账号注销任务',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='account_purge_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:06
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('private', '0005_account_purge'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='VerifyCode',
+        ),
+    ]
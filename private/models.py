@@ -1,28 +1,12 @@
 from django.db import models
 from django.contrib.auth import get_user_model
-from datetime import timedelta
 from django.utils import timezone
 import os
 from uuid import uuid4
 
-User = get_user_model()
-
-
-
-class VerifyCode(models.Model):
-    """邮箱验证码模型"""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='所属用户')
-    code = models.CharField(max_length=6, verbose_name='验证码')
-    email = models.EmailField(verbose_name='接收邮箱')
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+from .avatars import pick_size, variant_name
 
-    class Meta:
-        verbose_name = '注销验证码'
-        verbose_name_plural = verbose_name
-
-    def is_valid(self):
-        """验证验证码是否有效（5分钟内）"""
-        return timezone.now() < self.created_at + timedelta(minutes=5)
+User = get_user_model()
 
 
 
@@ -37,4 +21,59 @@ def avatar_upload_path(instance, filename):
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     # 头像字段：upload_to指定存储到media/avatars下
-    avatar = models.ImageField(upload_to=avatar_upload_path, blank=True, null=True)
\ No newline at end of file
+    avatar = models.ImageField(upload_to=avatar_upload_path, blank=True, null=True)
+    # 已生成的缩略图格式（逗号分隔，如 jpg,webp），为空表示还是未处理过的原图
+    avatar_formats = models.CharField(max_length=20, blank=True, default='')
+
+    def avatar_url(self, display_size):
+        """按显示尺寸取合适的缩略图地址，没有缩略图时退回原图"""
+        if not self.avatar:
+            return ''
+        if 'jpg' not in self.avatar_formats:
+            return self.avatar.url
+        return self.avatar.storage.url(variant_name(self.avatar.name, pick_size(display_size), 'jpg'))
+
+    def avatar_webp_url(self, display_size):
+        if not self.avatar or 'webp' not in self.avatar_formats:
+            return ''
+        return self.avatar.storage.url(variant_name(self.avatar.name, pick_size(display_size), 'webp'))
+
+class AccountPurge(models.Model):
+    """
+    注销账号的后台清理任务：请求里只把用户设为停用并入队，
+    由后台线程/run_account_purge 分批删除博客、评论和头像文件，最后删除用户本身
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '待处理'),
+        (STATUS_RUNNING, '处理中'),
+        (STATUS_DONE, '已完成'),
+        (STATUS_FAILED, '失败'),
+    ]
+
+    # 不用外键：任务最后会删除用户，记录要保留下来
+    user_id = models.BigIntegerField(unique=True, verbose_name='用户ID')
+    username = models.CharField(max_length=150, verbose_name='用户名')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name='状态')
+    stage = models.CharField(max_length=20, blank=True, default='', verbose_name='当前阶段')
+    deleted_comments = models.PositiveIntegerField(default=0, verbose_name='已删评论')
+    deleted_blogs = models.PositiveIntegerField(default=0, verbose_name='已删博客')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='尝试次数')
+    # 待处理：最早可处理时间；处理中：认领租约到期时间（进程中途退出后可被重新认领）
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name='下次尝试时间')
+    last_error = models.TextField(blank=True, verbose_name='最近错误')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+
+    def __str__(self):
+        return f'{self.username}（{self.user_id}）'
+
+    class Meta:
+        verbose_name = '账号注销任务'
+        verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='account_purge_due_idx'),
+        ]
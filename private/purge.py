@@ -0,0 +1,243 @@
+"""
+注销账号的后台清理。
+
+请求里 queue_purge() 只把用户设为停用（立即无法登录，已有会话也随之失效）并写一条 AccountPurge，
+事务提交后唤醒进程内的后台线程；也可以设置 ACCOUNT_PURGE_IN_PROCESS = False，改为单独运行
+manage.py run_account_purge。
+
+不用 User.delete() 的级联收集：它会把用户的全部博客、博客下的全部评论和用户写过的评论
+一次性读进内存，在一个请求里逐表删除。这里按阶段分批直接 DELETE，每批一个短事务：
+    blogs     用户博客下的评论、搜索索引，然后是博客本身（同时扣减分类、月份归档的博客数）
+    comments  用户在别人博客下的评论，同时修正这些博客的 comment_count 和评论片段缓存
+    account   头像文件、资料，最后删除用户（此时已没有大的子表）
+每一步都只删“还剩下的”行，进程中途退出后重新认领可以接着做。
+"""
+import logging
+import os
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from blog.archive import adjust_archive_counts
+from blog.cache import bump_comment_version, bump_feed_version
+from blog.models import Blog, BlogComment, BlogSearchToken
+from Djangolearn.background import BackgroundWorker
+from .models import AccountPurge, UserProfile
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# 认领后多久没有进展视为进程已退出，允许别的进程重新认领
+PURGE_LEASE = timedelta(minutes=5)
+# 每次认领最多执行的批数，之后让出后台线程，下一轮再接着做
+STEPS_PER_CLAIM = 50
+
+STAGES = ['blogs', 'comments', 'account']
+
+
+def queue_purge(user):
+    """停用账号并登记清理任务，立即返回"""
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    user.is_active = False
+    job, _ = AccountPurge.objects.update_or_create(
+        user_id=user.pk,
+        defaults={'username': user.username, 'status': AccountPurge.STATUS_PENDING, 'next_attempt_at': timezone.now()},
+    )
+    if settings.ACCOUNT_PURGE_IN_PROCESS:
+        transaction.on_commit(purge_worker.wake)
+    return job
+
+
+def _raw_delete(queryset):
+    """按主键直接 DELETE，不触发信号，也不做级联收集"""
+    return queryset._raw_delete(queryset.db)
+
+
+def _pks(queryset, batch_size):
+    return list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+
+
+def _purge_blogs(user_id, batch_size):
+    """返回 (删除的评论数, 删除的博客数, 是否还有剩余)"""
+    comment_ids = _pks(BlogComment.objects.filter(blog__author_id=user_id), batch_size)
+    if comment_ids:
+        return _raw_delete(BlogComment.objects.filter(pk__in=comment_ids)), 0, True
+
+    token_ids = _pks(BlogSearchToken.objects.filter(blog__author_id=user_id), batch_size)
+    if token_ids:
+        _raw_delete(BlogSearchToken.objects.filter(pk__in=token_ids))
+        return 0, 0, True
+
+    rows = list(
+        Blog.objects.filter(author_id=user_id).order_by('pk').values_list('pk', 'category_id', 'edit_time')[:batch_size]
+    )
+    if not rows:
+        return 0, 0, False
+    blog_ids = [pk for pk, _, _ in rows]
+    with transaction.atomic():
+        # 前面几批之后又有人评论的，连同博客一起删掉，外键约束才不会失败
+        late = _raw_delete(BlogComment.objects.filter(blog_id__in=blog_ids))
+        _raw_delete(BlogSearchToken.objects.filter(blog_id__in=blog_ids))
+        deleted = _raw_delete(Blog.objects.filter(pk__in=blog_ids))
+        adjust_archive_counts([(category_id, edit_time) for _, category_id, edit_time in rows], -1)
+    # 直接 DELETE 不发信号，首页和这些详情页的 ETag 要手动失效
+    bump_feed_version()
+    for blog_id in blog_ids:
+        bump_comment_version(blog_id)
+    return late, deleted, True
+
+
+def _purge_comments(user_id, batch_size):
+    """删除一批用户在别人博客下的评论，返回删除的条数"""
+    rows = list(
+        BlogComment.objects.filter(author_id=user_id).order_by('pk').values_list('pk', 'blog_id')[:batch_size]
+    )
+    if not rows:
+        return 0
+    per_blog = Counter(blog_id for _, blog_id in rows)
+    # 按减少的条数分组，每组一条 UPDATE
+    by_amount = defaultdict(list)
+    for blog_id, amount in per_blog.items():
+        by_amount[amount].append(blog_id)
+
+    with transaction.atomic():
+        deleted = _raw_delete(BlogComment.objects.filter(pk__in=[pk for pk, _ in rows]))
+        for amount, blog_ids in by_amount.items():
+            Blog.objects.filter(pk__in=blog_ids, comment_count__gte=amount).update(
+                comment_count=F('comment_count') - amount
+            )
+            # 计数本来就有偏差的，不减成负数
+            Blog.objects.filter(pk__in=blog_ids, comment_count__lt=amount).update(comment_count=0)
+    # 直接 DELETE 不发 post_delete，评论片段缓存要手动失效，首页卡片上的评论数也变了
+    for blog_id in per_blog:
+        bump_comment_version(blog_id)
+    bump_feed_version()
+    return deleted
+
+
+def delete_user_media(user_id):
+    """删除 avatars/<用户ID>/ 下的全部文件（包括历次上传遗留的原图和缩略图）"""
+    directory = os.path.join('avatars', str(user_id))
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    for name in files:
+        default_storage.delete(os.path.join(directory, name))
+    # 文件系统存储下顺便删掉空目录
+    if hasattr(default_storage, 'path'):
+        try:
+            os.rmdir(default_storage.path(directory))
+        except OSError:
+            pass
+    return len(files)
+
+
+def _purge_account(user_id):
+    delete_user_media(user_id)
+    with transaction.atomic():
+        UserProfile.objects.filter(user_id=user_id).delete()
+        # 大的子表都已清空，剩下的级联（分组、权限关联等）很小
+        User.objects.filter(pk=user_id).delete()
+
+
+def run_step(job, batch_size):
+    """执行一批，更新 job 上的进度，返回 False 表示任务已完成"""
+    stage = job.stage or STAGES[0]
+    if stage == 'blogs':
+        comments, blogs, busy = _purge_blogs(job.user_id, batch_size)
+        job.deleted_comments += comments
+        job.deleted_blogs += blogs
+    elif stage == 'comments':
+        deleted = _purge_comments(job.user_id, batch_size)
+        job.deleted_comments += deleted
+        busy = bool(deleted)
+    else:
+        _purge_account(job.user_id)
+        busy = False
+
+    if busy:
+        job.stage = stage
+    elif stage != STAGES[-1]:
+        job.stage = STAGES[STAGES.index(stage) + 1]
+    else:
+        job.status = AccountPurge.STATUS_DONE
+        job.finished_at = timezone.now()
+    job.next_attempt_at = timezone.now() + PURGE_LEASE
+    job.save(update_fields=['stage', 'status', 'deleted_comments', 'deleted_blogs', 'next_attempt_at', 'finished_at'])
+    return job.status != AccountPurge.STATUS_DONE
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=settings.ACCOUNT_PURGE_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def _record_failure(job, error):
+    job.attempts += 1
+    job.last_error = str(error)[:2000]
+    if job.attempts >= settings.ACCOUNT_PURGE_MAX_ATTEMPTS:
+        job.status = AccountPurge.STATUS_FAILED
+        logger.error('账号 %s 清理失败，已放弃：%s', job.user_id, error)
+    else:
+        job.status = AccountPurge.STATUS_PENDING
+        job.next_attempt_at = timezone.now() + _retry_delay(job.attempts)
+        logger.warning('账号 %s 第 %s 次清理失败，稍后重试：%s', job.user_id, job.attempts, error)
+    job.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def _claim(job_id, now):
+    """条件 UPDATE 认领，多进程同时处理时每个任务只会被一个进程执行"""
+    return AccountPurge.objects.filter(pk=job_id, status=AccountPurge.STATUS_PENDING).update(
+        status=AccountPurge.STATUS_RUNNING,
+        next_attempt_at=now + PURGE_LEASE,
+    ) == 1
+
+
+def drain_purges(batch_size=None, max_steps=STEPS_PER_CLAIM, progress=None):
+    """
+    认领一个到期的任务并执行至多 max_steps 批，返回执行的批数（0 表示没有任务）。
+    progress(job)：每批之后回调，用于输出进度
+    """
+    batch_size = batch_size or settings.ACCOUNT_PURGE_BATCH_SIZE
+    now = timezone.now()
+    # 回收租约过期的“处理中”任务
+    AccountPurge.objects.filter(status=AccountPurge.STATUS_RUNNING, next_attempt_at__lte=now).update(
+        status=AccountPurge.STATUS_PENDING
+    )
+    job_id = (
+        AccountPurge.objects.filter(status=AccountPurge.STATUS_PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'pk').values_list('pk', flat=True).first()
+    )
+    if job_id is None or not _claim(job_id, now):
+        return 0
+
+    job = AccountPurge.objects.get(pk=job_id)
+    steps = 0
+    try:
+        while steps < max_steps:
+            steps += 1
+            more = run_step(job, batch_size)
+            logger.debug('账号 %s 清理中：阶段 %s，已删博客 %s 篇、评论 %s 条',
+                         job.user_id, job.stage, job.deleted_blogs, job.deleted_comments)
+            if progress:
+                progress(job)
+            if not more:
+                logger.info('账号 %s 清理完成：删除博客 %s 篇、评论 %s 条',
+                            job.user_id, job.deleted_blogs, job.deleted_comments)
+                return steps
+    except Exception as e:
+        _record_failure(job, e)
+        return steps
+    # 没做完：放回队列，下一轮接着做
+    AccountPurge.objects.filter(pk=job.pk).update(status=AccountPurge.STATUS_PENDING, next_attempt_at=timezone.now())
+    return steps
+
+
+purge_worker = BackgroundWorker('account-purge', drain_purges, idle_interval=60)
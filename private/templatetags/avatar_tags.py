@@ -0,0 +1,35 @@
+from django import template
+from django.core.exceptions import ObjectDoesNotExist
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+def _profile(user):
+    try:
+        return user.profile
+    except (ObjectDoesNotExist, AttributeError):
+        return None
+
+
+@register.filter
+def avatar_url(user, display_size=30):
+    """{{ user|avatar_url:80 }}：按显示尺寸取头像地址，没有头像时用默认图"""
+    profile = _profile(user)
+    return (profile and profile.avatar_url(int(display_size))) or static('img/default.png')
+
+
+@register.simple_tag
+def avatar(user, display_size=30, css_class='rounded-circle', alt='头像'):
+    """{% avatar user 30 %}：输出带 WebP 备选的 <picture>，浏览器只下载合适尺寸的一张"""
+    display_size = int(display_size)
+    img = format_html(
+        '<img src="{}" alt="{}" class="{}" width="{}" height="{}" loading="lazy">',
+        avatar_url(user, display_size), alt, css_class, display_size, display_size,
+    )
+    profile = _profile(user)
+    webp = profile.avatar_webp_url(display_size) if profile else ''
+    if not webp:
+        return img
+    return format_html('<picture><source srcset="{}" type="image/webp">{}</picture>', webp, img)
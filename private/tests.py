@@ -1,3 +1,154 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from BLauth.codes import CHANGE_EMAIL, DELETE_ACCOUNT, get_code_store
+from BLauth.models import UserEmail
+from blog.models import Blog, BlogComment
+from blog.tests import QueryCountMixin, make_blog, make_user
+from .avatars import AVATAR_SIZES, variant_name
+from .models import AccountPurge, UserProfile
+from .purge import drain_purges
+
+User = get_user_model()
+
+
+class ProfileQueryCountTests(QueryCountMixin, TestCase):
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_login(self.user)
+
+    def test_blog_tab_query_count_is_flat(self):
+        def add_blogs():
+            for _ in range(3):
+                blog = make_blog(author=self.user)
+                BlogComment.objects.create(content='评论', blog=blog, author=make_user())
+
+        add_blogs()
+        self.assertFlatQueryCount(reverse('private:user_profile') + '?tab=blogs', add_blogs)
+
+    def test_comment_tab_query_count_is_flat(self):
+        def add_comments():
+            for _ in range(3):
+                BlogComment.objects.create(content='评论', blog=make_blog(), author=self.user)
+
+        add_comments()
+        self.assertFlatQueryCount(reverse('private:user_profile') + '?tab=comments', add_comments)
+
+
+class EditProfileTests(TestCase):
+
+    def test_email_taken_between_check_and_save(self):
+        user = make_user()
+        other = make_user()
+        self.client.force_login(user)
+        get_code_store().issue(CHANGE_EMAIL, f'{user.id}:{other.email}', '123456')
+        # 表单查重之后、保存之前邮箱被别人占用
+        with mock.patch('private.views.email_in_use', return_value=False):
+            response = self.client.post(reverse('private:edit_profile'), {
+                'username': user.username, 'email': user.email,
+                'new_email': other.email, 'email_verify_code': '123456',
+            })
+        self.assertEqual(response.json(), {'status': 'error', 'msg': '该邮箱已被其他账号绑定，请更换邮箱'})
+        user.refresh_from_db()
+        self.assertNotEqual(user.email, other.email)
+        self.assertEqual(UserEmail.objects.get(user=user).email, user.email)
+
+
+class AvatarUploadTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, AVATAR_MAX_UPLOAD_SIZE=1024 * 1024)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = make_user(with_avatar=False)
+        self.client.force_login(self.user)
+
+    def upload(self, data, name='a.jpg'):
+        f = io.BytesIO(data)
+        f.name = name
+        return self.client.post(reverse('private:update_avatar'), {'avatar': f}).json()
+
+    def test_generates_fixed_size_variants(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 800), 'red').save(buffer, 'JPEG')
+        self.assertEqual(self.upload(buffer.getvalue())['status'], 'success')
+
+        profile = UserProfile.objects.get(user=self.user)
+        for size in AVATAR_SIZES:
+            with Image.open(os.path.join(self.media_root, variant_name(profile.avatar.name, size, 'jpg'))) as image:
+                self.assertEqual(image.size, (size, size))
+        # 30px 的位置按 2 倍屏取 64px
+        self.assertTrue(profile.avatar_url(30).endswith('_64.jpg'))
+        # 最大尺寸直接用主图，不重复存一份
+        self.assertTrue(profile.avatar_url(200).endswith(os.path.basename(profile.avatar.name)))
+        directory = os.path.join(self.media_root, os.path.dirname(profile.avatar.name))
+        self.assertNotIn(f'_{AVATAR_SIZES[-1]}.jpg', ' '.join(os.listdir(directory)))
+
+    def test_rejects_oversized_and_invalid_files(self):
+        self.assertEqual(self.upload(os.urandom(1200 * 1024))['msg'], '头像文件不能超过1MB')
+        self.assertEqual(self.upload(b'not an image', 'a.png')['msg'], '无法识别的图片文件')
+        self.assertFalse(UserProfile.objects.filter(user=self.user).exclude(avatar='').exists())
+
+
+@override_settings(ACCOUNT_PURGE_IN_PROCESS=False)
+class AccountPurgeTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = make_user()
+        self.client.force_login(self.user)
+
+    def test_deactivates_then_purges_in_batches(self):
+        other = make_user()
+        for _ in range(3):
+            blog = make_blog(author=self.user)
+            BlogComment.objects.create(content='别人的评论', blog=blog, author=other)
+        other_blog = make_blog(author=other)
+        for _ in range(3):
+            BlogComment.objects.create(content='我的评论', blog=other_blog, author=self.user)
+        Blog.objects.filter(pk=other_blog.pk).update(comment_count=3)
+        avatar_dir = os.path.join(self.media_root, 'avatars', str(self.user.id))
+        os.makedirs(avatar_dir)
+        open(os.path.join(avatar_dir, 'a.png'), 'wb').close()
+        get_code_store().issue(DELETE_ACCOUNT, self.user.id, '123456')
+
+        response = self.client.post(
+            reverse('private:confirm_logout'),
+            json.dumps({'verifyCode': '123456', 'verifyPassword': 'pass123456'}),
+            content_type='application/json',
+        ).json()
+        self.assertEqual(response['status'], 'success')
+        # 请求里只停用并退出登录，数据还在
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertNotIn('_auth_user_id', self.client.session)
+        self.assertEqual(Blog.objects.filter(author=self.user).count(), 3)
+
+        steps = 0
+        while drain_purges(batch_size=2, max_steps=1):
+            steps += 1
+        self.assertGreater(steps, 3)
+
+        job = AccountPurge.objects.get(user_id=self.user.id)
+        self.assertEqual(job.status, AccountPurge.STATUS_DONE)
+        self.assertEqual((job.deleted_blogs, job.deleted_comments), (3, 6))
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(BlogComment.objects.filter(author_id=self.user.id).exists())
+        self.assertEqual(Blog.objects.get(pk=other_blog.pk).comment_count, 0)
+        self.assertFalse(os.path.exists(avatar_dir))
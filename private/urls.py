@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# ASGI 模式下发送验证码换成异步视图
+senders = async_views if settings.ASGI_MODE else views
 
 app_name = 'private'
 
@@ -11,15 +15,15 @@ urlpatterns = [
     # 个人信息编辑
     path('edit/', views.edit_profile, name='edit_profile'),
     # 发送注销验证码（名称和模板一致）
-    path('send-logout-code/', views.send_logout_verify_code, name='send_logout_verify_code'),
+    path('send-logout-code/', senders.send_logout_verify_code, name='send_logout_verify_code'),
     # 确认注销账号
     path('confirm-logout/', views.confirm_logout, name='confirm_logout'),
     # 发送修改密码验证码（名称和模板一致）
-    path('send_change_pwd_code/', views.send_change_pwd_verify_code, name='send_change_pwd_verify_code'),
+    path('send_change_pwd_code/', senders.send_change_pwd_verify_code, name='send_change_pwd_verify_code'),
     # 确认修改密码
     path('change_password/', views.change_password, name='change_password'),
     # 发送邮箱修改验证码
-    path('send-email-change-code/', views.send_email_change_code, name='send_email_change_code'),
+    path('send-email-change-code/', senders.send_email_change_code, name='send_email_change_code'),
     path('update_avatar/', views.update_avatar, name='update_avatar'),
     path('delete-blog/<int:blog_id>/', views.delete_blog, name='delete_blog'),
     path('delete-comment/<int:comment_id>/', views.delete_comment, name='delete_comment'),
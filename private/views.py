@@ -4,16 +4,26 @@ from django.contrib import messages
 from django import forms
 from django.contrib.auth.models import User
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from blog.archive import adjust_archive_counts
 from blog.models import Blog, BlogComment
+from blog.views import comment_page_url
 from django.urls.base import reverse
-from django.core.mail import send_mail
+from BLauth.backends import email_in_use
+from BLauth.codes import CHANGE_EMAIL, CHANGE_PASSWORD, DELETE_ACCOUNT, TTL, get_code_store
+from BLauth.mailqueue import queue_mail
 import random
 import string
 import json,re
 import traceback
 from django.http import JsonResponse, HttpResponse
-from django.contrib.auth import get_user_model
-from .models import VerifyCode,UserProfile
+from django.contrib.auth import get_user_model, logout
+from .models import UserProfile
+from .avatars import AvatarUploadLimitHandler, InvalidAvatar, save_avatar
+from .purge import queue_purge
+from django.conf import settings
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 
 
 @login_required
@@ -38,14 +48,12 @@ def user_profile(request):
         page = 1
 
     if tab == 'blogs':
-        blog_list = Blog.objects.filter(
-            author=request.user,
-            title__icontains=search_key
-        ) | Blog.objects.filter(
-            author=request.user,
-            content__icontains=search_key
+        # author 条件放在 OR 外面，才能走 (author, edit_time) 索引
+        blog_list = Blog.objects.filter(author=request.user).filter(
+            Q(title__icontains=search_key) | Q(content__icontains=search_key)
         )
-        blog_list = blog_list.distinct().order_by('-edit_time')
+        # 分类 JOIN 取出，评论数用冗余字段，避免逐条 count
+        blog_list = blog_list.select_related('category').defer('content', 'plain_text').order_by('-edit_time')
 
         paginator = Paginator(blog_list, per_page)  # 用上面的 per_page
         try:
@@ -59,7 +67,7 @@ def user_profile(request):
         comment_list = BlogComment.objects.filter(
             author=request.user,
             content__icontains=search_key
-        ).order_by('-edit_time')
+        ).select_related('blog').defer('blog__content', 'blog__plain_text').order_by('-edit_time')
 
         paginator = Paginator(comment_list, per_page)  # 评论也一样
         try:
@@ -80,9 +88,10 @@ def user_profile(request):
 
 @login_required
 def comment_redirect(request, comment_id):
-    comment = get_object_or_404(BlogComment, id=comment_id, author=request.user)
-    # 修改：使用查询参数传递评论 ID
-    return redirect(f"{reverse('blog:blog_detail', kwargs={'blog_id': comment.blog.id})}?comment_id={comment.id}")
+    comment = get_object_or_404(BlogComment.objects.only('id', 'blog_id'), id=comment_id, author=request.user)
+    # 直接算出评论所在的页，不再经过详情页的 ?comment_id 再跳一次；
+    # 评论恰好在这之间被删掉时退回博客详情页
+    return redirect(comment_page_url(comment.blog_id, comment.id) or reverse('blog:blog_detail', args=[comment.blog_id]))
 
 
 # 个人信息编辑表单
@@ -129,24 +138,13 @@ class UserProfileForm(forms.ModelForm):
         # 1. 校验新邮箱唯一性（如果填写了新邮箱且和原邮箱不同）
         if new_email and new_email != current_email:
             # 检查新邮箱是否已被其他用户占用
-            if User.objects.filter(email=new_email).exclude(id=self.instance.id).exists():
+            if email_in_use(new_email, exclude_user_id=self.instance.id):
                 self.add_error('new_email', '该邮箱已被其他账号绑定，请更换邮箱')
                 return cleaned_data  # 提前返回，不执行后续验证码校验
 
-            # 2. 校验验证码是否存在且有效
-            try:
-                code_obj = VerifyCode.objects.filter(
-                    user=self.instance,
-                    email=new_email,
-                    code=verify_code
-                ).latest('created_at')
-                if not code_obj.is_valid():
-                    self.add_error('email_verify_code', '验证码已过期，请重新获取')
-                else:
-                    # 验证码验证通过，立即删除该验证码（避免重复使用）
-                    code_obj.delete()
-            except VerifyCode.DoesNotExist:
-                self.add_error('email_verify_code', '验证码错误或未获取，请重新输入')
+            # 2. 校验验证码（验证码绑定用户和新邮箱），通过后立即删除，避免重复使用
+            if not get_code_store().consume(CHANGE_EMAIL, f'{self.instance.id}:{new_email}', verify_code):
+                self.add_error('email_verify_code', '验证码错误或已过期，请重新获取')
         return cleaned_data
 
 
@@ -168,11 +166,17 @@ def edit_profile(request):
         if not error_msg and form.is_valid():
             # 正常保存
             new_email = form.cleaned_data.get('new_email')
-            if new_email and new_email != request.user.email:
-                request.user.email = new_email
-                request.user.save()
-                VerifyCode.objects.filter(user=request.user, email=new_email).delete()
-            form.save()
+            original_email = request.user.email
+            try:
+                # 邮箱写入 UserEmail 唯一索引，被并发请求抢先占用时整体回滚
+                with transaction.atomic():
+                    if new_email and new_email != request.user.email:
+                        request.user.email = new_email
+                        request.user.save()
+                    form.save()
+            except IntegrityError:
+                request.user.email = original_email
+                return JsonResponse({'status': 'error', 'msg': '该邮箱已被其他账号绑定，请更换邮箱'})
             return JsonResponse({'status': 'success', 'msg': '个人信息修改成功'})
         else:
             # 返回错误
@@ -192,31 +196,19 @@ def send_logout_verify_code(request):
         if not email:
             return JsonResponse({'status': 'error', 'msg': '账号未绑定邮箱，无法发送验证码'})
 
-        # 生成6位数字验证码
+        # 生成6位数字验证码，覆盖旧的验证码，5分钟后自动过期
         code = ''.join(random.choices(string.digits, k=6))
-
-        # 先删除该用户旧的验证码
-        VerifyCode.objects.filter(user=request.user).delete()
-
-        # 保存新验证码
-        VerifyCode.objects.create(
-            user=request.user,
-            code=code,
-            email=email
+        get_code_store().issue(DELETE_ACCOUNT, request.user.id, code)
+
+        # 邮件入队，由后台线程发送
+        queue_mail(
+            subject='账号注销验证码',
+            message=f'你的账号注销验证码为：{code}（5分钟内有效），请勿泄露给他人！',
+            from_email=None,  # 使用DEFAULT_FROM_EMAIL
+            recipient_list=[email],
+            expires_in=TTL[DELETE_ACCOUNT],
         )
-
-        # 发送邮件
-        try:
-            send_mail(
-                subject='账号注销验证码',
-                message=f'你的账号注销验证码为：{code}（5分钟内有效），请勿泄露给他人！',
-                from_email=None,  # 使用DEFAULT_FROM_EMAIL
-                recipient_list=[email],
-                fail_silently=False,
-            )
-            return JsonResponse({'status': 'success', 'msg': '验证码已发送至你的邮箱'})
-        except Exception as e:
-            return JsonResponse({'status': 'error', 'msg': f'发送失败：{str(e)}'})
+        return JsonResponse({'status': 'success', 'msg': '验证码已发送至你的邮箱'})
     return JsonResponse({'status': 'error', 'msg': '请求方式错误'})
 
 
@@ -238,23 +230,17 @@ def confirm_logout(request):
             if not request.user.check_password(password):
                 return JsonResponse({'status': 'error', 'msg': '账号密码错误'}, status=200)
 
-            # 3. 验证码校验
-            try:
-                code_obj = VerifyCode.objects.filter(user=request.user).latest('created_at')
-            except VerifyCode.DoesNotExist:
-                return JsonResponse({'status': 'error', 'msg': '请先获取验证码'}, status=200)
-
-            if not code_obj.is_valid():
-                return JsonResponse({'status': 'error', 'msg': '验证码已过期，请重新获取'}, status=200)
+            # 3. 验证码校验（通过即删除）
+            store = get_code_store()
+            if store.get(DELETE_ACCOUNT, request.user.id) is None:
+                return JsonResponse({'status': 'error', 'msg': '验证码已过期或未获取，请重新获取'}, status=200)
 
-            if code_obj.code != verify_code:
+            if not store.consume(DELETE_ACCOUNT, request.user.id, verify_code):
                 return JsonResponse({'status': 'error', 'msg': '验证码错误'}, status=200)
 
-            # 4. 删除用户及验证码
-            user_id = request.user.id
-            User = get_user_model()
-            User.objects.filter(id=user_id).delete()
-            VerifyCode.objects.filter(user_id=user_id).delete()
+            # 4. 停用账号并退出登录，博客、评论、头像等由后台任务分批删除
+            queue_purge(request.user)
+            logout(request)
 
             # 5. 返回成功（跳转首页/index）
             return JsonResponse({
@@ -280,31 +266,19 @@ def send_change_pwd_verify_code(request):
         if not email:
             return JsonResponse({'status': 'error', 'msg': '账号未绑定邮箱，无法发送验证码'})
 
-        # 生成6位数字验证码（和注销接口一致）
+        # 生成6位数字验证码（和注销接口一致），覆盖旧的验证码
         code = ''.join(random.choices(string.digits, k=6))
-
-        # 先删除该用户旧的验证码（避免重复）
-        VerifyCode.objects.filter(user=request.user).delete()
-
-        # 保存新验证码（复用同一张表）
-        VerifyCode.objects.create(
-            user=request.user,
-            code=code,
-            email=email
+        get_code_store().issue(CHANGE_PASSWORD, request.user.id, code)
+
+        # 邮件入队，由后台线程发送
+        queue_mail(
+            subject='修改密码验证码',  # 区别注销的主题
+            message=f'你的修改密码验证码为：{code}（5分钟内有效），请勿泄露给他人！',  # 区别注销的内容
+            from_email=None,  # 使用DEFAULT_FROM_EMAIL
+            recipient_list=[email],
+            expires_in=TTL[CHANGE_PASSWORD],
         )
-
-        # 发送修改密码邮件（仅主题/内容不同）
-        try:
-            send_mail(
-                subject='修改密码验证码',  # 区别注销的主题
-                message=f'你的修改密码验证码为：{code}（5分钟内有效），请勿泄露给他人！',  # 区别注销的内容
-                from_email=None,  # 使用DEFAULT_FROM_EMAIL
-                recipient_list=[email],
-                fail_silently=False,
-            )
-            return JsonResponse({'status': 'success', 'msg': '验证码已发送至你的邮箱'})
-        except Exception as e:
-            return JsonResponse({'status': 'error', 'msg': f'发送失败：{str(e)}'})
+        return JsonResponse({'status': 'success', 'msg': '验证码已发送至你的邮箱'})
     return JsonResponse({'status': 'error', 'msg': '请求方式错误'})
 
 
@@ -327,16 +301,11 @@ def change_password(request):
         if not new_password or len(new_password) < 6:
             return JsonResponse({'status': 'error', 'msg': '新密码至少6位'})
 
-        # 2. 验证验证码
-        # 优先获取最新创建的验证码
-        try:
-            code_obj = VerifyCode.objects.filter(
-                user=request.user,
-                code=verify_code
-            ).latest('created_at')  # ✅ 按创建时间取最新
-            if not code_obj.is_valid():
-                return JsonResponse({'status': 'error', 'msg': '验证码已过期（有效期5分钟）'})
-        except VerifyCode.DoesNotExist:
+        # 2. 验证验证码（通过即删除）
+        store = get_code_store()
+        if store.get(CHANGE_PASSWORD, request.user.id) is None:
+            return JsonResponse({'status': 'error', 'msg': '验证码已过期（有效期5分钟）'})
+        if not store.consume(CHANGE_PASSWORD, request.user.id, verify_code):
             return JsonResponse({'status': 'error', 'msg': '验证码错误，请重新输入'})
 
         # 3. 修改密码
@@ -344,9 +313,6 @@ def change_password(request):
         user.set_password(new_password)
         user.save()
 
-        # 4. 删除验证码
-        VerifyCode.objects.filter(user=request.user).delete()
-
         return JsonResponse({'status': 'success', 'msg': '密码修改成功，请重新登录'})
 
     return JsonResponse({'status': 'error', 'msg': '请求方式错误'})
@@ -371,7 +337,7 @@ def send_email_change_code(request):
                 return JsonResponse({'status': 'error', 'msg': '新邮箱不能与原邮箱相同'})
 
             # 2. 新增：校验新邮箱是否已被其他用户占用
-            if User.objects.filter(email=new_email).exclude(id=request.user.id).exists():
+            if email_in_use(new_email, exclude_user_id=request.user.id):
                 return JsonResponse({'status': 'error', 'msg': '该邮箱已被其他账号绑定，请更换邮箱'})
 
             # 3. 校验新邮箱格式
@@ -380,24 +346,17 @@ def send_email_change_code(request):
             except forms.ValidationError:
                 return JsonResponse({'status': 'error', 'msg': '发送失败，请输入一个有效的邮箱地址'})
 
-            # 生成6位验证码
+            # 生成6位验证码（关联用户和新邮箱），覆盖旧的验证码
             code = ''.join(random.choices(string.digits, k=6))
-            # 删除该用户旧的验证码（避免重复）
-            VerifyCode.objects.filter(user=request.user, email=new_email).delete()
-            # 保存新验证码（关联新邮箱）
-            VerifyCode.objects.create(
-                user=request.user,
-                code=code,
-                email=new_email
-            )
+            get_code_store().issue(CHANGE_EMAIL, f'{request.user.id}:{new_email}', code)
 
-            # 发送邮件
-            send_mail(
+            # 邮件入队，由后台线程发送
+            queue_mail(
                 subject='邮箱修改验证码',
                 message=f'你的邮箱修改验证码为：{code}（5分钟内有效），请勿泄露给他人！',
                 from_email=None,
                 recipient_list=[new_email],
-                fail_silently=False,
+                expires_in=TTL[CHANGE_EMAIL],
             )
             return JsonResponse({'status': 'success', 'msg': '验证码已发送至新邮箱'})
         except Exception as e:
@@ -406,19 +365,35 @@ def send_email_change_code(request):
 
 
 
-@login_required
+@csrf_exempt
 def update_avatar(request):
-    if request.method == 'POST' and request.FILES.get('avatar'):
+    # 先挂上限制大小的上传处理器，再由内层视图做 CSRF 校验（校验会读取请求体）
+    limit_handler = AvatarUploadLimitHandler(request)
+    request.upload_handlers.insert(0, limit_handler)
+    return _update_avatar(request, limit_handler)
+
+
+@login_required
+@csrf_protect
+def _update_avatar(request, limit_handler):
+    # 请求体是惰性解析的，先取一次 FILES，上传处理器才会跑完
+    avatar = request.FILES.get('avatar') if request.method == 'POST' else None
+    if limit_handler.exceeded:
+        limit_mb = settings.AVATAR_MAX_UPLOAD_SIZE // (1024 * 1024)
+        return JsonResponse({'status': 'error', 'msg': f'头像文件不能超过{limit_mb}MB'})
+    if avatar:
         # 获取用户的UserProfile（没有则创建）
         profile, created = UserProfile.objects.get_or_create(user=request.user)
-        # 保存新头像（会自动存储到media/avatars下）
-        profile.avatar = request.FILES['avatar']
-        profile.save()
+        # 裁剪缩放成固定尺寸（含 WebP）后保存，旧头像文件一并删除
+        try:
+            save_avatar(profile, avatar)
+        except InvalidAvatar as e:
+            return JsonResponse({'status': 'error', 'msg': str(e)})
         # 返回成功信息和新头像的URL
         return JsonResponse({
             'status': 'success',
             'msg': '头像保存成功',
-            'avatar_url': profile.avatar.url
+            'avatar_url': profile.avatar_url(80)
         })
     return JsonResponse({'status': 'error', 'msg': '请求方式错误或未保存文件'})
 
@@ -427,7 +402,11 @@ def update_avatar(request):
 def delete_blog(request, blog_id):
     blog = get_object_or_404(Blog, id=blog_id, author=request.user)
     if request.method == 'POST':
-        blog.delete()
+        with transaction.atomic():
+            # 并发删除同一篇博客时只有真正删掉那一行的请求扣减归档计数
+            _, per_model = Blog.objects.filter(pk=blog.pk, author=request.user).delete()
+            if per_model.get(Blog._meta.label):
+                adjust_archive_counts([(blog.category_id, blog.edit_time)], -1)
         return JsonResponse({'status': 'success', 'msg': '博客已删除'})
     return JsonResponse({'status': 'error', 'msg': '请求方式错误'})
 
@@ -435,6 +414,12 @@ def delete_blog(request, blog_id):
 def delete_comment(request, comment_id):
     comment = get_object_or_404(BlogComment, id=comment_id, author=request.user)
     if request.method == 'POST':
-        comment.delete()
-        return JsonResponse({'status': 'success', 'msg': '评论已删除'})
+        with transaction.atomic():
+            # 并发删除同一条评论时只有真正删掉那一行的请求扣减计数
+            deleted, _ = BlogComment.objects.filter(pk=comment.pk, author=request.user).delete()
+            if deleted:
+                Blog.objects.filter(pk=comment.blog_id, comment_count__gt=0).update(comment_count=F('comment_count') - 1)
+            comment_count = Blog.objects.filter(pk=comment.blog_id).values_list('comment_count', flat=True).first()
+        # 带上新的评论数，页面原地移除这条评论，不用重新加载
+        return JsonResponse({'status': 'success', 'msg': '评论已删除', 'blog_id': comment.blog_id, 'comment_count': comment_count})
     return JsonResponse({'status': 'error', 'msg': '请求方式错误'})
\ No newline at end of file
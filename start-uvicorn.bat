@@ -0,0 +1,9 @@
+@echo off
+chcp 65001 >nul
+cd /d "C:\Users\Lenovo\PycharmProjects\Djangolearn"
+
+rem 按文件内容摘要判断静态文件是否变化，有变化才 collectstatic（带哈希文件名 + .gz/.br）
+py -3.14 manage.py syncstatic
+
+rem ASGI 模式：首页、详情、搜索和发送验证码走异步视图（asgi.py 默认设置 ASGI_MODE=True）
+py -3.14 -m uvicorn --workers 4 --limit-concurrency 200 --host 127.0.0.1 --port 5000 Djangolearn.asgi:application